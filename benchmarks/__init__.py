@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Synthetic migration corpus and benchmarks for the checker."""
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""Generate a synthetic django project with realistic migration trees."""
+import argparse
+import os
+import random
+
+FIELD_TYPES = [
+    'models.CharField(max_length={size}, verbose_name="{verbose}"{index})',
+    "models.IntegerField(default=0{index})",
+    "models.BooleanField(default=False{index})",
+    "models.DateTimeField(auto_now_add=True{index})",
+    'models.TextField(blank=True, help_text="{verbose}"{index})',
+    "models.DecimalField(decimal_places=2, max_digits={size}{index})",
+]
+
+MIGRATION_TEMPLATE = """# Generated by Django 3.2.13 on 2021-06-{day:02d} 12:{minute:02d}
+
+from django.db import migrations, models
+{imports}
+
+class Migration(migrations.Migration):
+{initial}
+    dependencies = [
+{dependencies}
+    ]
+
+    operations = [
+{operations}
+    ]
+"""
+
+
+def _index_kwarg(rng, db_index_rate: float):
+    """Return a db_index keyword for a field definition, usually nothing."""
+    roll = rng.random()
+    if roll < db_index_rate:
+        return ", db_index=True"
+    if roll < db_index_rate * 2:
+        return ", db_index=False"
+    return ""
+
+
+def _field_definition(rng, db_index_rate: float):
+    """Return the source of a random model field."""
+    return rng.choice(FIELD_TYPES).format(
+        size=rng.randint(8, 255),
+        verbose=f"Field number {rng.randint(0, 10000)}",
+        index=_index_kwarg(rng, db_index_rate),
+    )
+
+
+def _create_model(name: str, fields: list):
+    """Return the source of a CreateModel operation."""
+    lines = [
+        "        migrations.CreateModel(",
+        f'            name="{name}",',
+        "            fields=[",
+        "                (",
+        '                    "id",',
+        "                    models.AutoField(",
+        "                        auto_created=True,",
+        "                        primary_key=True,",
+        "                        serialize=False,",
+        '                        verbose_name="ID",',
+        "                    ),",
+        "                ),",
+    ]
+    for field_name, definition in fields:
+        lines.append(f'                ("{field_name}", {definition}),')
+    lines += [
+        "            ],",
+        "        ),",
+    ]
+    return "\n".join(lines)
+
+
+def _field_operation(operation: str, model: str, field: str, definition: str):
+    """Return the source of an AddField or AlterField operation."""
+    return "\n".join(
+        [
+            f"        migrations.{operation}(",
+            f'            model_name="{model}",',
+            f'            name="{field}",',
+            f"            field={definition},",
+            "        ),",
+        ],
+    )
+
+
+def _run_python():
+    """Return the source of a RunPython operation, which the checker should ignore."""
+    return "        migrations.RunPython(forwards, migrations.RunPython.noop),"
+
+
+def generate_app(
+    root: str,
+    app: str,
+    migrations: int,
+    models: int,
+    fields: int,
+    alter_rate: float,
+    db_index_rate: float,
+    rng,
+    other_apps: list = (),
+):
+    """
+    Write the migrations folder of a single app and return the paths of the files written.
+
+    The first migration creates every model, each later migration adds or alters a field.
+    A proportion of alter_rate of the later migrations alter an existing field, which is the
+    churn that makes replaying an app expensive. Some migrations depend on the first
+    migration of one of other_apps, as real projects do.
+    """
+    folder = os.path.join(root, app, "migrations")
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, "__init__.py"), "w"):
+        pass
+
+    model_fields = {
+        f"{app}_model_{x}": [f"field_{y}" for y in range(fields)] for x in range(models)
+    }
+    paths = []
+    previous = None
+    for number in range(1, migrations + 1):
+        name = "0001_initial" if number == 1 else f"{number:04d}_auto_{rng.randint(0, 99999)}"
+        dependencies = []
+        if previous is not None:
+            dependencies.append((app, previous))
+        if other_apps and rng.random() < 0.1:
+            dependencies.append((rng.choice(other_apps), "0001_initial"))
+
+        imports = ""
+        if number == 1:
+            operations = [
+                _create_model(
+                    model,
+                    [
+                        (field, _field_definition(rng, db_index_rate))
+                        for field in model_fields[model]
+                    ],
+                )
+                for model in model_fields
+            ]
+        elif rng.random() < alter_rate:
+            model = rng.choice(list(model_fields))
+            operations = [
+                _field_operation(
+                    "AlterField",
+                    model,
+                    rng.choice(model_fields[model]),
+                    _field_definition(rng, db_index_rate),
+                ),
+            ]
+        else:
+            model = rng.choice(list(model_fields))
+            field = f"added_{number}"
+            model_fields[model].append(field)
+            operations = [
+                _field_operation("AddField", model, field, _field_definition(rng, db_index_rate)),
+            ]
+            if rng.random() < 0.05:
+                imports = "\n\ndef forwards(apps, schema_editor):\n    pass\n"
+                operations.append(_run_python())
+
+        source = MIGRATION_TEMPLATE.format(
+            day=number % 28 + 1,
+            minute=number % 60,
+            imports=imports,
+            initial="\n    initial = True\n" if number == 1 else "",
+            dependencies="\n".join(f'        ("{x[0]}", "{x[1]}"),' for x in dependencies),
+            operations="\n".join(operations),
+        )
+        path = os.path.join(folder, f"{name}.py")
+        with open(path, "w") as file:
+            file.write(source)
+        paths.append(path)
+        previous = name
+
+    return paths
+
+
+def generate_project(
+    root: str,
+    apps: int = 10,
+    migrations: int = 100,
+    models: int = 5,
+    fields: int = 10,
+    alter_rate: float = 0.3,
+    db_index_rate: float = 0.05,
+    exclude_dirs: int = 1,
+    seed: int = 0,
+):
+    """
+    Write a django project with apps * migrations migration files under root.
+
+    exclude_dirs virtualenvs are also written, each holding a copy of the first app, along
+    with a migrations_check.cfg which excludes them, so the cost of pruning excluded trees
+    is part of the walk. The same seed always produces the same project.
+
+    Returns the paths of the migration files which should be checked.
+    """
+    rng = random.Random(seed)
+    app_names = [f"app_{x:04d}" for x in range(apps)]
+
+    paths = []
+    for index, app in enumerate(app_names):
+        paths += generate_app(
+            root,
+            app,
+            migrations,
+            models,
+            fields,
+            alter_rate,
+            db_index_rate,
+            rng,
+            app_names[:index],
+        )
+
+    exclude_paths = []
+    for index in range(exclude_dirs):
+        venv = f"venv_{index}"
+        exclude_paths.append(venv)
+        generate_app(
+            os.path.join(root, venv, "lib", "site-packages"),
+            app_names[0],
+            migrations,
+            models,
+            fields,
+            alter_rate,
+            db_index_rate,
+            rng,
+        )
+
+    with open(os.path.join(root, "migrations_check.cfg"), "w") as file:
+        file.write("[DJANGO_MIGRATION_DBINDEX_CHECK]\n")
+        file.write(f"exclude_paths={','.join(exclude_paths)}\n")
+
+    return paths
+
+
+def main(argv=None):
+    """Generate a project from the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generate",
+        description="Generate a synthetic django project with realistic migration trees.",
+    )
+    parser.add_argument("path", help="The directory to write the project to.")
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--migrations", type=int, default=100, help="Migrations per app.")
+    parser.add_argument("--models", type=int, default=5, help="Models per app.")
+    parser.add_argument("--fields", type=int, default=10, help="Fields per model.")
+    parser.add_argument(
+        "--alter-rate",
+        type=float,
+        default=0.3,
+        help="Proportion of migrations which alter an existing field.",
+    )
+    parser.add_argument(
+        "--db-index-rate",
+        type=float,
+        default=0.05,
+        help="Proportion of fields defined with db_index=True.",
+    )
+    parser.add_argument(
+        "--exclude-dirs",
+        type=int,
+        default=1,
+        help="Number of excluded virtualenvs containing migrations.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = generate_project(
+        args.path,
+        apps=args.apps,
+        migrations=args.migrations,
+        models=args.models,
+        fields=args.fields,
+        alter_rate=args.alter_rate,
+        db_index_rate=args.db_index_rate,
+        exclude_dirs=args.exclude_dirs,
+        seed=args.seed,
+    )
+    print(f"Wrote {len(paths)} migration files to {args.path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Time each phase of the checker against generated projects of different sizes."""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from django_migration_dbindex_check import __version__
+from django_migration_dbindex_check.checker import PARSERS, DBIndexChecker
+from django_migration_dbindex_check.state import AppState
+
+from .generate import generate_project
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+MIGRATIONS_PER_APP = 100
+
+
+def _timed(function, *args):
+    """Call the function and return its result and the wall time it took in seconds."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark_project(root: str, parser: str = "ast"):
+    """
+    Time the walk, parse, replay and analyse phases of checking the project at root.
+
+    Each phase runs on its own without the parse cache, so parse is the cost of reading and
+    extracting the operations of every file and replay is only the cost of applying them.
+    """
+    checker = DBIndexChecker(parser=parser)
+    apps, walk = _timed(checker._walk_files, root)
+
+    def parse():
+        return {
+            app: [
+                (name[:4], checker._get_operations_for_file(path))
+                for name, path in app_dict["migration_files"]
+            ]
+            for app, app_dict in apps.items()
+        }
+
+    def replay():
+        models = {}
+        for app, migrations in operations.items():
+            models[app] = AppState()
+            for migration_number, app_operations in migrations:
+                checker._apply_operations(models[app], app_operations, migration_number)
+        return models
+
+    def analyse():
+        return [checker._analyse_models(app_models) for app_models in models.values()]
+
+    operations, parse_time = _timed(parse)
+    models, replay_time = _timed(replay)
+    errors, analyse_time = _timed(analyse)
+
+    return {
+        "apps": len(apps),
+        "files": sum(len(x["migration_files"]) for x in apps.values()),
+        "errors": sum(len(x) for x in errors),
+        "walk": walk,
+        "parse": parse_time,
+        "replay": replay_time,
+        "analyse": analyse_time,
+        "total": walk + parse_time + replay_time + analyse_time,
+    }
+
+
+def run(sizes=DEFAULT_SIZES, parser: str = "ast", repeat: int = 1, seed: int = 0):
+    """Generate a project for each size and return the benchmark results."""
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as root:
+            generate_project(
+                root,
+                apps=max(1, size // MIGRATIONS_PER_APP),
+                migrations=min(size, MIGRATIONS_PER_APP),
+                seed=seed,
+            )
+            # Keep the fastest run of each phase, the others are mostly noise. The checker's
+            # messages go to stderr so stdout is only the results.
+            with contextlib.redirect_stdout(sys.stderr):
+                runs = [benchmark_project(root, parser) for _run in range(repeat)]
+            result = {"size": size, "parser": parser}
+            for key in runs[0]:
+                result[key] = min(x[key] for x in runs)
+            results.append(result)
+            print(
+                f"{size} files: walk {result['walk']:.3f}s, parse {result['parse']:.3f}s, "
+                f"replay {result['replay']:.3f}s, analyse {result['analyse']:.3f}s",
+                file=sys.stderr,
+            )
+
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    """Run the benchmarks and write the results as JSON."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Time each phase of the checker against generated projects.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda x: [int(size) for size in x.split(",")],
+        default=DEFAULT_SIZES,
+        help="Comma separated numbers of migration files, defaults to 1000,10000,100000.",
+    )
+    parser.add_argument("--parser", choices=PARSERS, default="ast")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of each size.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Write the JSON results to this file instead of stdout.",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.parser, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,171 @@
 # -*- coding: utf-8 -*-
 """Main module to allow for running from cli."""
+import argparse
 import os
 import sys
 
-from .checker import DBIndexChecker
+from .checker import PARSERS, DBIndexChecker
+from .profiler import DEFAULT_TOP
 
-if __name__ == "__main__":
-    checker = DBIndexChecker()
 
-    if len(sys.argv) < 2:
-        path = os.getcwd()
+def main(argv=None):
+    """Parse the command line arguments and check the given project."""
+    parser = argparse.ArgumentParser(
+        prog="python -m django_migration_dbindex_check",
+        description="Check a django project for migrations with a new db_index.",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        metavar="path",
+        help=(
+            "The root directory of the project, defaults to the current directory. Or the "
+            "migration files to check, e.g. from pre-commit, where - reads them from stdin."
+        ),
+    )
+    parser.add_argument(
+        "--root",
+        default=os.getcwd(),
+        help="The root directory of the project when checking files, defaults to the current "
+        "directory.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Check apps in N parallel processes, 0 uses one per CPU.",
+    )
+    parser.add_argument(
+        "--git",
+        action="store_true",
+        default=None,
+        help="List migration files with git ls-files instead of walking the directory tree.",
+    )
+    parser.add_argument(
+        "--since",
+        metavar="REF",
+        help="Only check apps with migrations added or modified since this git ref.",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=PARSERS,
+        default="ast",
+        help="Parse whole files (ast), or only the operations of each migration (fast).",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="OUT.json",
+        help="Write the time and memory used by each phase of the check to this file.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        metavar="N",
+        type=int,
+        default=DEFAULT_TOP,
+        help=f"The number of slowest files and apps in the profile, default {DEFAULT_TOP}.",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="OUT.prom",
+        help="Write statistics of the check to this file in the OpenMetrics text format.",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop at the first app with a new db_index, checking recently changed apps first.",
+    )
+    parser.add_argument(
+        "--table-stats",
+        metavar="FILE",
+        help="A CSV or JSON export of the number of rows and size of each table, used to rank "
+        "new indices by the size of their table.",
+    )
+    parser.add_argument(
+        "--min-table-rows",
+        metavar="N",
+        type=int,
+        help="Ignore new indices on tables with fewer rows, with --table-stats.",
+    )
+    parser.add_argument(
+        "--min-table-size",
+        metavar="MB",
+        type=int,
+        help="Ignore new indices on smaller tables, with --table-stats.",
+    )
+    parser.add_argument(
+        "--autofix",
+        action="store_true",
+        help="Rewrite the migrations with new indices to build them concurrently on PostgreSQL.",
+    )
+    parser.add_argument(
+        "--check-rewrites",
+        action="store_true",
+        default=None,
+        help="Also report field changes which rewrite the whole table, e.g. of column type.",
+    )
+    parser.add_argument(
+        "--rewrite-defaults",
+        action="store_true",
+        default=None,
+        help="With --check-rewrites, also report new columns with a default, which rewrite the "
+        "table on MySQL before 8.0.12 and PostgreSQL before 11.",
+    )
+    parser.add_argument(
+        "--check-validations",
+        action="store_true",
+        default=None,
+        help="Also report changes which scan the whole table to validate it, e.g. NOT NULL.",
+    )
+    parser.add_argument(
+        "--check-removals",
+        action="store_true",
+        default=None,
+        help="Also report indices dropped without RemoveIndexConcurrently, which lock the table.",
+    )
+    args = parser.parse_args(argv)
+
+    paths = args.paths or [os.getcwd()]
+    files = None
+    if len(paths) == 1 and os.path.isdir(paths[0]):
+        path = paths[0]
     else:
-        path = sys.argv[1]
+        # Check the apps containing the given files
+        path = args.root
+        files = []
+        for file_path in paths:
+            if file_path == "-":
+                files += [os.path.abspath(x.strip()) for x in sys.stdin if x.strip()]
+            else:
+                files.append(os.path.abspath(file_path))
+
     if not os.path.isabs(path):
         path = os.path.join(os.getcwd(), path)
-    if not os.path.exists(path):
-        raise ValueError(f"{path} is not a valid path.")
+    for file_path in [path] + (files or []):
+        if not os.path.exists(file_path):
+            raise ValueError(f"{file_path} is not a valid path.")
 
+    checker = DBIndexChecker(
+        jobs=args.jobs,
+        use_git=args.git,
+        since=args.since,
+        parser=args.parser,
+        profile=args.profile,
+        profile_top=args.profile_top,
+        metrics=args.metrics,
+        fail_fast=args.fail_fast,
+        files=files,
+        table_stats=args.table_stats,
+        min_table_rows=args.min_table_rows,
+        min_table_size=args.min_table_size,
+        autofix=args.autofix,
+        check_rewrites=args.check_rewrites,
+        rewrite_defaults=args.rewrite_defaults,
+        check_validations=args.check_validations,
+        check_removals=args.check_removals,
+    )
     checker.check_project(path)
+
+
+if __name__ == "__main__":
+    main()
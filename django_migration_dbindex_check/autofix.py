@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""Rewrite migrations so their new indices are built concurrently on PostgreSQL."""
+
+import ast
+import hashlib
+import io
+import re
+import tokenize
+
+# The longest identifier postgres allows, longer index names are truncated like django does.
+MAX_NAME_LENGTH = 63
+
+INDENT = " " * 4
+
+CONCURRENT_IMPORT = "from django.contrib.postgres.operations import AddIndexConcurrently"
+
+# Field operations whose db_index can be split into a SeparateDatabaseAndState.
+FIELD_OPERATIONS = ("AddField", "AlterField")
+
+# Relations are stored in a column named after the field with an _id suffix.
+RELATION_FIELDS = ("ForeignKey", "OneToOneField")
+
+
+def names_digest(*args, length: int):
+    """Hash names the way django does for index names."""
+    digest = hashlib.md5()
+    for arg in args:
+        digest.update(arg.encode())
+    return digest.hexdigest()[:length]
+
+
+def create_index_name(table: str, column: str):
+    """Name the index of a field with db_index=True, the same as django's schema editor."""
+    table = table.split(".")[-1].strip('"')
+    hash_suffix = names_digest(table, column, length=8)
+    name = f"{table}_{column}_{hash_suffix}"
+    if len(name) <= MAX_NAME_LENGTH:
+        return name
+
+    hash_suffix = hash_suffix[: MAX_NAME_LENGTH // 3]
+    other_length = (MAX_NAME_LENGTH - len(hash_suffix)) // 2 - 1
+    name = f"{table[:other_length]}_{column[:other_length]}_{hash_suffix}"
+    if name[0] == "_" or name[0].isdigit():
+        name = f"D{name[:-1]}"
+    return name
+
+
+class _Source:
+    """The text of a migration file, and the edits to make to it."""
+
+    def __init__(self, text: str):
+        """Parse the text, edits are (start, end, replacement) offsets into it."""
+        self.text = text
+        self.tree = ast.parse(text)
+        self.edits = []
+        self._line_starts = [0]
+        for line in text.splitlines(keepends=True):
+            self._line_starts.append(self._line_starts[-1] + len(line))
+
+    def offset(self, node):
+        """Get the offset of the start of a node, ast columns are counted in utf-8 bytes."""
+        line_start = self._line_starts[node.lineno - 1]
+        line_end = self._line_starts[node.lineno]
+        line = self.text[line_start:line_end].encode()
+        return line_start + len(line[: node.col_offset].decode())
+
+    def _tokens(self, start: int):
+        """Tokenize the text from an offset, yielding (token, start offset, end offset)."""
+        line_starts = [start]
+        for line in self.text[start:].splitlines(keepends=True):
+            line_starts.append(line_starts[-1] + len(line))
+        readline = io.StringIO(self.text[start:]).readline
+        for token in tokenize.generate_tokens(readline):
+            yield (
+                token,
+                line_starts[token.start[0] - 1] + token.start[1],
+                line_starts[token.end[0] - 1] + token.end[1],
+            )
+
+    def opening(self, node):
+        """Get the offset of the opening bracket of a call."""
+        for token, start, _ in self._tokens(self.offset(node)):
+            if token.type == tokenize.OP and token.string == "(":
+                return start
+        raise ValueError("The call has no opening bracket.")
+
+    def end(self, node):
+        """Get the offset just after the closing bracket of a call."""
+        depth = 0
+        for token, _, end in self._tokens(self.offset(node)):
+            if token.type != tokenize.OP:
+                continue
+            if token.string in "([{":
+                depth += 1
+            elif token.string in ")]}":
+                depth -= 1
+                if depth == 0:
+                    return end
+        raise ValueError("The call has no closing bracket.")
+
+    def get(self, node):
+        """Get the text of a call."""
+        start = self.offset(node)
+        end = self.end(node)
+        return self.text[start:end]
+
+    def line_indent(self, offset: int):
+        """Get the indentation of the line containing the offset."""
+        line_start = self.text.rfind("\n", 0, offset) + 1
+        return re.match(r"[ \t]*", self.text[line_start:]).group()
+
+    def apply(self):
+        """Return the text with the edits made."""
+        text = self.text
+        for start, end, replacement in sorted(self.edits, reverse=True):
+            text = text[:start] + replacement + text[end:]
+        return text
+
+
+def _get_call_name(call):
+    """Get the class name of a call, e.g. AddField for migrations.AddField(...)."""
+    if isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    return None
+
+
+def _get_keyword(call, keyword: str):
+    """Get the node of a keyword argument of a call, or None."""
+    for x in call.keywords:
+        if x.arg == keyword:
+            return x.value
+    return None
+
+
+def _get_literal(node):
+    """Get the value of a literal node, or None."""
+    if node is None:
+        return None
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+
+
+def _get_migration_class(tree):
+    """Get the Migration class of a migration file."""
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == "Migration":
+            return node
+    return None
+
+
+def _get_operations(migration):
+    """Get the operation calls at the top level of the operations of a Migration class."""
+    for node in migration.body:
+        if (
+            isinstance(node, ast.Assign)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+            and node.targets[0].id == "operations"
+            and isinstance(node.value, (ast.List, ast.Tuple))
+        ):
+            return [x for x in node.value.elts if isinstance(x, ast.Call)]
+    return []
+
+
+def _reindent(text: str, indent: str):
+    """Indent all but the first line of text, which is placed after existing indentation."""
+    return text.replace("\n", f"\n{indent}")
+
+
+def _without_index(source: _Source, call, field):
+    """Get the text of a field operation with db_index=False on its field."""
+    start = source.offset(call)
+    text = source.get(call)
+    db_index = _get_keyword(field, "db_index")
+    if db_index is not None:
+        offset = source.offset(db_index) - start
+        end = offset + len(re.match(r"\w+", text[offset:]).group())
+        return f"{text[:offset]}False{text[end:]}"
+
+    # An implicit index, e.g. of a ForeignKey, is turned off by adding db_index=False
+    offset = source.opening(field) + 1 - start
+    line_end = text.find("\n", offset)
+    if line_end != -1 and not text[offset:line_end].strip():
+        next_line = line_end + 1
+        indent = re.match(r"[ \t]*", text[next_line:]).group()
+        return f"{text[:line_end]}\n{indent}db_index=False,{text[line_end:]}"
+    return f"{text[:offset]}db_index=False, {text[offset:]}"
+
+
+def _split_field_operation(source: _Source, call, finding: dict):
+    """
+    Split a field operation into a SeparateDatabaseAndState, building its index concurrently.
+
+    The state keeps the operation as it was, while the database runs it with db_index=False
+    and then adds the index with AddIndexConcurrently, named as django would have named it.
+    Returns False if the index can't be built this way, e.g. the index of a unique field.
+    """
+    field = _get_keyword(call, "field")
+    if not isinstance(field, ast.Call):
+        return False
+    field_type = _get_call_name(field)
+    if field_type == "OneToOneField" or _get_literal(_get_keyword(field, "unique")) is True:
+        # The index is built by a unique constraint, which AddIndexConcurrently can't do
+        return False
+
+    # Field names are case sensitive, unlike model names
+    field_name = _get_literal(_get_keyword(call, "name"))
+    column = _get_literal(_get_keyword(field, "db_column"))
+    if not isinstance(column, str):
+        column = field_name
+        if field_type in RELATION_FIELDS:
+            column = f"{column}_id"
+    table = finding.get("table") or f"{finding['app']}_{finding['model']}"
+
+    start = source.offset(call)
+    indent = source.line_indent(start)
+    inner = indent + INDENT * 2
+    model_name = _get_literal(_get_keyword(call, "model_name"))
+    lines = [
+        "migrations.SeparateDatabaseAndState(",
+        f"{indent}{INDENT}state_operations=[",
+        f"{inner}{_reindent(source.get(call), INDENT * 2)},",
+        f"{indent}{INDENT}],",
+        f"{indent}{INDENT}database_operations=[",
+        f"{inner}{_reindent(_without_index(source, call, field), INDENT * 2)},",
+        f"{inner}AddIndexConcurrently(",
+        f'{inner}{INDENT}model_name="{model_name}",',
+        f"{inner}{INDENT}index=models.Index(",
+        f'{inner}{INDENT * 2}fields=["{field_name}"],',
+        f'{inner}{INDENT * 2}name="{create_index_name(table, column)}",',
+        f"{inner}{INDENT}),",
+        f"{inner}),",
+        f"{indent}{INDENT}],",
+        f"{indent})",
+    ]
+    source.edits.append((start, source.end(call), "\n".join(lines)))
+    return True
+
+
+def _make_concurrent(source: _Source, call):
+    """Turn an AddIndex into an AddIndexConcurrently."""
+    source.edits.append((source.offset(call), source.opening(call), "AddIndexConcurrently"))
+    return True
+
+
+def _get_index_name(call):
+    """Get the name of the index of an AddIndex, or None."""
+    index = _get_keyword(call, "index")
+    return _get_literal(_get_keyword(index, "name")) if isinstance(index, ast.Call) else None
+
+
+def _fix_finding(source: _Source, operations: list, finding: dict):
+    """Rewrite the operation of a finding, returning whether it could be."""
+    for call in operations:
+        model_name = _get_literal(_get_keyword(call, "model_name"))
+        if not isinstance(model_name, str) or model_name.lower() != finding["model"]:
+            continue
+        name = _get_call_name(call)
+        if (
+            name in FIELD_OPERATIONS
+            and finding.get("field") is not None
+            and str(_get_literal(_get_keyword(call, "name"))).lower() == finding["field"]
+        ):
+            return _split_field_operation(source, call, finding)
+        if (
+            name == "AddIndex"
+            and finding.get("index") is not None
+            and _get_index_name(call) == finding["index"]
+        ):
+            return _make_concurrent(source, call)
+    return False
+
+
+def _is_imported(tree, module: str, name: str):
+    """Check whether a name is imported from a module at the top level of a file."""
+    return any(
+        isinstance(x, ast.ImportFrom)
+        and x.module == module
+        and any(alias.name == name and alias.asname is None for alias in x.names)
+        for x in tree.body
+    )
+
+
+def _add_import(source: _Source, line: str):
+    """Add an import before the import from django.db, or after the last import."""
+    imports = [x for x in source.tree.body if isinstance(x, (ast.Import, ast.ImportFrom))]
+    for node in imports:
+        if isinstance(node, ast.ImportFrom) and node.module == "django.db":
+            offset = source.offset(node)
+            source.edits.append((offset, offset, f"{line}\n"))
+            return
+
+    following = [x for x in source.tree.body if imports and x.lineno > imports[-1].lineno]
+    if not following:
+        offset = len(source.text.rstrip())
+    else:
+        offset = len(source.text[: source.offset(following[0])].rstrip())
+    source.edits.append((offset, offset, f"\n{line}" if offset else f"{line}\n"))
+
+
+def _set_non_atomic(source: _Source, migration):
+    """Set atomic = False, postgres can't build an index concurrently in a transaction."""
+    for node in migration.body:
+        if (
+            isinstance(node, ast.Assign)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+            and node.targets[0].id == "atomic"
+        ):
+            if _get_literal(node.value) is not False:
+                offset = source.offset(node.value)
+                word = re.match(r"\w+", source.text[offset:]).group()
+                source.edits.append((offset, offset + len(word), "False"))
+            return
+
+    body = migration.body
+    if isinstance(body[0], ast.Expr) and isinstance(_get_literal(body[0].value), str):
+        # Keep the docstring first
+        body = body[1:] or body
+    offset = source.offset(body[0])
+    indent = source.line_indent(offset)
+    source.edits.append((offset, offset, f"atomic = False\n\n{indent}"))
+
+
+def fix_migration(path: str, findings: list):
+    """
+    Rewrite a migration so the new indices of its findings are built concurrently.
+
+    A field with db_index=True, or an implicit index e.g. of a ForeignKey, is split into a
+    SeparateDatabaseAndState which adds the index with AddIndexConcurrently, and an AddIndex
+    becomes an AddIndexConcurrently. The migration is made non-atomic, which postgres needs
+    to build an index concurrently. The rest of the file is left as it was.
+
+    Indices of a CreateModel, of a unique field or constraint, or from RunSQL aren't
+    rewritten. Returns the findings which were, the file is only written if there are any.
+    """
+    with open(path, encoding="utf-8", newline="") as file:
+        source = _Source(file.read())
+    migration = _get_migration_class(source.tree)
+    if migration is None:
+        return []
+
+    operations = _get_operations(migration)
+    fixed = [x for x in findings if _fix_finding(source, operations, x)]
+    if not fixed:
+        return []
+
+    if not _is_imported(source.tree, "django.contrib.postgres.operations", "AddIndexConcurrently"):
+        _add_import(source, CONCURRENT_IMPORT)
+    if any(x.get("field") is not None for x in fixed) and not _is_imported(
+        source.tree,
+        "django.db",
+        "models",
+    ):
+        _add_import(source, "from django.db import models")
+    _set_non_atomic(source, migration)
+
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write(source.apply())
+    return fixed
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""On-disk cache for the operations extracted from migration files."""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+from . import __version__
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Bump this whenever the shape of the cached data changes.
+CACHE_FORMAT = 14
+
+# Default size limit for the cache directory, in bytes.
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+class ParseCache:
+    """
+    Store the data extracted from each migration file, keyed by its contents.
+
+    Entries are keyed on a hash of the file contents, the checker version and the cache
+    format, so a cache directory can be shared between checkouts and CI runners. Each entry
+    records the path of the file relative to the project root for reference only.
+
+    The header of each migration file, its dependencies, is stored alongside its operations
+    under the same key. The cache also stores checkpoints of the models replayed from an
+    app's migrations. These are keyed on a rolling hash of every migration up to that point,
+    see chain_key.
+
+    Entries are written atomically, so any number of processes can read and write the same
+    cache directory. Once the directory grows beyond max_size the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str, root_path: str, max_size: int = DEFAULT_MAX_SIZE):
+        """Set up a cache in cache_dir for the project at root_path."""
+        self.cache_dir = cache_dir
+        self.root_path = root_path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source: bytes):
+        """Return the cache key for the given file contents."""
+        digest = hashlib.sha256()
+        digest.update(f"{__version__}:{CACHE_FORMAT}:".encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def chain_key(self, previous_key: str, file_name: str, source: bytes):
+        """Return the key for a migration file following the migrations in previous_key."""
+        return self.key(f"{previous_key}:{file_name}:".encode() + source)
+
+    def _entry_path(self, key: str, folder: str = ""):
+        """Return the location of the entry for a given key."""
+        return os.path.join(self.cache_dir, folder, key[:2], f"{key}.json")
+
+    def _read(self, path: str):
+        """Read an entry from the cache, or None if there is no valid entry."""
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            # Touch the entry so eviction removes the least recently used entries first.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry["data"]
+
+    def get(self, key: str):
+        """Return the cached data for a key, or None if there is no valid entry."""
+        data = self._read(self._entry_path(key))
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def set(self, key: str, file_path: str, data):
+        """Atomically write the data extracted from file_path to the cache."""
+        self._write(self._entry_path(key), file_path, data)
+
+    def get_header(self, key: str):
+        """Return the cached header of the migration file with the given key."""
+        return self._read(self._entry_path(key, "headers"))
+
+    def set_header(self, key: str, file_path: str, header: dict):
+        """Store the header of the migration file at file_path."""
+        self._write(self._entry_path(key, "headers"), file_path, header)
+
+    def get_checkpoint(self, key: str):
+        """Return the models replayed up to the migration with the given chain_key."""
+        return self._read(self._entry_path(key, "checkpoints"))
+
+    def set_checkpoint(self, key: str, file_path: str, models: dict):
+        """Store the models replayed up to and including the migration at file_path."""
+        self._write(self._entry_path(key, "checkpoints"), file_path, models)
+
+    def _write(self, path: str, file_path: str, data):
+        """Atomically write an entry to the cache."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "path": os.path.relpath(file_path, self.root_path).replace(os.sep, "/"),
+            "data": data,
+        }
+
+        # Write to a temporary file and move it into place so readers never see a
+        # partially written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(entry, file)
+            os.replace(tmp_path, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+
+    @contextlib.contextmanager
+    def _lock(self):
+        """Hold an exclusive lock on the cache directory."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is within max_size."""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        with self._lock():
+            entries = []
+            total_size = 0
+            for root, _dirs, files in os.walk(self.cache_dir):
+                for file in files:
+                    if not file.endswith(".json"):
+                        continue
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total_size += stat.st_size
+
+            if total_size <= self.max_size:
+                return
+
+            entries.sort()
+            for _mtime, size, path in entries:
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+                total_size -= size
+                if total_size <= self.max_size:
+                    break
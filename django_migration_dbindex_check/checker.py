@@ -3,14 +3,201 @@
 
 import ast
 import configparser
+import math
 import os
 import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from operator import itemgetter
 
+from .autofix import fix_migration
+from .cache import DEFAULT_MAX_SIZE, ParseCache
+from .estimate import (
+    DEFAULT_MB_PER_SECOND,
+    DEFAULT_ROWS_PER_SECOND,
+    INDEX_TYPES_ESTIMATED,
+    estimate_composite_index,
+    estimate_index,
+    format_duration,
+)
+from .fastparse import find_class_assignments, mentions_relevant_operations
+from .graph import MigrationGraph
+from .hooks import APP_EVENTS, HOOK_EVENTS, get_handlers
+from .metrics import write_metrics
+from .profiler import DEFAULT_TOP, NULL_PHASE, Profiler
+from .rewrite import DEFAULT_REWRITE, get_rewrite
+from .sql import DROP_INDEX, scan_sql
+from .state import (
+    ADD_CONSTRAINT,
+    ADD_FIELD,
+    ADD_INDEX,
+    ADD_INDEX_CONCURRENTLY,
+    ALTER_FIELD,
+    ALTER_MODEL_TABLE,
+    ALTER_UNIQUE_TOGETHER,
+    CREATE_MODEL,
+    OPERATION_KINDS,
+    REMOVE_CONSTRAINT,
+    REMOVE_INDEX,
+    REMOVE_INDEX_CONCURRENTLY,
+    RUN_SQL,
+    SEPARATE_DATABASE_AND_STATE,
+    TOGETHER_OPTIONS,
+    AppState,
+    FieldState,
+    IndexState,
+    ModelState,
+    Operation,
+    Removal,
+    Statement,
+    Validation,
+    dump_models,
+    load_models,
+    load_operations,
+    make_operation,
+    together_name,
+)
+from .stats import load_table_stats
+from .walker import SKIP_DIRS, GitIgnore, git_changed_files, git_commit_times, git_ls_files
+
+# Store a checkpoint of the replayed models after every this many migrations of an app.
+CHECKPOINT_INTERVAL = 100
+
+PARSERS = ("fast", "ast")
+
+# The assignments in a Migration class which relate it to other migrations.
+MIGRATION_HEADERS = ("replaces", "dependencies", "run_before")
+
+# Field classes which Django indexes unless they're given db_index=False.
+INDEXED_FIELD_TYPES = ("ForeignKey", "OneToOneField", "SlugField")
+# Field classes which are always unique, so always indexed.
+UNIQUE_FIELD_TYPES = ("OneToOneField",)
+# Field classes which never index their model's table. A ManyToManyField's indices are on the
+# through table, which is a new table created along with them.
+UNINDEXED_FIELD_TYPES = ("ManyToManyField",)
+# Constraint classes which are enforced with an index. Others, e.g. CheckConstraint, aren't.
+INDEX_CONSTRAINT_TYPES = ("UniqueConstraint", "ExclusionConstraint")
+# Constraint classes which scan the table to validate every row when they're added.
+VALIDATED_CONSTRAINT_TYPES = ("CheckConstraint",)
+# Field classes with a foreign key constraint unless they're given db_constraint=False.
+RELATION_FIELD_TYPES = ("ForeignKey", "OneToOneField")
+
 
 class DBIndexChecker:
     """Check and report on migrations with a new db_index."""
 
+    def __init__(
+        self,
+        cache_dir: str = None,
+        cache_max_size: int = None,
+        jobs: int = 1,
+        use_git: bool = None,
+        since: str = None,
+        parser: str = "ast",
+        profile: str = None,
+        profile_top: int = DEFAULT_TOP,
+        metrics: str = None,
+        hooks: list = (),
+        fail_fast: bool = False,
+        files: list = None,
+        table_stats: str = None,
+        min_table_rows: int = None,
+        min_table_size: int = None,
+        index_rows_per_second: float = None,
+        index_mb_per_second: float = None,
+        autofix: bool = False,
+        check_rewrites: bool = None,
+        rewrite_defaults: bool = None,
+        check_validations: bool = None,
+        check_removals: bool = None,
+    ):
+        """
+        Set up the checker.
+
+        cache_dir enables the parse cache, overriding the cache_dir config setting.
+        cache_max_size is the size limit of the cache directory in megabytes.
+        jobs is the number of processes used to check apps, 0 uses one per CPU.
+        use_git lists files with git ls-files, overriding the use_git config setting.
+        since is a git ref, only apps with migrations changed since this ref are checked.
+        parser is either "ast", to parse whole files, or "fast" to only parse the operations
+        of each migration.
+        profile is a path to write the time and memory used by each phase of the check to,
+        along with the profile_top slowest files and apps.
+        metrics is a path to write statistics of the check to, in the OpenMetrics format.
+        hooks is a list of subscribers to the events of the check, see add_hooks.
+        fail_fast stops the check at the first app with a new index, checking the apps with
+        the most recently modified migrations first.
+        files is a list of paths of migration files, relative to the project root, e.g. from
+        pre-commit. Only the apps containing these files are checked, without searching the
+        rest of the project.
+        table_stats is a path to a file of table statistics exported from the database, which
+        are used to rank the errors by table size, overriding the table_stats config setting.
+        If min_table_rows or min_table_size (in megabytes) are set, new indices on tables
+        below both thresholds aren't errors.
+        index_rows_per_second and index_mb_per_second are the throughputs used to estimate
+        how long each new index takes to build, given table statistics.
+        autofix rewrites the migrations of the new indices found to build them concurrently on
+        PostgreSQL, see autofix.fix_migration.
+        check_rewrites reports field changes which rewrite the table, e.g. changing the column
+        type, and rewrite_defaults new columns with a default too, which rewrite the table on
+        MySQL before 8.0.12 and postgres before 11. check_validations reports changes which
+        scan the table to validate every row while locking it, e.g. setting a field NOT NULL.
+        check_removals reports indices dropped without RemoveIndexConcurrently, which lock the
+        table. These override the config settings.
+        """
+        if parser not in PARSERS:
+            raise ValueError(f"parser must be one of {', '.join(PARSERS)}, not {parser}.")
+        self.parser = parser
+        self.since = since
+        self.use_git = use_git
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.cache_max_size = cache_max_size
+        self.profile = profile
+        self.profile_top = profile_top
+        self.metrics = metrics
+        self.fail_fast = fail_fast
+        self.files = files
+        self.table_stats = table_stats
+        self.min_table_rows = min_table_rows
+        self.min_table_size = min_table_size
+        self.index_rows_per_second = index_rows_per_second
+        self.index_mb_per_second = index_mb_per_second
+        self.autofix = autofix
+        self.check_rewrites = check_rewrites
+        self.rewrite_defaults = rewrite_defaults
+        self.check_validations = check_validations
+        self.check_removals = check_removals
+        self.tables = None
+        self.cache = None
+        self.graph = None
+        self.profiler = None
+        self._hooks = {event: [] for event in HOOK_EVENTS}
+        for subscriber in hooks:
+            self.add_hooks(subscriber)
+
+    def __getstate__(self):
+        """Leave out the hook subscribers when sent to a worker process, they may not pickle."""
+        state = self.__dict__.copy()
+        state["_hooks"] = {event: [] for event in HOOK_EVENTS}
+        return state
+
+    def add_hooks(self, subscriber):
+        """
+        Subscribe to the events of the check.
+
+        The subscriber is any object with methods named after the events it handles, usually
+        a subclass of hooks.CheckerHooks, see there for the events and their arguments.
+        """
+        for event, handler in get_handlers(subscriber).items():
+            self._hooks[event].append(handler)
+
+    def _emit(self, event: str, *args):
+        """Call the handlers of an event."""
+        for handler in self._hooks[event]:
+            handler(*args)
+
     def _walk_files(self, root_path: str):
         """
         Find all migrations files within the given path.
@@ -19,6 +206,15 @@ class DBIndexChecker:
          - There are a number of app folders, each containing a directory called migrations.
          - The migrations folder contains a number of .py files beginning with a four digit integer.
 
+        Directories matching exclude_paths or ignored by a .gitignore are never descended
+        into. If use_git is set the files are listed with git ls-files instead, falling back
+        to walking the directory tree if root_path isn't in a git work tree. If files is set,
+        only the migrations folders containing those files are listed.
+
+        If an app has a squashed migration, the migrations it replaces are left out. The
+        migrations of each app are ordered by their dependencies and run_before, and the
+        dependency graph of every migration is stored in self.graph.
+
         returns a list of dicts of all migration files:
             {
                 "<app_name>": {
@@ -39,197 +235,1050 @@ class DBIndexChecker:
         except KeyError:
             exclude_paths = []
 
+        use_git = self.use_git
+        if use_git is None:
+            use_git = self._get_boolean_setting(config, "use_git", False)
+
+        paths = None
+        if self.files is not None:
+            paths = self._list_migrations_folders(root_path, self.files)
+        elif use_git:
+            paths = git_ls_files(root_path)
+        if paths is None:
+            paths = self._walk_migration_paths(
+                root_path,
+                exclude_paths,
+                self._get_boolean_setting(config, "respect_gitignore", True),
+            )
+
         apps_list = {}
-        for root, _dirs, files in os.walk(root_path):
-            path_in_exclude = False
-            for path in exclude_paths:
-                if path in root:
-                    path_in_exclude = True
-            if path_in_exclude:
+        for path in paths:
+            app_name = self._get_app_name(root_path, path)
+            if app_name is None:
                 continue
 
-            if root.split(os.sep)[-1] != "migrations":
+            root = os.path.join(root_path, *path.split("/")[:-1])
+            if self._is_excluded(root, exclude_paths):
                 continue
 
-            app_name = root.split(os.sep)[-2]
             if app_name not in apps_list.keys():
                 apps_list[app_name] = {"migration_files": []}
 
-            for file in files:
-                # Migration files start with a four digit integer
+            # Migration files start with a four digit integer
+            file = path.split("/")[-1]
+            try:
+                int(file[:4])
+            except ValueError:
+                continue
+
+            apps_list[app_name]["migration_files"].append([file, os.path.join(root, file)])
+
+        headers = {}
+        for app_name, app in apps_list.items():
+            app["migration_files"].sort(key=itemgetter(0))
+            headers[app_name] = {}
+            for file_name, file_path in app["migration_files"]:
+                name = os.path.splitext(file_name)[0]
+                headers[app_name][name] = self._get_migration_header(file_path)
+            self._remove_replaced_migrations(app, headers[app_name])
+
+        # Replay the migrations of each app in the order of their dependencies
+        self.graph = MigrationGraph.from_headers(headers)
+        for app_name, app in apps_list.items():
+            files = {}
+            for migration_file in app["migration_files"]:
+                files.setdefault(os.path.splitext(migration_file[0])[0], []).append(migration_file)
+            app["migration_files"] = [
+                migration_file
+                for name in self.graph.app_order(app_name)
+                for migration_file in files[name]
+            ]
+
+        return apps_list
+
+    def _remove_replaced_migrations(self, app_dict: dict, headers: dict):
+        """
+        Remove the migrations replaced by a squashed migration from an app's migration files.
+
+        Replaying both the squashed migration and the ones it replaces would replay the same
+        history twice, so only the squashed migration is kept.
+        """
+        replaced = set()
+        for header in headers.values():
+            replaced.update(name for _app_label, name in header["replaces"])
+
+        if replaced:
+            app_dict["migration_files"] = [
+                x for x in app_dict["migration_files"] if os.path.splitext(x[0])[0] not in replaced
+            ]
+            for name in replaced:
+                headers.pop(name, None)
+
+    def _get_migration_header(self, file_path: str):
+        """
+        Get the replaces, dependencies and run_before lists of a migration file.
+
+        Each is a list of (app_label, migration_name) tuples. Dependencies which aren't
+        literal tuples, e.g. migrations.swappable_dependency(...), are left out. The header is
+        read from the parse cache if one is configured.
+        """
+        with open(file_path, "rb") as file:
+            source = file.read()
+
+        if self.cache is not None:
+            key = self.cache.key(source)
+            header = self.cache.get_header(key)
+            if header is not None:
+                return {name: [tuple(x) for x in header[name]] for name in MIGRATION_HEADERS}
+
+        # These are small, so only parse the assignments rather than the whole file
+        names = [x for x in MIGRATION_HEADERS if x.encode() in source]
+        values = {}
+        if names:
+            values = find_class_assignments(source, "Migration", names)
+            if values is None:
+                values = self._get_migration_class_values(source, names)
+
+        header = {}
+        for name in MIGRATION_HEADERS:
+            header[name] = []
+            for node in getattr(values.get(name), "elts", []):
                 try:
-                    int(file[:4])
-                except ValueError:
+                    app_label, migration_name = ast.literal_eval(node)
+                except (TypeError, ValueError):
                     continue
+                header[name].append((app_label, migration_name))
 
-                apps_list[app_name]["migration_files"].append([file, os.path.join(root, file)])
+        if self.cache is not None:
+            self.cache.set_header(key, file_path, header)
+        return header
 
-            apps_list[app_name]["migration_files"].sort(key=itemgetter(0))
+    def _get_app_name(self, root_path: str, path: str):
+        """
+        Get the name of the app a file belongs to from its path relative to root_path.
 
-        return apps_list
+        Returns None if the file isn't in a migrations folder.
+        """
+        parts = path.split("/")
+        if len(parts) < 2 or parts[-2] != "migrations":
+            return None
+
+        # The directory containing the migrations folder is the app
+        return os.path.join(root_path, *parts[:-1]).split(os.sep)[-2]
+
+    def _filter_changed_apps(self, apps: dict, root_path: str):
+        """Remove the apps with no migrations added or modified since the since ref."""
+        changed_apps = set()
+        for path in git_changed_files(root_path, self.since):
+            app_name = self._get_app_name(root_path, path)
+            if app_name is not None:
+                changed_apps.add(app_name)
+
+        for app in apps.keys():
+            if app not in changed_apps:
+                print(f"Skipping app:{app}, no migrations have changed since {self.since}.")
+
+        return {app: app_dict for app, app_dict in apps.items() if app in changed_apps}
+
+    def _is_excluded(self, path: str, exclude_paths: list):
+        """Check whether any of the exclude_paths appear anywhere in the path."""
+        return any(exclude_path in path for exclude_path in exclude_paths)
+
+    def _list_migrations_folders(self, root_path: str, files: list):
+        """
+        List the files in the migrations folders containing any of the given files.
+
+        Files which aren't in a migrations folder below root_path are ignored. Returns paths
+        relative to root_path using "/" as the separator.
+        """
+        folders = set()
+        for path in files:
+            relative_path = os.path.relpath(os.path.join(root_path, path), root_path)
+            parts = relative_path.split(os.sep)
+            if parts[0] != ".." and len(parts) >= 2 and parts[-2] == "migrations":
+                folders.add("/".join(parts[:-1]))
+
+        paths = []
+        for folder in sorted(folders):
+            try:
+                names = os.listdir(os.path.join(root_path, folder))
+            except OSError:
+                continue
+            paths += [f"{folder}/{name}" for name in sorted(names)]
+        return paths
 
-    def _get_all_relevant_operations_nodes_for_file(self, file_path):
-        """Get all the classes within the operations list for a given file."""
-        create_models = []
-        alter_fields = []
-        add_fields = []
+    def _walk_migration_paths(self, root_path: str, exclude_paths: list, respect_gitignore):
+        """
+        Walk the directory tree and return the paths of the files in migrations folders.
 
-        with open(file_path) as file:
-            node = ast.parse(file.read())
-            classes = [n for n in node.body if isinstance(n, ast.ClassDef)]
+        Directories which are excluded, ignored by git or can never contain migrations are
+        pruned before they're descended into. Returns paths relative to root_path using "/"
+        as the separator.
+        """
+        if self._is_excluded(root_path, exclude_paths):
+            return []
+
+        gitignore = GitIgnore()
+        paths = []
+        for root, dirs, files in os.walk(root_path):
+            relative_root = os.path.relpath(root, root_path).replace(os.sep, "/")
+            relative_root = "" if relative_root == "." else relative_root + "/"
+
+            if respect_gitignore and ".gitignore" in files:
+                gitignore.add_file(relative_root.rstrip("/"), os.path.join(root, ".gitignore"))
+
+            dirs[:] = [
+                x
+                for x in dirs
+                if x not in SKIP_DIRS
+                and not self._is_excluded(os.path.join(root, x), exclude_paths)
+                and not (respect_gitignore and gitignore.match(relative_root + x, is_dir=True))
+            ]
+
+            if os.path.basename(root) != "migrations":
+                continue
 
-            for cls in classes:
-                # There should only be one of these per file, but loop anyway
-                if cls.name != "Migration":
+            for file in files:
+                if respect_gitignore and gitignore.match(relative_root + file, is_dir=False):
                     continue
+                paths.append(relative_root + file)
 
-                # We're looking for 3 types of class, either migrations.CreateModel,
-                # migrations.AlterField, migrations.AddField.
-                # Check for these and parse each case
-                for assigns in [n for n in cls.body if isinstance(n, ast.Assign)]:
-                    if assigns.targets[0].id != "operations":
-                        continue
+        return paths
 
-                    create_models += [
-                        x for x in assigns.value.elts if x.func.attr == "CreateModel"
-                    ]
+    def _get_all_relevant_operations_nodes_for_file(self, file_path, source=None):
+        """Get all the operation nodes which are replayed, in order, for a given file."""
+        if source is None:
+            with open(file_path) as file:
+                source = file.read()
+
+        # Only the operations in OPERATION_KINDS are kept, e.g. migrations.AddField.
+        values = self._get_migration_class_values(source, ["operations"])
+        return self._filter_relevant_operations(values.get("operations"))
 
-                    alter_fields += [x for x in assigns.value.elts if x.func.attr == "AlterField"]
+    def _filter_relevant_operations(self, operations_node):
+        """Get the operations which are replayed from the node of an operations list."""
+        if operations_node is None:
+            return []
+        return [
+            x
+            for x in operations_node.elts
+            if isinstance(x, ast.Call) and self._get_call_name(x) in OPERATION_KINDS
+        ]
+
+    def _get_call_name(self, call):
+        """Get the name of the class called, e.g. AddField for migrations.AddField(...)."""
+        func = call.func
+        return func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+
+    def _get_migration_class_values(self, source: bytes, names: list):
+        """Parse a whole migration file and get the values assigned to names in Migration."""
+        values = {}
+        for cls in [n for n in ast.parse(source).body if isinstance(n, ast.ClassDef)]:
+            if cls.name != "Migration":
+                continue
 
-                    add_fields += [x for x in assigns.value.elts if x.func.attr == "AddField"]
+            for assigns in [n for n in cls.body if isinstance(n, ast.Assign)]:
+                target = assigns.targets[0]
+                if isinstance(target, ast.Name) and target.id in names:
+                    values[target.id] = assigns.value
+
+        return values
+
+    def _get_all_relevant_operations_nodes_fast(self, file_path, source: bytes):
+        """
+        Get the same nodes as _get_all_relevant_operations_nodes_for_file, more cheaply.
+
+        Files which don't mention any of the relevant operations are skipped without being
+        parsed, and only the operations list of the Migration class is parsed for the rest.
+        Falls back to parsing the whole file if the operations list can't be found.
+        """
+        if not mentions_relevant_operations(source):
+            return []
 
-        return create_models, alter_fields, add_fields
+        values = find_class_assignments(source, "Migration", ["operations"])
+        if values is None or "operations" not in values:
+            return self._get_all_relevant_operations_nodes_for_file(file_path, source)
+
+        return self._filter_relevant_operations(values["operations"])
 
     def _check_for_db_index_in_field_object(self, field_object):
-        """Check for db_index keyword in kwargs and return value."""
-        dbindex = [x.value.value for x in field_object.keywords if x.arg == "db_index"]
-        return dbindex[0] if len(dbindex) > 0 else False
+        """
+        Check whether a field has an index, either from its db_index keyword or by default.
 
-    def _create_models_to_models_dict(
-        self,
-        models_dict: dict,
-        create_models_list: list,
-        migration_number: int,
-    ):
-        """Turn a list of CreateModels classes to model dicts and add to overall dict."""
+        Django indexes unique fields, and relations and slugs unless they're given
+        db_index=False. Primary keys are left out as they're created with their table.
+        """
+        field_type = self._get_field_type(field_object)[0]
+        if field_type in UNINDEXED_FIELD_TYPES:
+            return False
+        if self._get_bool_keyword(field_object, "primary_key", False):
+            return False
+        if field_type in UNIQUE_FIELD_TYPES or self._get_bool_keyword(
+            field_object,
+            "unique",
+            False,
+        ):
+            return True
+        return self._get_bool_keyword(field_object, "db_index", field_type in INDEXED_FIELD_TYPES)
 
-        for create_model in create_models_list:
+    def _is_implicit_index(self, field_object):
+        """Check whether a field is indexed by default, rather than by db_index=True."""
+        return self._check_for_db_index_in_field_object(
+            field_object,
+        ) and not self._get_bool_keyword(field_object, "db_index", False)
 
-            fields = {}
+    def _is_unique_index(self, field_object):
+        """Check whether the index of a field is unique, e.g. of a OneToOneField."""
+        return self._check_for_db_index_in_field_object(field_object) and (
+            self._get_field_type(field_object)[0] in UNIQUE_FIELD_TYPES
+            or self._get_bool_keyword(field_object, "unique", False)
+        )
 
-            # This try except exists because of a breaking change in the ast package
-            # introduced in python 3.8.
-            # https://docs.python.org/3/library/ast.html#variables
-            # As of 3.8 all variables set as string constants will be parsed as ast.Constant
-            # as opposed to ast.Str, the value is stored in Constant.value as opposed to
-            # Str.s.
-            # This can be removed when python < 3.8 support is no longer required.
-            try:
-                model_name = [x.value.value for x in create_model.keywords if x.arg == "name"][0]
-            except AttributeError:
-                model_name = [x.value.s for x in create_model.keywords if x.arg == "name"][0]
+    def _get_bool_keyword(self, call, keyword: str, default: bool):
+        """Get the value of a literal True or False keyword argument, or the default."""
+        for x in call.keywords:
+            if x.arg == keyword:
+                # The value of an ast.Constant, or ast.NameConstant before python 3.8
+                value = getattr(x.value, "value", None)
+                return value if isinstance(value, bool) else default
+        return default
+
+    def _get_string_keyword(self, call, keyword: str):
+        """Get the value of a string keyword argument from an ast.Call node."""
+        # This try except exists because of a breaking change in the ast package
+        # introduced in python 3.8.
+        # https://docs.python.org/3/library/ast.html#variables
+        # As of 3.8 all variables set as string constants will be parsed as ast.Constant
+        # as opposed to ast.Str, the value is stored in Constant.value as opposed to
+        # Str.s.
+        # This can be removed when python < 3.8 support is no longer required.
+        try:
+            return [x.value.value for x in call.keywords if x.arg == keyword][0]
+        except AttributeError:
+            return [x.value.s for x in call.keywords if x.arg == keyword][0]
+
+    def _get_keyword_node(self, call, keyword: str):
+        """Get the node of a keyword argument of an ast.Call node, or None."""
+        nodes = [x.value for x in call.keywords if x.arg == keyword]
+        return nodes[0] if nodes else None
+
+    def _get_literal(self, node):
+        """Get the value of a literal node, or None if it isn't one."""
+        if node is None:
+            return None
+        try:
+            return ast.literal_eval(node)
+        except (TypeError, ValueError, SyntaxError):
+            return None
+
+    def _get_option_node(self, call, option: str):
+        """Get the node of an option from the options dict of a CreateModel node, or None."""
+        options = self._get_keyword_node(call, "options")
+        if not isinstance(options, ast.Dict):
+            return None
+
+        for key, value in zip(options.keys, options.values):
+            if key is not None and self._get_literal(key) == option:
+                return value
+        return None
+
+    def _get_option(self, call, option: str):
+        """Get the value of a literal option from the options dict of a CreateModel node."""
+        return self._get_literal(self._get_option_node(call, option))
+
+    def _get_index_fields(self, call):
+        """
+        Get the fields covered by an index or constraint node, e.g. models.Index(fields=[...]).
+
+        The fields of expressions, e.g. Lower("name") in a functional index or the
+        expressions of an ExclusionConstraint, are the first field named in each expression.
+        """
+        # Descending fields are prefixed with -
+        fields = self._get_literal(self._get_keyword_node(call, "fields")) or []
+        fields = [x.lstrip("-") for x in fields]
+
+        expressions = list(call.args)
+        node = self._get_keyword_node(call, "expressions")
+        if isinstance(node, (ast.List, ast.Tuple)):
+            expressions += node.elts
+        for expression in expressions:
+            for child in ast.walk(expression):
+                value = self._get_literal(child)
+                if isinstance(value, str):
+                    fields.append(value)
+                    break
+        return fields
+
+    def _get_together(self, node):
+        """Get the field tuples of an index_together or unique_together node."""
+        if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "set":
+            # set() isn't a literal before python 3.9
+            return []
+        value = self._get_literal(node)
+        if not value:
+            return []
+
+        value = list(value)
+        if isinstance(value[0], str):
+            # A single tuple of fields, which Django allows too
+            value = [value]
+        return sorted(tuple(x) for x in value)
+
+    def _extract_index(self, kind: str, model_name: str, call, constraint: bool):
+        """
+        Turn an index or constraint node into an Operation, or None if it has no index.
+
+        The operation is of the kind given, e.g. AddIndex, or CreateModel for an index in the
+        options of a CreateModel. Constraints without an index are None, except that an
+        AddConstraint of a CheckConstraint is kept as it scans the table.
+        """
+        index_type = self._get_call_name(call)
+        if constraint and index_type not in INDEX_CONSTRAINT_TYPES:
+            if kind != ADD_CONSTRAINT or index_type not in VALIDATED_CONSTRAINT_TYPES:
+                return None
+
+        fields = self._get_index_fields(call)
+        name = self._get_literal(self._get_keyword_node(call, "name"))
+        if not isinstance(name, str):
+            name = together_name(index_type, fields)
+        return make_operation(
+            kind,
+            model_name,
+            None,
+            False,
+            name,
+            index_type,
+            None,
+            fields,
+            kind == ADD_INDEX_CONCURRENTLY,
+        )
+
+    def _get_sql(self, call):
+        """Get the SQL of a RunSQL node as a string, or None if it isn't a literal."""
+        node = call.args[0] if call.args else self._get_keyword_node(call, "sql")
+        sql = self._get_literal(node)
+        if isinstance(sql, str):
+            return sql
+        if not isinstance(sql, (list, tuple)):
+            return None
+        # A list of statements, or of (statement, params) tuples
+        return ";\n".join(x if isinstance(x, str) else str(x[0]) for x in sql)
+
+    def _builds_index_with_lock(self, call):
+        """
+        Check whether a database operation of a SeparateDatabaseAndState may lock a table.
+
+        Only a RunSQL whose SQL can't be read is assumed to, the statements of other RunSQLs
+        and model operations, e.g. AddIndex, are replayed and checked themselves.
+        """
+        return self._get_call_name(call) == RUN_SQL and self._get_sql(call) is None
+
+    def _extract_sql_operations(self, call):
+        """Get an Operation for each statement in the SQL of a RunSQL which the scanner finds."""
+        sql = self._get_sql(call)
+        if sql is None:
+            return []
+        return [
+            make_operation(
+                RUN_SQL,
+                statement.table,
+                None,
+                False,
+                statement.name,
+                statement.kind,
+                None,
+                statement.columns,
+                statement.lock_free,
+            )
+            for statement in scan_sql(sql)
+        ]
+
+    def _extract_separate_operations(self, call):
+        """
+        Get the Operations of a SeparateDatabaseAndState.
+
+        Its state_operations change the models without running anything, so they're lock free
+        unless its database_operations include a RunSQL whose SQL can't be read. The SQL and
+        model operations in its database_operations do change the database, so they're checked
+        too, e.g. a RunSQL CREATE INDEX without CONCURRENTLY is found. Like Django, they come
+        first and don't change the models, so they're marked database_only.
+        """
+        database_node = self._get_keyword_node(call, "database_operations")
+        state_node = self._get_keyword_node(call, "state_operations")
+        database_calls = []
+        if isinstance(database_node, (ast.List, ast.Tuple)):
+            database_calls = [x for x in database_node.elts if isinstance(x, ast.Call)]
+        lock_free = not any(self._builds_index_with_lock(x) for x in database_calls)
+
+        operations = []
+        if isinstance(database_node, (ast.List, ast.Tuple)):
+            operations = [
+                x._replace(database_only=True)
+                for x in self._extract_operations(self._filter_relevant_operations(database_node))
+            ]
+        if isinstance(state_node, (ast.List, ast.Tuple)):
+            operations += [
+                x._replace(lock_free=lock_free)
+                for x in self._extract_operations(self._filter_relevant_operations(state_node))
+            ]
+        return operations
+
+    def _extract_model_indexes(self, call, model_name: str):
+        """Get Operations for the indices and constraints in the options of a CreateModel."""
+        operations = []
+        for option in ["indexes", "constraints"]:
+            node = self._get_option_node(call, option)
+            if not isinstance(node, (ast.List, ast.Tuple)):
+                continue
+            for index in node.elts:
+                operation = self._extract_index(
+                    CREATE_MODEL,
+                    model_name,
+                    index,
+                    option == "constraints",
+                )
+                if operation is not None:
+                    operations.append(operation)
+
+        for option in TOGETHER_OPTIONS.values():
+            for fields in self._get_together(self._get_option_node(call, option)):
+                operations.append(
+                    make_operation(
+                        CREATE_MODEL,
+                        model_name,
+                        None,
+                        False,
+                        None,
+                        option,
+                        None,
+                        fields,
+                    ),
+                )
+        return operations
 
-            fields_list = [x for x in create_model.keywords if x.arg == "fields"][0]
+    def _get_field_type(self, field_object):
+        """Get the class name of a field, e.g. CharField, and its literal max_length if set."""
+        field_type = self._get_call_name(field_object)
 
-            for field in fields_list.value.elts:
-                # This is now a list of tuples, first element is field ID, second is model class
-                index_added = self._check_for_db_index_in_field_object(field.elts[1])
+        max_length = None
+        for keyword in field_object.keywords:
+            if keyword.arg == "max_length":
                 try:
-                    fields[field.elts[0].value.lower()] = {
-                        "is_index": index_added,
-                        "index_added": migration_number if index_added else False,
-                    }
-                except AttributeError:
-                    fields[field.elts[0].s.lower()] = {
-                        "is_index": index_added,
-                        "index_added": migration_number if index_added else False,
-                    }
-
-            models_dict[model_name.lower()] = fields
-
-    def _alter_fields_to_models_dict(
-        self,
-        models_dict: dict,
-        alter_fields_list: list,
-        migration_number: int,
-    ):
-        """Use the AlterField instances to mutate the models_dict."""
-        for alter_field in alter_fields_list:
-            # This try except exists because of a breaking change in the ast package
-            # introduced in python 3.8.
-            # https://docs.python.org/3/library/ast.html#variables
-            # As of 3.8 all variables set as string constants will be parsed as ast.Constant
-            # as opposed to ast.Str, the value is stored in Constant.value as opposed to
-            # Str.s.
-            # This can be removed when python < 3.8 support is no longer required.
-            try:
-                model_name = [
-                    x.value.value for x in alter_field.keywords if x.arg == "model_name"
-                ][0]
-            except AttributeError:
-                model_name = [x.value.s for x in alter_field.keywords if x.arg == "model_name"][0]
-            model_name = model_name.lower()
+                    max_length = ast.literal_eval(keyword.value)
+                except ValueError:
+                    pass
+        return field_type, max_length if isinstance(max_length, int) else None
 
+    def _get_field_options(self, field_object):
+        """Get the options of a field which decide whether changing it locks the table."""
+        default = self._get_keyword_node(field_object, "default")
+        has_default = default is not None
+        if has_default:
             try:
-                field_name = [x.value.value for x in alter_field.keywords if x.arg == "name"][0]
-            except AttributeError:
-                field_name = [x.value.s for x in alter_field.keywords if x.arg == "name"][0]
-            field_name = field_name.lower()
+                has_default = ast.literal_eval(default) is not None
+            except (ValueError, TypeError, SyntaxError):
+                # e.g. a callable such as timezone.now, which is called for the existing rows
+                pass
+        return {
+            "null": self._get_bool_keyword(field_object, "null", False),
+            "has_default": has_default,
+            "db_constraint": self._get_call_name(field_object) in RELATION_FIELD_TYPES
+            and self._get_bool_keyword(field_object, "db_constraint", True),
+            "implicit_index": self._is_implicit_index(field_object),
+            "unique": self._is_unique_index(field_object),
+        }
 
-            field_object = [x.value for x in alter_field.keywords if x.arg == "field"][0]
-            is_index = self._check_for_db_index_in_field_object(field_object)
+    def _extract_operations(self, nodes: list):
+        """
+        Turn the operation nodes of a migration file into a list of Operation tuples.
 
-            try:
-                models_dict[model_name][field_name]
-            except KeyError:
-                raise KeyError(
-                    f"Cannot find the original model ({model_name}) or field ({field_name}) "
-                    f"which is being changed. This most likely means your migrations are "
-                    f"broken.",
+        Only the information needed to replay the migrations is kept, so the AST can be
+        discarded straight after parsing and the result can be stored in the parse cache.
+        """
+        operations = []
+
+        for node in nodes:
+            name = self._get_call_name(node)
+            if name == ALTER_MODEL_TABLE:
+                operations.append(
+                    make_operation(
+                        ALTER_MODEL_TABLE,
+                        self._get_string_keyword(node, "name"),
+                        None,
+                        False,
+                        self._get_string_keyword(node, "table"),
+                    ),
+                )
+            elif name == CREATE_MODEL:
+                model_name = self._get_string_keyword(node, "name")
+                operations.append(
+                    make_operation(
+                        CREATE_MODEL,
+                        model_name,
+                        None,
+                        False,
+                        self._get_option(node, "db_table"),
+                    ),
                 )
 
-            if not models_dict[model_name][field_name]["is_index"] and is_index:
-                models_dict[model_name][field_name]["index_added"] = migration_number
+                fields_list = [x for x in node.keywords if x.arg == "fields"][0]
+                for field in fields_list.value.elts:
+                    # This is a tuple, first element is field ID, second is model class
+                    try:
+                        field_name = field.elts[0].value
+                    except AttributeError:
+                        field_name = field.elts[0].s
+                    operations.append(
+                        make_operation(
+                            CREATE_MODEL,
+                            model_name,
+                            field_name,
+                            self._check_for_db_index_in_field_object(field.elts[1]),
+                            None,
+                            *self._get_field_type(field.elts[1]),
+                            **self._get_field_options(field.elts[1]),
+                        ),
+                    )
+                operations += self._extract_model_indexes(node, model_name)
+            elif name in (ADD_INDEX, ADD_CONSTRAINT, ADD_INDEX_CONCURRENTLY):
+                constraint = name == ADD_CONSTRAINT
+                operation = self._extract_index(
+                    name,
+                    self._get_string_keyword(node, "model_name"),
+                    self._get_keyword_node(node, "constraint" if constraint else "index"),
+                    constraint,
+                )
+                if operation is not None:
+                    operations.append(operation)
+            elif name in (REMOVE_INDEX, REMOVE_CONSTRAINT, REMOVE_INDEX_CONCURRENTLY):
+                operations.append(
+                    make_operation(
+                        name,
+                        self._get_string_keyword(node, "model_name"),
+                        None,
+                        False,
+                        self._get_string_keyword(node, "name"),
+                    ),
+                )
+            elif name == SEPARATE_DATABASE_AND_STATE:
+                operations += self._extract_separate_operations(node)
+            elif name == RUN_SQL:
+                operations += self._extract_sql_operations(node)
+            elif name in TOGETHER_OPTIONS:
+                option = TOGETHER_OPTIONS[name]
+                operations.append(
+                    make_operation(
+                        name,
+                        self._get_string_keyword(node, "name"),
+                        None,
+                        False,
+                        None,
+                        None,
+                        None,
+                        self._get_together(self._get_keyword_node(node, option)),
+                    ),
+                )
+            else:
+                field_object = [x.value for x in node.keywords if x.arg == "field"][0]
+                operations.append(
+                    make_operation(
+                        name,
+                        self._get_string_keyword(node, "model_name"),
+                        self._get_string_keyword(node, "name"),
+                        self._check_for_db_index_in_field_object(field_object),
+                        None,
+                        *self._get_field_type(field_object),
+                        **self._get_field_options(field_object),
+                    ),
+                )
+
+        return operations
+
+    def _get_operations_for_file(self, file_path: str):
+        """
+        Get the list of Operations to replay for a given file.
+
+        The operations are read from the parse cache if one is configured, otherwise the file
+        is parsed and the result stored in the cache for next time.
+        """
+        if not self._hooks["on_file_parsed"]:
+            return self._read_operations_for_file(file_path)
+
+        start = time.perf_counter()
+        operations = self._read_operations_for_file(file_path)
+        duration = time.perf_counter() - start
+        op_counts = Counter(
+            x.kind
+            for x in operations
+            if x.kind != CREATE_MODEL or (x.field is None and x.fields is None)
+        )
+        self._emit("on_file_parsed", file_path, duration, dict(op_counts))
+        return operations
 
-            models_dict[model_name][field_name]["is_index"] = is_index
+    def _read_operations_for_file(self, file_path: str):
+        """Read the operations of a file from the cache, or parse them."""
+        with self._phase("parse", file_path):
+            with open(file_path, "rb") as file:
+                source = file.read()
 
-    def _add_fields_to_models_dict(
+            if self.cache is not None:
+                key = self.cache.key(source)
+                operations = self.cache.get(key)
+                if operations is not None:
+                    self._count("files_cached")
+                    return load_operations(operations)
+
+            if self.parser == "fast":
+                nodes = self._get_all_relevant_operations_nodes_fast(file_path, source)
+            else:
+                nodes = self._get_all_relevant_operations_nodes_for_file(file_path, source)
+            operations = self._extract_operations(nodes)
+            self._count("files_parsed")
+
+            if self.cache is not None:
+                self.cache.set(key, file_path, operations)
+
+            return operations
+
+    def _apply_operations(self, models_dict: dict, operations: list, migration_number: str):
+        """
+        Replay the operations of a migration file on the models_dict.
+
+        The model operations marked database_only are replayed on a copy of the models, from
+        before their SeparateDatabaseAndState, and only their findings are kept, see
+        _merge_database_state. Statements of a RunSQL only ever change the database, so they're
+        replayed as usual.
+        """
+        database_states = []
+        database_state = None
+        for operation in operations:
+            if not operation.database_only:
+                database_state = None
+                self._apply_operation(models_dict, operation, migration_number)
+            elif operation.kind == RUN_SQL:
+                self._apply_operation(models_dict, operation, migration_number)
+            else:
+                if database_state is None:
+                    database_state = load_models(dump_models(models_dict))
+                    database_state.validations = []
+                    database_state.removals = []
+                    database_states.append(database_state)
+                self._apply_operation(database_state, operation, migration_number)
+
+        for database_state in database_states:
+            self._merge_database_state(models_dict, database_state, migration_number)
+
+    def _merge_database_state(
         self,
-        models_dict: dict,
-        add_fields_list: list,
-        migration_number: int,
+        models_dict: AppState,
+        database_state: AppState,
+        migration_number: str,
     ):
-        """Use the AddField instances to mutate the models_dict."""
-        for add_field in add_fields_list:
-            # This try except exists because of a breaking change in the ast package
-            # introduced in python 3.8.
-            # https://docs.python.org/3/library/ast.html#variables
-            # As of 3.8 all variables set as string constants will be parsed as ast.Constant
-            # as opposed to ast.Str, the value is stored in Constant.value as opposed to
-            # Str.s.
-            # This can be removed when python < 3.8 support is no longer required.
-            try:
-                model_name = [x.value.value for x in add_field.keywords if x.arg == "model_name"][
-                    0
-                ]
-            except AttributeError:
-                model_name = [x.value.s for x in add_field.keywords if x.arg == "model_name"][0]
-            model_name = model_name.lower()
+        """
+        Keep the findings of the database_operations replayed on database_state.
 
-            try:
-                field_name = [x.value.value for x in add_field.keywords if x.arg == "name"][0]
-            except AttributeError:
-                field_name = [x.value.s for x in add_field.keywords if x.arg == "name"][0]
-            field_name = field_name.lower()
-
-            field_object = [x.value for x in add_field.keywords if x.arg == "field"][0]
-            is_index = self._check_for_db_index_in_field_object(field_object)
-
-            # This is now a list of tuples, first element is field ID, second is model class
-            models_dict[model_name][field_name.lower()] = {
-                "is_index": is_index,
-                "index_added": migration_number if is_index else False,
-            }
+        Their validations and removals are kept, and the fields and Meta indices of the models
+        which they built an index for while locking the table, or rewrote, are marked so. The
+        rest of the models, e.g. a db_index=False only in the database, are left as they are.
+        """
+        models_dict.validations += database_state.validations
+        models_dict.removals += database_state.removals
+        for model_name, database_model in database_state.items():
+            model = models_dict.get(model_name)
+            if model is None:
+                continue
+            for field_name, database_field in database_model.items():
+                field = model.get(field_name)
+                if field is None:
+                    continue
+                if (
+                    database_field.is_index
+                    and not database_field.lock_free
+                    and database_field.index_added == migration_number
+                    and field.is_index
+                ):
+                    field.index_added = migration_number
+                    field.lock_free = False
+                if database_field.rewrite_added == migration_number:
+                    field.rewrite = database_field.rewrite
+                    field.rewrite_added = migration_number
+            for name, database_index in database_model.indexes.items():
+                index = model.indexes.get(name)
+                if (
+                    index is not None
+                    and not database_index.lock_free
+                    and database_index.index_added == migration_number
+                ):
+                    index.index_added = migration_number
+                    index.lock_free = False
+
+    def _apply_operation(self, models_dict: dict, operation: Operation, migration_number: str):
+        """Replay a single operation of a migration file on the models_dict."""
+        if operation.kind == CREATE_MODEL and operation.fields is not None:
+            # An index or constraint in the options of a new model
+            self._add_index(models_dict, operation, migration_number)
+        elif operation.kind == CREATE_MODEL and operation.field is None:
+            models_dict[operation.model] = ModelState(operation.value, migration_number)
+        elif operation.kind == ALTER_MODEL_TABLE:
+            self._alter_model_table(models_dict, operation)
+        elif operation.field_type in VALIDATED_CONSTRAINT_TYPES:
+            self._add_validation(
+                models_dict,
+                operation,
+                f"adding {operation.field_type}:{operation.value}",
+                migration_number,
+            )
+        elif operation.kind in (ADD_INDEX, ADD_CONSTRAINT, ADD_INDEX_CONCURRENTLY):
+            self._add_index(models_dict, operation, migration_number)
+        elif operation.kind in (REMOVE_INDEX, REMOVE_CONSTRAINT, REMOVE_INDEX_CONCURRENTLY):
+            index = self._get_model(models_dict, operation).indexes.pop(operation.value, None)
+            if operation.kind == REMOVE_INDEX:
+                self._add_removal(models_dict, operation, operation.value, migration_number)
+            elif operation.kind == REMOVE_CONSTRAINT and index is not None:
+                # Only the constraints with an index are kept, e.g. a UniqueConstraint
+                self._add_removal(
+                    models_dict,
+                    operation,
+                    operation.value,
+                    migration_number,
+                    constraint=True,
+                )
+        elif operation.kind in TOGETHER_OPTIONS:
+            self._alter_together(models_dict, operation, migration_number)
+        elif operation.kind == ALTER_FIELD:
+            self._alter_field(models_dict, operation, migration_number)
+        elif operation.kind == RUN_SQL:
+            self._run_sql(models_dict, operation, migration_number)
+        else:
+            # Fields of a new model are added in the same way as AddField
+            self._add_field(models_dict, operation, migration_number)
+
+    def _alter_field(self, models_dict: dict, operation: Operation, migration_number: str):
+        """
+        Use an AlterField operation to mutate the models_dict.
+
+        A new index is built when the field wasn't indexed before, or when its index changes
+        between unique and not unique, e.g. a ForeignKey made into a OneToOneField. Whether
+        the index is implicit, e.g. of a ForeignKey given db_index=True, doesn't matter.
+        """
+        try:
+            field = models_dict[operation.model][operation.field]
+        except KeyError:
+            raise KeyError(
+                f"Cannot find the original model ({operation.model}) or field "
+                f"({operation.field}) which is being changed. This most likely means your "
+                f"migrations are broken.",
+            )
+
+        if operation.db_index and (not field.is_index or field.unique != operation.unique):
+            field.index_added = migration_number
+            field.lock_free = operation.lock_free
+
+        rewrite = get_rewrite(
+            field.field_type,
+            field.max_length,
+            operation.field_type,
+            operation.max_length,
+        )
+        if rewrite is not None and not operation.lock_free:
+            field.rewrite = rewrite
+            field.rewrite_added = migration_number
+
+        if field.null and not operation.null:
+            reason = f"setting field:{operation.field} NOT NULL"
+            self._add_validation(models_dict, operation, reason, migration_number)
+        if operation.db_constraint and not field.db_constraint:
+            reason = f"adding a foreign key constraint to field:{operation.field}"
+            self._add_validation(models_dict, operation, reason, migration_number)
+        if field.is_index and (not operation.db_index or field.unique != operation.unique):
+            self._add_removal(
+                models_dict,
+                operation,
+                None,
+                migration_number,
+                constraint=field.unique,
+            )
+
+        field.is_index = operation.db_index
+        field.field_type = operation.field_type
+        field.max_length = operation.max_length
+        field.null = operation.null
+        field.db_constraint = operation.db_constraint
+        field.implicit_index = operation.implicit_index
+        field.unique = operation.unique
+
+    def _add_validation(
+        self,
+        models_dict: AppState,
+        operation: Operation,
+        reason: str,
+        migration_number: str,
+    ):
+        """
+        Record a change which scans the table to validate every row, unless it's lock free.
+
+        The table of a model created in the same migration is empty, so it isn't recorded.
+        """
+        if not operation.lock_free and not self._is_new_model(
+            models_dict,
+            operation,
+            migration_number,
+        ):
+            models_dict.validations.append(
+                Validation(operation.model, operation.field, reason, migration_number),
+            )
+
+    def _add_removal(
+        self,
+        models_dict: AppState,
+        operation: Operation,
+        name: str,
+        migration_number: str,
+        constraint: bool = False,
+    ):
+        """
+        Record an index dropped while locking the table, unless it's lock free.
+
+        constraint is True for the index of a unique constraint, which has no concurrent
+        alternative.
+        """
+        if not operation.lock_free:
+            models_dict.removals.append(
+                Removal(operation.model, operation.field, name, migration_number, constraint),
+            )
+
+    def _alter_model_table(self, models_dict: dict, operation: Operation):
+        """Use an AlterModelTable operation to change the table of a model."""
+        try:
+            models_dict[operation.model].db_table = operation.value
+        except KeyError:
+            raise KeyError(
+                f"Cannot find the original model ({operation.model}) whose table is being "
+                f"changed. This most likely means your migrations are broken.",
+            )
+
+    def _is_new_model(self, models_dict: dict, operation: Operation, migration_number: str):
+        """Check whether the model of an operation was created by the current migration."""
+        return getattr(models_dict.get(operation.model), "created", None) == migration_number
+
+    def _get_model(self, models_dict: dict, operation: Operation):
+        """Get the model whose indices an operation changes."""
+        try:
+            return models_dict[operation.model]
+        except KeyError:
+            raise KeyError(
+                f"Cannot find the original model ({operation.model}) whose indices are being "
+                f"changed. This most likely means your migrations are broken.",
+            )
+
+    def _add_index(self, models_dict: dict, operation: Operation, migration_number: str):
+        """
+        Use an AddIndex or AddConstraint operation, or an index of a new model.
+
+        The indices of a model created in the same migration are built on an empty table, so
+        they're lock free, whether they're in its options or a later AddIndex.
+        """
+        name = operation.value
+        if name is None:
+            name = together_name(operation.field_type, operation.fields)
+        self._get_model(models_dict, operation).indexes[name] = IndexState(
+            operation.field_type,
+            operation.fields,
+            migration_number,
+            operation.lock_free or self._is_new_model(models_dict, operation, migration_number),
+        )
+
+    def _alter_together(self, models_dict: dict, operation: Operation, migration_number: str):
+        """
+        Use an AlterIndexTogether or AlterUniqueTogether operation to mutate the models_dict.
+
+        The operation sets the whole option, so groups of fields which aren't in it any more
+        are removed, and only the new groups are new indices.
+        """
+        option = TOGETHER_OPTIONS[operation.kind]
+        indexes = self._get_model(models_dict, operation).indexes
+        groups = {together_name(option, fields): fields for fields in operation.fields}
+
+        for name in [x for x, y in indexes.items() if y.index_type == option]:
+            if name not in groups:
+                del indexes[name]
+                self._add_removal(
+                    models_dict,
+                    operation,
+                    name,
+                    migration_number,
+                    constraint=operation.kind == ALTER_UNIQUE_TOGETHER,
+                )
+        lock_free = operation.lock_free or self._is_new_model(
+            models_dict,
+            operation,
+            migration_number,
+        )
+        for name, fields in groups.items():
+            if name not in indexes:
+                indexes[name] = IndexState(option, fields, migration_number, lock_free)
+
+    def _run_sql(self, models_dict: AppState, operation: Operation, migration_number: str):
+        """
+        Use a statement of a RunSQL to mutate the models_dict.
+
+        A DROP INDEX removes the statements and Meta indices of that name, as its table isn't
+        in the statement, and is recorded as a removal of the model with that index, if any.
+        Other statements are kept to be reported.
+        """
+        if operation.field_type == DROP_INDEX:
+            models_dict.statements = [
+                x for x in models_dict.statements if x.name != operation.value
+            ]
+            model_name = None
+            for name, model in models_dict.items():
+                if model.indexes.pop(operation.value, None) is not None:
+                    model_name = name
+            self._add_removal(
+                models_dict,
+                operation._replace(model=model_name),
+                operation.value,
+                migration_number,
+            )
+            return
+
+        models_dict.statements.append(
+            Statement(
+                operation.field_type,
+                operation.model,
+                operation.value,
+                operation.fields,
+                migration_number,
+                operation.lock_free,
+            ),
+        )
+
+    def _add_field(self, models_dict: dict, operation: Operation, migration_number: str):
+        """
+        Use an AddField operation, or a field of a CreateModel, to mutate the models_dict.
+
+        The implicit index of a field of a model created in the same migration, e.g. of a
+        ForeignKey, is built with its table, so it doesn't lock an existing table.
+        """
+        # The default of a new column is written to the existing rows, a new table has none
+        rewrite = operation.kind == ADD_FIELD and operation.has_default and not operation.lock_free
+        lock_free = operation.lock_free or (
+            operation.implicit_index
+            and self._is_new_model(models_dict, operation, migration_number)
+        )
+        models_dict[operation.model][operation.field] = FieldState(
+            operation.db_index,
+            migration_number if operation.db_index else False,
+            operation.field_type,
+            operation.max_length,
+            lock_free,
+            operation.null,
+            DEFAULT_REWRITE if rewrite else None,
+            migration_number if rewrite else False,
+            operation.db_constraint,
+            operation.implicit_index,
+            operation.unique,
+        )
 
     def _map_models(self, app_dict: dict, root_path: str):
         """
@@ -238,16 +1287,20 @@ class DBIndexChecker:
         returns a dict of dicts:
         {
             model_name: {
-                "field_name": {
+                "field_name": FieldState(
                     is_index=True,   <- As of latest migration
                     index_added=0031,   <- Migration numbe
-                },
+                ),
                 ...
             },
             ...
         }
+
+        If the parse cache is enabled, the models are stored at regular checkpoints and after
+        the last migration, so later runs only replay the migrations after the last matching
+        checkpoint.
         """
-        models = {}
+        models = AppState()
 
         if "migration_files" not in app_dict.keys():
             raise ValueError(
@@ -255,24 +1308,47 @@ class DBIndexChecker:
                 "all_apps dict instead of a specific app instance?",
             )
 
-        for migration_file in app_dict["migration_files"]:
+        migration_files = app_dict["migration_files"]
+        start = 0
+        if self.cache is not None:
+            # Resume from the checkpoint matching the most migrations, if there is one.
+            chain = self._get_migration_chain(migration_files, root_path)
+            for index in range(len(chain), 0, -1):
+                checkpoint = self.cache.get_checkpoint(chain[index - 1])
+                if checkpoint is not None:
+                    models = load_models(checkpoint)
+                    start = index
+                    self._count("files_checkpointed", start)
+                    break
+
+        for index, migration_file in enumerate(migration_files[start:], start):
             path = os.path.join(root_path, migration_file[1])
-            (
-                create_models,
-                alter_fields,
-                add_fields,
-            ) = self._get_all_relevant_operations_nodes_for_file(path)
-
-            self._create_models_to_models_dict(models, create_models, migration_file[0][:4])
-            self._add_fields_to_models_dict(models, add_fields, migration_file[0][:4])
-            self._alter_fields_to_models_dict(
-                models,
-                alter_fields,
-                migration_file[0][:4],
-            )
+            operations = self._get_operations_for_file(path)
+            self._apply_operations(models, operations, migration_file[0][:4])
+            self._count("operations_replayed", len(operations))
+
+            if self.cache is not None and (
+                index + 1 == len(migration_files) or (index + 1) % CHECKPOINT_INTERVAL == 0
+            ):
+                self.cache.set_checkpoint(chain[index], path, dump_models(models))
 
         return models
 
+    def _get_migration_chain(self, migration_files: list, root_path: str):
+        """
+        Get the checkpoint key for each migration file of an app.
+
+        Each key is a hash of the file and the key of the file before it, so it identifies
+        the whole history of the app up to and including that migration.
+        """
+        chain = []
+        key = ""
+        for file_name, file_path in migration_files:
+            with open(os.path.join(root_path, file_path), "rb") as file:
+                key = self.cache.chain_key(key, file_name, file.read())
+            chain.append(key)
+        return chain
+
     def _analyse_models(self, app_dict: dict, ignore_before: int = 0):
         """
         Check for new db indices after a given migration for app.
@@ -283,17 +1359,261 @@ class DBIndexChecker:
         for model in app_dict.keys():
             for field_name in app_dict[model].keys():
                 field = app_dict[model][field_name]
-                if field["is_index"] and int(field["index_added"]) >= ignore_before:
+                if (
+                    field.is_index
+                    and not field.lock_free
+                    and int(field.index_added) >= ignore_before
+                ):
+                    errors.append(
+                        {
+                            "model": model,
+                            "field": field_name,
+                            "migration": field.index_added,
+                        },
+                    )
+                if self._is_reported_rewrite(field) and int(field.rewrite_added) >= ignore_before:
                     errors.append(
                         {
                             "model": model,
                             "field": field_name,
-                            "migration": field["index_added"],
+                            "rewrite": field.rewrite,
+                            "migration": field.rewrite_added,
                         },
                     )
 
+            for name, index in getattr(app_dict[model], "indexes", {}).items():
+                if not index.lock_free and int(index.index_added) >= ignore_before:
+                    errors.append(
+                        {
+                            "model": model,
+                            "field": None,
+                            "index": name,
+                            "index_type": index.index_type,
+                            "fields": list(index.fields),
+                            "migration": index.index_added,
+                        },
+                    )
+
+        if self.check_validations:
+            for validation in getattr(app_dict, "validations", []):
+                if int(validation.migration) >= ignore_before:
+                    errors.append(
+                        {
+                            "model": validation.model,
+                            "field": validation.field,
+                            "validation": validation.reason,
+                            "migration": validation.migration,
+                        },
+                    )
+
+        if self.check_removals:
+            for removal in getattr(app_dict, "removals", []):
+                if int(removal.migration) >= ignore_before:
+                    errors.append(
+                        {
+                            "model": removal.model,
+                            "field": removal.field,
+                            "removal": removal.name,
+                            "constraint": removal.constraint,
+                            "migration": removal.migration,
+                        },
+                    )
+
+        for statement in getattr(app_dict, "statements", []):
+            if not statement.lock_free and int(statement.migration) >= ignore_before:
+                errors.append(
+                    {
+                        "model": None,
+                        "field": None,
+                        "statement": statement.kind,
+                        "table": statement.table,
+                        "name": statement.name,
+                        "fields": list(statement.columns),
+                        "migration": statement.migration,
+                    },
+                )
+
         return errors
 
+    def _is_reported_rewrite(self, field: FieldState):
+        """Check whether a field rewrote the table in a way which is reported."""
+        if not self.check_rewrites or not field.rewrite_added:
+            return False
+        return field.rewrite != DEFAULT_REWRITE or bool(self.rewrite_defaults)
+
+    def _get_app_schedule(self, app_names: list):
+        """Order the apps so the apps they depend on are checked first."""
+        schedule = []
+        if self.graph is not None:
+            schedule = [app for level in self.graph.app_levels() for app in level]
+            schedule = [app for app in schedule if app in app_names]
+        return schedule + [app for app in app_names if app not in schedule]
+
+    def _check_app(self, app: str, app_dict: dict, ignore_before: int):
+        """Replay the migrations of a single app and return its errors."""
+        self._count("apps_checked")
+        with self._phase("app", app):
+            with self._phase("map_models"):
+                start = time.perf_counter()
+                models = self._map_models(app_dict=app_dict, root_path=os.getcwd())
+                if self._hooks["on_app_replayed"]:
+                    self._emit("on_app_replayed", app, models, time.perf_counter() - start)
+
+            with self._phase("analyse"):
+                errors = self._analyse_models(models, ignore_before)
+        for items in errors:
+            items["app"] = app
+
+        if self.tables is not None:
+            for items in errors:
+                self._add_table_stats(items, models)
+                self._add_index_estimate(items, models)
+            errors = [x for x in errors if self._is_large_table(x)]
+        elif self.autofix:
+            # The table is needed to name the indices like django does
+            for items in errors:
+                items["table"] = self._get_table(items, models)
+        return errors
+
+    def _get_table(self, error: dict, models: dict):
+        """Get the table of the model of an error, or None if the model isn't known."""
+        table = error.get("table") or getattr(models.get(error["model"]), "db_table", None)
+        if table is None and error["model"] is None:
+            return None
+        if table is None:
+            table = f"{error['app']}_{error['model']}"
+        return table
+
+    def _add_table_stats(self, error: dict, models: dict):
+        """Add the table of the model of an error, and its number of rows and size."""
+        table = self._get_table(error, models)
+        table_stats = None if table is None else self.tables.get(table.lower())
+
+        error["table"] = table
+        error["rows"] = None if table_stats is None else table_stats.rows
+        error["size"] = None if table_stats is None else table_stats.size
+
+    def _add_index_estimate(self, error: dict, models: dict):
+        """Add the estimated size and build time of the index of an error, if rows are known."""
+        error["index_size"] = error["build_time"] = None
+        if error["rows"] is None or error.get("statement") is not None:
+            # The columns of raw SQL aren't necessarily fields of a model, so aren't estimated.
+            return
+        if error.get("rewrite") is not None or error.get("validation") is not None:
+            # Rewrites and validations don't build an index, they read the whole table
+            return
+        if "removal" in error:
+            # A dropped index isn't built
+            return
+
+        model = models[error["model"]]
+        if error.get("index") is None:
+            field = model[error["field"]]
+            estimate = estimate_index(
+                field.field_type,
+                field.max_length,
+                error["rows"],
+                self.index_rows_per_second,
+                self.index_mb_per_second,
+            )
+        elif error["index_type"] in INDEX_TYPES_ESTIMATED:
+            columns = [
+                (model[x].field_type, model[x].max_length) if x in model else (None, None)
+                for x in error["fields"]
+            ]
+            estimate = estimate_composite_index(
+                columns,
+                error["rows"],
+                self.index_rows_per_second,
+                self.index_mb_per_second,
+            )
+        else:
+            # Only b-tree indices are estimated, e.g. a BRIN index is a fraction of the size.
+            return
+
+        error["index_size"] = estimate.size
+        error["build_time"] = estimate.duration
+
+    def _get_rank(self, error: dict):
+        """
+        Rank an error by the size of its table, then by how long its index takes to build.
+
+        Rewrites, validations, removals and some indices have no estimate, so the table size
+        comes first to rank them with the rest. Tables without statistics go last.
+        """
+        return tuple(-1 if error[x] is None else error[x] for x in ["rows", "size", "build_time"])
+
+    def _is_large_table(self, error: dict):
+        """
+        Check whether the table of an error is above the size thresholds.
+
+        Tables without statistics, e.g. tables created since the statistics were exported,
+        are assumed to be large.
+        """
+        if self.min_table_rows is None and self.min_table_size is None:
+            return True
+        if error["rows"] is None and error["size"] is None:
+            return True
+        if self.min_table_rows is not None and (error["rows"] or 0) >= self.min_table_rows:
+            return True
+        return (
+            self.min_table_size is not None
+            and (error["size"] or 0) >= self.min_table_size * 1024 * 1024
+        )
+
+    def _check_app_in_worker(self, app: str, app_dict: dict, ignore_before: int, events: list):
+        """
+        Check an app in a worker process, recording it for the main process.
+
+        Returns the errors of the app, its profile if the check is recorded, and the hook
+        events in events which happened, as a list of (event, args), so they can be passed to
+        the subscribers in the main process.
+        """
+        emitted = []
+        for event in events:
+            self._hooks[event].append(lambda *args, event=event: emitted.append((event, args)))
+
+        if self.profiler is None:
+            return self._check_app(app, app_dict, ignore_before), None, emitted
+
+        self.profiler = Profiler(self.profile_top)
+        if self.profile is not None:
+            self.profiler.start()
+        try:
+            errors = self._check_app(app, app_dict, ignore_before)
+        finally:
+            self.profiler.stop()
+        return errors, self.profiler, emitted
+
+    def _phase(self, name: str, item: str = None):
+        """Return a context manager recording a phase of the check, if it is recorded."""
+        if self.profiler is None:
+            return NULL_PHASE
+        return self.profiler.phase(name, item)
+
+    def _count(self, name: str, value: int = 1):
+        """Add to a counter of the check, if it is recorded."""
+        if self.profiler is not None:
+            self.profiler.count(name, value)
+
+    def _get_boolean_setting(self, config, name: str, default: bool):
+        """Get a true/false setting from the config."""
+        try:
+            value = config["DJANGO_MIGRATION_DBINDEX_CHECK"][name]
+        except KeyError:
+            return default
+
+        try:
+            return configparser.ConfigParser.BOOLEAN_STATES[value.strip().lower()]
+        except KeyError:
+            raise ValueError(f"{name} must be true or false, not {value}.")
+
+    def _get_check_settings(self, config):
+        """Get the optional checks which aren't set by the checker args from the config."""
+        for name in ["check_rewrites", "rewrite_defaults", "check_validations", "check_removals"]:
+            if getattr(self, name) is None:
+                setattr(self, name, self._get_boolean_setting(config, name, False))
+
     def get_config(self, project_root: str):
         """Get any config from a '.migrations_check_config.cfg file."""
         config = configparser.ConfigParser()
@@ -304,33 +1624,332 @@ class DBIndexChecker:
         config.read(full_path)
         return config
 
-    def check_project(self, project_root_dir: str):
-        """Overarching function to check a given project directory."""
-        apps = self._walk_files(project_root_dir)
-        config = self.get_config(project_root_dir)
-        errors = []
+    def _get_cache(self, config, project_root: str):
+        """Create the parse cache from the checker args or config, if one is enabled."""
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            try:
+                cache_dir = config["DJANGO_MIGRATION_DBINDEX_CHECK"]["cache_dir"].strip()
+            except KeyError:
+                return None
+            cache_dir = os.path.join(project_root, cache_dir)
 
-        for app in apps.keys():
-            models = self._map_models(app_dict=apps[app], root_path=os.getcwd())
+        max_size = self.cache_max_size
+        if max_size is None:
+            try:
+                max_size = config["DJANGO_MIGRATION_DBINDEX_CHECK"]["cache_max_size"]
+            except KeyError:
+                max_size = None
+
+        if max_size is None:
+            return ParseCache(cache_dir, project_root, DEFAULT_MAX_SIZE)
+        return ParseCache(cache_dir, project_root, int(max_size) * 1024 * 1024)
+
+    def _get_recent_app_order(self, apps: dict, root_path: str):
+        """
+        Order the apps by their most recently changed migration, newest first.
+
+        In a git work tree the time of the latest commit of each migration is used, as a fresh
+        checkout gives every file the same modification time, and migrations which haven't
+        been committed, or have uncommitted changes, are the newest. Otherwise the
+        modification times of the files are used.
+        """
+        commit_times = git_commit_times(root_path)
+        uncommitted = set()
+        if commit_times is not None:
+            uncommitted = set(git_changed_files(root_path, "HEAD"))
+
+        def last_changed(file_path):
+            if commit_times is not None:
+                path = os.path.relpath(file_path, root_path).replace(os.sep, "/")
+                if path in uncommitted:
+                    return math.inf
+                return commit_times.get(path, math.inf)
+            try:
+                return os.path.getmtime(file_path)
+            except OSError:
+                return 0.0
+
+        def last_modified(app):
+            return max([0.0] + [last_changed(x[1]) for x in apps[app]["migration_files"]])
+
+        return sorted(apps, key=last_modified, reverse=True)
 
+    def _get_table_stats(self, config, project_root: str):
+        """Load the table statistics and thresholds from the checker args or config."""
+        path = self.table_stats
+        if path is None:
             try:
-                ignore_before = config["DJANGO_MIGRATION_DBINDEX_CHECK"][app]
+                path = config["DJANGO_MIGRATION_DBINDEX_CHECK"]["table_stats"].strip()
             except KeyError:
-                ignore_before = 0
+                return None
+            path = os.path.join(project_root, path)
 
-            errors_new = self._analyse_models(models, int(ignore_before))
-            for items in errors_new:
-                items["app"] = app
-            errors += errors_new
+        for name in ["min_table_rows", "min_table_size"]:
+            if getattr(self, name) is None:
+                try:
+                    setattr(self, name, int(config["DJANGO_MIGRATION_DBINDEX_CHECK"][name]))
+                except KeyError:
+                    pass
+
+        for name, default in [
+            ("index_rows_per_second", DEFAULT_ROWS_PER_SECOND),
+            ("index_mb_per_second", DEFAULT_MB_PER_SECOND),
+        ]:
+            if getattr(self, name) is None:
+                try:
+                    setattr(self, name, float(config["DJANGO_MIGRATION_DBINDEX_CHECK"][name]))
+                except KeyError:
+                    setattr(self, name, default)
+
+        return load_table_stats(path)
+
+    def _check_apps_in_parallel(self, apps: dict, app_names: list, ignore_befores: list):
+        """
+        Check the apps in a process pool and return the errors of each app.
+
+        Each app is replayed independently. Apps are submitted in dependency order, but the
+        results (and any exception) are collected in the order of the apps so the output
+        matches a serial run. When profiling, each worker profiles its apps and the profiles
+        are merged, so the times of the app phases are totals across all of the processes.
+        The app hook events of each app are passed to the subscribers in the order of the apps.
+
+        With fail_fast, apps are submitted in the order of app_names and only the errors of
+        the first app to finish with errors are returned, the apps not yet started are
+        cancelled.
+        """
+        ignore_befores = dict(zip(app_names, ignore_befores))
+        events = [event for event in APP_EVENTS if self._hooks[event]]
+        record = self.profiler is not None or len(events) > 0
+        schedule = app_names if self.fail_fast else self._get_app_schedule(app_names)
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(app_names))) as executor:
+            futures = {}
+            for app in schedule:
+                if record:
+                    futures[app] = executor.submit(
+                        self._check_app_in_worker,
+                        app,
+                        apps[app],
+                        ignore_befores[app],
+                        events,
+                    )
+                else:
+                    futures[app] = executor.submit(
+                        self._check_app,
+                        app,
+                        apps[app],
+                        ignore_befores[app],
+                    )
+
+            if self.fail_fast:
+                return self._wait_for_first_errors([futures[app] for app in schedule], record)
+            return [self._get_worker_result(futures[app], record) for app in app_names]
+
+    def _get_worker_result(self, future, record: bool):
+        """Get the errors of an app checked by a worker, merging what it recorded."""
+        if not record:
+            return future.result()
+
+        errors, profiler, emitted = future.result()
+        if profiler is not None:
+            self.profiler.merge(profiler)
+        for event, args in emitted:
+            self._emit(event, *args)
+        return errors
+
+    def _wait_for_first_errors(self, futures: list, record: bool):
+        """Wait for the apps to finish until one has errors, then cancel the rest."""
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in [x for x in futures if x in done]:
+                errors = self._get_worker_result(future, record)
+                if errors:
+                    # Apps which have already started can't be cancelled, the executor waits
+                    # for them to finish but their results are ignored.
+                    for other in pending:
+                        other.cancel()
+                    return [errors]
+        return []
+
+    def _autofix(self, apps: dict, errors: list):
+        """Rewrite the migrations of the errors to build their indices concurrently."""
+        files = {}
+        for error in errors:
+            if any(key in error for key in ("rewrite", "validation", "removal")):
+                # Only new indices can be built concurrently
+                continue
+            for file_name, file_path in apps[error["app"]]["migration_files"]:
+                if file_name[:4] == error["migration"]:
+                    files.setdefault(os.path.join(os.getcwd(), file_path), []).append(error)
+
+        for file_path, file_errors in files.items():
+            fixed = fix_migration(file_path, file_errors)
+            if fixed:
+                print(
+                    f"Rewrote migration {file_path} to build {len(fixed)} of its new indices "
+                    f"concurrently.",
+                    file=sys.stderr,
+                )
+
+    def _describe_error(self, error: dict):
+        """Describe the new index of an error, a field, a Meta index or a RunSQL statement."""
+        if "removal" in error:
+            if error["field"] is not None:
+                index = f"The db_index of field:{error['field']} in model:{error['model']}"
+            elif error["model"] is not None:
+                index = f"Index:{error['removal']} of model:{error['model']}"
+            else:
+                index = f"Index:{error['removal']}"
+            if error.get("constraint"):
+                return (
+                    f"{index} is dropped while locking the table, as a unique constraint it "
+                    "can't be dropped concurrently,"
+                )
+            return (
+                f"{index} is dropped while locking the table, use RemoveIndexConcurrently "
+                "instead,"
+            )
+        if error.get("validation") is not None:
+            return (
+                f"A change to model:{error['model']} scans the table to validate every row, "
+                f"{error['validation']},"
+            )
+        if error.get("rewrite") is not None:
+            return (
+                f"A change to field:{error['field']} in model:{error['model']} rewrites the "
+                f"table, {error['rewrite']},"
+            )
+        if error.get("statement") is not None:
+            name = "" if error["name"] is None else f":{error['name']}"
+            return (
+                f"A RunSQL runs {error['statement']}{name} on "
+                f"{', '.join(error['fields'])} of table:{error['table']}"
+            )
+        if error.get("index") is None:
+            return f"A new db_index was added to field:{error['field']} in model:{error['model']}"
+        return (
+            f"A new index:{error['index']} ({error['index_type']} on "
+            f"{', '.join(error['fields'])}) was added to model:{error['model']}"
+        )
+
+    def _describe_kind(self, error: dict):
+        """Name the kind of finding of an error, e.g. a new db_index."""
+        if "removal" in error:
+            return "an index removal"
+        if error.get("validation") is not None:
+            return "a validation scan"
+        if error.get("rewrite") is not None:
+            return "a table rewrite"
+        if error.get("statement") is not None:
+            return f"a RunSQL {error['statement']}"
+        if error.get("index") is None:
+            return "a new db_index"
+        return "a new index"
+
+    def _describe_table(self, error: dict):
+        """Describe the size of the table of an error, if there are table statistics."""
+        if "rows" not in error or error["table"] is None:
+            return ""
+        if error["rows"] is None and error["size"] is None:
+            return f" There are no statistics for table:{error['table']}."
+
+        sizes = []
+        if error["rows"] is not None:
+            sizes.append(f"{error['rows']} rows")
+        if error["size"] is not None:
+            sizes.append(f"{error['size'] / 1024 / 1024:.0f}MB")
+        description = f" Table:{error['table']} has {', '.join(sizes)}."
+        if error.get("build_time") is not None:
+            description += (
+                f" The index is estimated at {error['index_size'] / 1024 / 1024:.0f}MB, "
+                f"taking {format_duration(error['build_time'])} to build."
+            )
+        return description
+
+    def check_project(self, project_root_dir: str):
+        """Overarching function to check a given project directory."""
+        # Metrics only need the times and counters of the profile, not the memory use.
+        if self.profile is not None or self.metrics is not None:
+            self.profiler = Profiler(self.profile_top)
+        if self.profile is not None:
+            self.profiler.start()
+
+        start = time.perf_counter()
+        with self._phase("total"):
+            with self._phase("config"):
+                # The cache is needed first, as the headers of the migrations are cached
+                config = self.get_config(project_root_dir)
+                self.cache = self._get_cache(config, project_root_dir)
+                self.tables = self._get_table_stats(config, project_root_dir)
+                self._get_check_settings(config)
+            with self._phase("walk"):
+                apps = self._walk_files(project_root_dir)
+            if self._hooks["on_walk_done"]:
+                self._emit("on_walk_done", apps, time.perf_counter() - start)
+            self._count("files_scanned", sum(len(x["migration_files"]) for x in apps.values()))
+            if self.since is not None:
+                with self._phase("since"):
+                    apps = self._filter_changed_apps(apps, project_root_dir)
+            errors = []
+
+            app_names = list(apps.keys())
+            if self.fail_fast:
+                app_names = self._get_recent_app_order(apps, project_root_dir)
+            ignore_befores = []
+            for app in app_names:
+                try:
+                    ignore_before = config["DJANGO_MIGRATION_DBINDEX_CHECK"][app]
+                except KeyError:
+                    ignore_before = 0
+                ignore_befores.append(int(ignore_before))
+
+            if self.jobs > 1 and len(app_names) > 1:
+                results = self._check_apps_in_parallel(apps, app_names, ignore_befores)
+            else:
+                app_dicts = [apps[app] for app in app_names]
+                results = map(self._check_app, app_names, app_dicts, ignore_befores)
+
+            for errors_new in results:
+                errors += errors_new
+                for error in errors_new:
+                    self._emit("on_finding", error)
+                if self.fail_fast and errors_new:
+                    break
+
+            if self.cache is not None:
+                with self._phase("evict"):
+                    self.cache.evict()
+
+        if self.tables is not None:
+            errors.sort(key=self._get_rank, reverse=True)
+
+        self._emit("on_run_done", errors, time.perf_counter() - start)
+        if self.profile is not None:
+            self.profiler.stop()
+            self.profiler.write(self.profile)
+        if self.metrics is not None:
+            findings = {app: 0 for app in app_names}
+            for error in errors:
+                findings[error["app"]] += 1
+            write_metrics(self.metrics, self.profiler, findings)
 
         for error in errors:
             print(
-                f"A new db_index was added to field:{error['field']} in model:{error['model']} "
-                f"in app:{error['app']}. This was added in migration {error['migration']}.",
+                f"{self._describe_error(error)} in app:{error['app']}. This was added in "
+                f"migration {error['migration']}.{self._describe_table(error)}",
                 file=sys.stderr,
             )
+        if self.autofix:
+            self._autofix(apps, errors)
 
         if len(errors) > 0:
+            if self.fail_fast:
+                print(
+                    f"Stopped at the first app with {self._describe_kind(errors[0])} as fail "
+                    f"fast is on, other apps may have more findings.",
+                    file=sys.stderr,
+                )
             sys.exit(1)
         else:
             sys.exit()
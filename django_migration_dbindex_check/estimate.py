@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Estimate the size and build time of a new index, from its field type and table rows."""
+
+import math
+from typing import NamedTuple
+
+# The bytes of each key of a field type with a fixed width. Relations are assumed to be to a
+# BigAutoField primary key, and fields which aren't listed (e.g. custom fields) to be as wide
+# as a bigint.
+FIELD_WIDTHS = {
+    "autofield": 4,
+    "bigautofield": 8,
+    "smallautofield": 2,
+    "integerfield": 4,
+    "bigintegerfield": 8,
+    "smallintegerfield": 2,
+    "positiveintegerfield": 4,
+    "positivebigintegerfield": 8,
+    "positivesmallintegerfield": 2,
+    "booleanfield": 1,
+    "nullbooleanfield": 1,
+    "datefield": 4,
+    "datetimefield": 8,
+    "timefield": 8,
+    "durationfield": 8,
+    "floatfield": 8,
+    "decimalfield": 12,
+    "uuidfield": 16,
+    "genericipaddressfield": 19,
+    "ipaddressfield": 19,
+    "foreignkey": 8,
+    "onetoonefield": 8,
+}
+DEFAULT_WIDTH = 8
+
+# The max_length Django gives each variable width field if it isn't set in the migration.
+DEFAULT_MAX_LENGTHS = {
+    "charfield": 255,
+    "slugfield": 50,
+    "emailfield": 254,
+    "urlfield": 200,
+    "filefield": 100,
+    "imagefield": 100,
+    "filepathfield": 100,
+}
+# Variable width values are assumed to fill this proportion of their max_length.
+VARCHAR_FILL = 0.5
+# The assumed average length of the values of a text field.
+TEXT_WIDTH = 100
+TEXT_FIELDS = ("textfield", "binaryfield", "jsonfield")
+
+# A postgres b-tree index tuple has an 8 byte header, is aligned to 8 bytes, and has a 4 byte
+# line pointer. Leaf pages are filled to 90% when an index is built.
+TUPLE_HEADER = 8
+ALIGNMENT = 8
+LINE_POINTER = 4
+FILL_FACTOR = 0.9
+
+# The index classes which are b-tree indices, the only ones which are estimated.
+INDEX_TYPES_ESTIMATED = (
+    "Index",
+    "BTreeIndex",
+    "UniqueConstraint",
+    "index_together",
+    "unique_together",
+)
+
+# The default throughput of an index build, sorting the keys and writing the index.
+DEFAULT_ROWS_PER_SECOND = 1000000
+DEFAULT_MB_PER_SECOND = 50
+
+
+class IndexEstimate(NamedTuple):
+    """The estimated size in bytes of an index, and the seconds it takes to build."""
+
+    size: int
+    duration: float
+
+
+def get_key_width(field_type: str, max_length: int = None):
+    """Get the average bytes of the key of a field of the type, e.g. CharField."""
+    field_type = (field_type or "").lower()
+    if field_type in TEXT_FIELDS:
+        return TEXT_WIDTH
+    if field_type in DEFAULT_MAX_LENGTHS:
+        max_length = max_length or DEFAULT_MAX_LENGTHS[field_type]
+        # Short values have a 1 byte length header
+        return 1 + math.ceil(max_length * VARCHAR_FILL)
+    return FIELD_WIDTHS.get(field_type, DEFAULT_WIDTH)
+
+
+def estimate_index(
+    field_type: str,
+    max_length: int,
+    rows: int,
+    rows_per_second: float = DEFAULT_ROWS_PER_SECOND,
+    mb_per_second: float = DEFAULT_MB_PER_SECOND,
+):
+    """
+    Estimate the size and build time of a b-tree index on a field of a table with rows.
+
+    The build time is the time to sort the rows plus the time to write the index, at the
+    given throughputs. These are rough figures to decide how to deploy an index, measure an
+    index build on your own database to tune the throughputs.
+    """
+    return estimate_composite_index(
+        [(field_type, max_length)],
+        rows,
+        rows_per_second,
+        mb_per_second,
+    )
+
+
+def estimate_composite_index(
+    columns: list,
+    rows: int,
+    rows_per_second: float = DEFAULT_ROWS_PER_SECOND,
+    mb_per_second: float = DEFAULT_MB_PER_SECOND,
+):
+    """Estimate a b-tree index on columns, a list of (field_type, max_length), see above."""
+    key_width = sum(get_key_width(field_type, max_length) for field_type, max_length in columns)
+    tuple_size = ALIGNMENT * math.ceil((TUPLE_HEADER + key_width) / ALIGNMENT) + LINE_POINTER
+    size = int(rows * tuple_size / FILL_FACTOR)
+    duration = rows / rows_per_second + size / (mb_per_second * 1024 * 1024)
+    return IndexEstimate(size, duration)
+
+
+def format_duration(seconds: float):
+    """Format a duration for a report, e.g. 45s, 12m or 2.5h."""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Extract parts of a migration file without parsing the whole file."""
+
+import ast
+import re
+
+from .state import OPERATION_KINDS
+
+# The operations the checker replays. Files which don't mention any of these can be skipped.
+RELEVANT_OPERATIONS = tuple(x.encode() for x in OPERATION_KINDS)
+
+# Searching for a newline is much faster than using a multiline "^" anchor.
+_TOP_LEVEL_RE = re.compile(r"\n[^\s#]")
+
+
+def mentions_relevant_operations(source: bytes):
+    """Check whether the source contains the name of any relevant operation."""
+    return any(operation in source for operation in RELEVANT_OPERATIONS)
+
+
+def _parse_assignment(text: str, name: str):
+    """Parse a single "name = value" statement and return the value node, or None."""
+    try:
+        node = ast.parse(text)
+    except SyntaxError:
+        return None
+
+    if len(node.body) != 1 or not isinstance(node.body[0], ast.Assign):
+        return None
+    targets = node.body[0].targets
+    if len(targets) != 1 or not isinstance(targets[0], ast.Name) or targets[0].id != name:
+        return None
+    return node.body[0].value
+
+
+def find_class_assignments(source: bytes, class_name: str, names: list):
+    """
+    Find and parse the assignments to the given names in the body of a top level class.
+
+    Only the assignment statements are parsed, so large CreateModel or RunPython migrations
+    are much cheaper than parsing the whole file. This relies on migrations being formatted
+    as django (or black) writes them, with multi line values closed by a bracket at the same
+    indentation as the assignment.
+
+    Returns a dict of {name: <ast node of the assigned value>} for the names found, or None
+    if the source doesn't look like that and should be parsed in full instead.
+    """
+    try:
+        text = source.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+    class_match = re.search(rf"^class\s+{class_name}\b[^\n]*:[ \t]*(#[^\n]*)?$", text, re.M)
+    if class_match is None:
+        return None
+
+    # The class body ends at the next unindented line. A multi line string starting at the
+    # beginning of a line will cut this short, in which case an assignment might not be
+    # found or its value will fail to parse.
+    next_statement = _TOP_LEVEL_RE.search(text, class_match.end())
+    body_end = next_statement.start() + 1 if next_statement else len(text)
+
+    values = {}
+    for name in names:
+        match = re.compile(rf"^([ \t]+){name}[ \t]*=(?!=)", re.M).search(
+            text,
+            class_match.end(),
+            body_end,
+        )
+        if match is None:
+            continue
+
+        start = match.start() + len(match.group(1))
+        line_end = text.find("\n", match.end())
+        line_end = body_end if line_end == -1 else line_end
+
+        # Single line values, e.g. "atomic = False"
+        value = _parse_assignment(text[start:line_end], name)
+        if value is None:
+            closing = re.compile(rf"^{match.group(1)}[\])}}]", re.M).search(
+                text,
+                line_end,
+                body_end,
+            )
+            if closing is None:
+                return None
+            end = closing.end()
+            value = _parse_assignment(text[start:end], name)
+            if value is None:
+                return None
+
+        values[name] = value
+
+    return values
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Dependency graph of the migrations in a project."""
+
+import heapq
+
+
+class MigrationGraph:
+    """
+    A directed acyclic graph of migrations built from their dependencies.
+
+    Nodes are (app_name, migration_name) tuples, where app_name is the name of the folder
+    containing the app, which is also its label unless the app has a custom AppConfig.label.
+    Dependencies on apps or migrations which aren't in the project (e.g. django.contrib
+    apps) are ignored.
+    """
+
+    def __init__(self):
+        """Create an empty graph."""
+        self.nodes = {}
+        self.parents = {}
+
+    def add_migration(self, app: str, name: str):
+        """Add a migration to the graph."""
+        self.nodes.setdefault(app, set()).add(name)
+        self.parents.setdefault((app, name), set())
+
+    def add_dependency(self, child: tuple, parent: tuple):
+        """Make the migration child depend on parent, if both are in the graph."""
+        if child != parent and child in self.parents and parent in self.parents:
+            self.parents[child].add(parent)
+
+    @classmethod
+    def from_headers(cls, headers: dict):
+        """
+        Build the graph from the dependency information of every migration.
+
+        headers is a dict of {app_name: {migration_name: header}}, where each header has the
+        "dependencies", "run_before" and "replaces" lists of (app_label, migration_name) of
+        the migration.
+        """
+        graph = cls()
+        replaced = {}
+        for app, migrations in headers.items():
+            for name, header in migrations.items():
+                graph.add_migration(app, name)
+                for _app_label, replaced_name in header["replaces"]:
+                    replaced[(app, replaced_name)] = (app, name)
+
+        def resolve(label, name):
+            """Find the node for a dependency, following squashes and special names."""
+            if label not in graph.nodes:
+                return None
+            if name == "__first__":
+                return (label, min(graph.nodes[label]))
+            if name == "__latest__":
+                return (label, max(graph.nodes[label]))
+            return replaced.get((label, name), (label, name))
+
+        for app, migrations in headers.items():
+            for name, header in migrations.items():
+                for label, dependency in header["dependencies"]:
+                    parent = resolve(label, dependency)
+                    if parent is not None:
+                        graph.add_dependency((app, name), parent)
+                for label, dependant in header["run_before"]:
+                    child = resolve(label, dependant)
+                    if child is not None:
+                        graph.add_dependency(child, (app, name))
+
+        return graph
+
+    def app_order(self, app: str):
+        """
+        Return the migrations of an app in an order which respects their dependencies.
+
+        Migrations which could run in either order, e.g. the two branches before a merge
+        migration, are ordered by name.
+        """
+        names = self.nodes.get(app, set())
+        parents = {
+            name: {x[1] for x in self.parents[(app, name)] if x[0] == app} for name in names
+        }
+        children = {name: [] for name in names}
+        for name, name_parents in parents.items():
+            for parent in name_parents:
+                children[parent].append(name)
+
+        ready = [name for name, name_parents in parents.items() if not name_parents]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            name = heapq.heappop(ready)
+            order.append(name)
+            for child in children[name]:
+                parents[child].discard(name)
+                if not parents[child]:
+                    heapq.heappush(ready, child)
+
+        if len(order) != len(names):
+            cycle = sorted(name for name, name_parents in parents.items() if name_parents)
+            raise ValueError(
+                f"Circular dependency between the migrations {', '.join(cycle)} in app:{app}.",
+            )
+        return order
+
+    def app_dependencies(self):
+        """Return a dict of {app: set of the other apps its migrations depend on}."""
+        dependencies = {app: set() for app in self.nodes}
+        for (app, _name), parents in self.parents.items():
+            dependencies[app].update(x[0] for x in parents if x[0] != app)
+        return dependencies
+
+    def app_levels(self):
+        """
+        Group the apps into levels which can be scheduled concurrently.
+
+        Every app only depends on apps in earlier levels, or in the same level if the apps
+        depend on each other, which is common as different migrations of two apps can depend
+        on each other. Within a level apps are sorted by name.
+        """
+        dependencies = self.app_dependencies()
+
+        # Tarjan's algorithm, to put apps which depend on each other in the same group.
+        # Groups are found after all of the groups they depend on.
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        groups = []
+
+        def connect(app):
+            index[app] = lowlink[app] = len(index)
+            stack.append(app)
+            on_stack.add(app)
+            for dependency in sorted(dependencies[app]):
+                if dependency not in index:
+                    connect(dependency)
+                    lowlink[app] = min(lowlink[app], lowlink[dependency])
+                elif dependency in on_stack:
+                    lowlink[app] = min(lowlink[app], index[dependency])
+
+            if lowlink[app] == index[app]:
+                group = set()
+                while app not in group:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    group.add(member)
+                groups.append(group)
+
+        for app in sorted(dependencies):
+            if app not in index:
+                connect(app)
+
+        # Each group's level is one more than the highest level of the groups it depends on.
+        levels = {}
+        for group in groups:
+            level = 0
+            for member in group:
+                for dependency in dependencies[member] - group:
+                    level = max(level, levels[dependency] + 1)
+            for member in group:
+                levels[member] = level
+
+        result = [[] for _level in range(max(levels.values(), default=-1) + 1)]
+        for app in sorted(levels):
+            result[levels[app]].append(app)
+        return result
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Hooks to observe the checker as it runs, e.g. to add tracing spans or counters."""
+
+# The events a subscriber can handle, in the order they happen in a check.
+HOOK_EVENTS = ("on_walk_done", "on_file_parsed", "on_app_replayed", "on_finding", "on_run_done")
+
+# Events which happen while checking an app, so in a worker process when using --jobs.
+APP_EVENTS = ("on_file_parsed", "on_app_replayed")
+
+
+class CheckerHooks:
+    """
+    Base class for hook subscribers, override the events to handle.
+
+    Subscribers don't need to subclass this, any object with methods named after the events
+    can be added with DBIndexChecker.add_hooks. Durations are wall times in seconds.
+
+    When apps are checked in parallel, the app events of each app are passed to the
+    subscriber in the main process once the app has been checked, so their arguments must
+    be picklable. Any exception raised by a subscriber stops the check.
+    """
+
+    def on_walk_done(self, apps: dict, duration: float):
+        """Handle the migration files of each app having been found."""
+
+    def on_file_parsed(self, path: str, duration: float, op_counts: dict):
+        """
+        Handle the operations of a migration file having been read.
+
+        op_counts is a dict of {operation name: number of operations} of the relevant
+        operations in the file. Files read from the parse cache are included.
+        """
+
+    def on_app_replayed(self, app: str, models: dict, duration: float):
+        """Handle the migrations of an app having been replayed into its models."""
+
+    def on_finding(self, finding: dict):
+        """
+        Handle a new index having been found, with the app, model, field and migration.
+
+        The field of a new index in the Meta of a model is None, and its index, index_type
+        and fields are set instead. The model of a statement in the SQL of a RunSQL is None
+        too, and its statement, table, name and fields are set.
+        A field change which rewrites the table has the reason in its rewrite, and a change
+        which scans the table to validate it has the reason in its validation, with a field of
+        None for a new check constraint. An index which is dropped has a removal, the name of
+        the index or None for the db_index of a field.
+        """
+
+    def on_run_done(self, findings: list, duration: float):
+        """Handle the check having finished, before the results are printed."""
+
+
+def get_handlers(subscriber):
+    """
+    Get the methods of a subscriber which handle each event.
+
+    Methods a CheckerHooks subclass hasn't overridden are left out, so events with no real
+    handler cost nothing.
+    """
+    handlers = {}
+    for event in HOOK_EVENTS:
+        method = getattr(subscriber, event, None)
+        if method is None or getattr(method, "__func__", None) is getattr(CheckerHooks, event):
+            continue
+        handlers[event] = method
+    return handlers
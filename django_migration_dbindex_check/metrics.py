@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Export the statistics of a check in the OpenMetrics text format."""
+
+import contextlib
+import os
+import tempfile
+import time
+
+METRIC_PREFIX = "django_migration_dbindex_check"
+
+# The counters recorded during a check, with their help text.
+COUNTERS = (
+    ("files_scanned", "Migration files found in the project."),
+    ("files_parsed", "Migration files which were parsed."),
+    ("files_cached", "Migration files whose operations were read from the parse cache."),
+    ("files_checkpointed", "Migration files skipped by resuming from a replay checkpoint."),
+    ("apps_checked", "Apps whose migrations were replayed."),
+    ("operations_replayed", "Migration operations applied while replaying apps."),
+)
+
+
+def _escape(value: str):
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric(lines: list, name: str, help_text: str, samples: list):
+    """Add a gauge and its samples, a list of (labels, value), to the lines."""
+    name = f"{METRIC_PREFIX}_{name}"
+    lines.append(f"# TYPE {name} gauge")
+    lines.append(f"# HELP {name} {help_text}")
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{_escape(str(x))}"' for key, x in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+
+def format_metrics(profiler, findings: dict, timestamp: float = None):
+    """
+    Format the statistics of a check as OpenMetrics text.
+
+    profiler is the Profiler the check was recorded with, findings is a dict of
+    {app: number of findings}.
+    """
+    lines = []
+    for name, help_text in COUNTERS:
+        _metric(lines, name, help_text, [({}, profiler.counters.get(name, 0))])
+
+    _metric(
+        lines,
+        "findings",
+        "Findings in each app: new indices, and rewrites, validations and removals if checked.",
+        [({"app": app}, count) for app, count in sorted(findings.items())],
+    )
+    _metric(
+        lines,
+        "phase_duration_seconds",
+        "Wall time spent in each phase of the check, summed across processes.",
+        [({"phase": name}, f"{x['wall']:.6f}") for name, x in profiler.phases.items()],
+    )
+    _metric(
+        lines,
+        "last_run_timestamp_seconds",
+        "When the check finished.",
+        [({}, f"{time.time() if timestamp is None else timestamp:.3f}")],
+    )
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str, profiler, findings: dict):
+    """
+    Write the statistics of a check to an OpenMetrics text file.
+
+    The file is written to a temporary file and moved into place, so a collector polling the
+    file (e.g. the node_exporter textfile collector) never reads a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(format_metrics(profiler, findings))
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
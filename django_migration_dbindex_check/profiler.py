@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""Record the time and memory used by each phase of a check."""
+
+import heapq
+import json
+import time
+import tracemalloc
+
+# The number of slowest files and apps listed in a profile.
+DEFAULT_TOP = 10
+
+
+class _Phase:
+    """Context manager timing a single call of a phase."""
+
+    __slots__ = ("profiler", "name", "item", "wall", "cpu", "peak")
+
+    def __init__(self, profiler, name: str, item: str):
+        """Start timing the phase when entered, item is e.g. the file or app it's for."""
+        self.profiler = profiler
+        self.name = name
+        self.item = item
+        self.peak = 0
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.profiler._exit(self, wall, cpu)
+
+
+class _NullPhase:
+    """Context manager which does nothing, used when profiling is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NULL_PHASE = _NullPhase()
+
+
+class Profiler:
+    """
+    Collect the wall time, CPU time and peak traced memory of the phases of a check.
+
+    Phases can be nested, e.g. each file is parsed while replaying an app. The calls of each
+    phase are totalled, and the slowest items (e.g. files or apps) of each phase are kept.
+    Counters, e.g. of the files read from the cache, can be recorded alongside the phases.
+
+    Peak memory is the highest memory traced by tracemalloc during any call of the phase.
+    Before python 3.9 the peak can't be reset, so it is the peak since profiling started.
+    """
+
+    def __init__(self, top: int = DEFAULT_TOP):
+        """Create an empty profile which keeps the top slowest items of each phase."""
+        self.top = top
+        self.phases = {}
+        self.slowest = {}
+        self.counters = {}
+        self._stack = []
+        self._started_tracing = False
+
+    def start(self):
+        """Start tracing memory allocations, if they aren't already traced."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        """Stop tracing memory allocations, if they were started by this profiler."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def phase(self, name: str, item: str = None):
+        """Return a context manager recording a call of the phase."""
+        return _Phase(self, name, item)
+
+    def _get_peak(self):
+        """Get the peak traced memory since it was last reset."""
+        return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+
+    def _enter(self, phase: _Phase):
+        # Anything traced so far counts towards the enclosing phase, before the peak is reset.
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, self._get_peak())
+        self._stack.append(phase)
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+    def _exit(self, phase: _Phase, wall: float, cpu: float):
+        peak = max(phase.peak, self._get_peak())
+        self._stack.pop()
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        self.add(phase.name, phase.item, 1, wall, cpu, peak)
+
+    def add(self, name: str, item: str, calls: int, wall: float, cpu: float, peak: int):
+        """Add calls of a phase to the totals, and item to the slowest if it's one of them."""
+        totals = self.phases.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0, "peak": 0})
+        totals["calls"] += calls
+        totals["wall"] += wall
+        totals["cpu"] += cpu
+        totals["peak"] = max(totals["peak"], peak)
+
+        if item is not None:
+            self._add_slowest(name, item, wall)
+
+    def count(self, name: str, value: int = 1):
+        """Add to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def _add_slowest(self, name: str, item: str, wall: float):
+        """Keep the item if it's one of the top slowest of the phase."""
+        if self.top <= 0:
+            return
+        slowest = self.slowest.setdefault(name, [])
+        if len(slowest) < self.top:
+            heapq.heappush(slowest, (wall, item))
+        else:
+            heapq.heappushpop(slowest, (wall, item))
+
+    def merge(self, other):
+        """Add the phases recorded by another profiler, e.g. from another process."""
+        for name, totals in other.phases.items():
+            self.add(name, None, totals["calls"], totals["wall"], totals["cpu"], totals["peak"])
+        for name, slowest in other.slowest.items():
+            for wall, item in slowest:
+                self._add_slowest(name, item, wall)
+        for name, value in other.counters.items():
+            self.count(name, value)
+
+    def to_dict(self):
+        """Return the profile as data which can be stored as JSON."""
+        return {
+            "phases": {
+                name: {
+                    "calls": totals["calls"],
+                    "wall_time": round(totals["wall"], 6),
+                    "cpu_time": round(totals["cpu"], 6),
+                    "peak_memory": totals["peak"],
+                }
+                for name, totals in self.phases.items()
+            },
+            "slowest": {
+                name: [
+                    {"name": item, "wall_time": round(wall, 6)}
+                    for wall, item in sorted(slowest, reverse=True)
+                ]
+                for name, slowest in self.slowest.items()
+            },
+            "counters": self.counters,
+        }
+
+    def write(self, path: str):
+        """Write the profile to a JSON file."""
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
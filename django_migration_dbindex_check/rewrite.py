@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Find the field changes which rewrite the whole table, locking it while they do."""
+
+from .estimate import DEFAULT_MAX_LENGTHS
+
+# The postgres column type of each field class. Relations take the type of the field they
+# point to, so aren't listed, along with custom fields whose type isn't known.
+COLUMN_TYPES = {
+    "autofield": "integer",
+    "bigautofield": "bigint",
+    "smallautofield": "smallint",
+    "integerfield": "integer",
+    "bigintegerfield": "bigint",
+    "smallintegerfield": "smallint",
+    "positiveintegerfield": "integer",
+    "positivebigintegerfield": "bigint",
+    "positivesmallintegerfield": "smallint",
+    "booleanfield": "boolean",
+    "nullbooleanfield": "boolean",
+    "charfield": "varchar",
+    "slugfield": "varchar",
+    "emailfield": "varchar",
+    "urlfield": "varchar",
+    "filefield": "varchar",
+    "imagefield": "varchar",
+    "filepathfield": "varchar",
+    "textfield": "text",
+    "datefield": "date",
+    "datetimefield": "timestamp with time zone",
+    "timefield": "time",
+    "durationfield": "interval",
+    "floatfield": "double precision",
+    "decimalfield": "numeric",
+    "uuidfield": "uuid",
+    "genericipaddressfield": "inet",
+    "ipaddressfield": "inet",
+    "binaryfield": "bytea",
+    "jsonfield": "jsonb",
+}
+
+# Changes of column type which postgres makes without rewriting the table, as the values are
+# stored in the same way.
+BINARY_COERCIBLE = {("varchar", "text")}
+
+# The reason given for a new column with a default, which MySQL before 8.0.12 and postgres
+# before 11 write to every existing row.
+DEFAULT_REWRITE = "adding the column with a default"
+
+
+def _get_max_length(field_type: str, max_length: int):
+    """Get the max_length of a field, or the max_length django gives its type by default."""
+    return max_length or DEFAULT_MAX_LENGTHS.get(field_type)
+
+
+def get_rewrite(old_type: str, old_max_length: int, new_type: str, new_max_length: int):
+    """
+    Get the reason an AlterField rewrites the table, or None if it doesn't.
+
+    The table is rewritten when the column type changes, e.g. from integer to bigint, or a
+    varchar is made shorter. Only field classes with a known column type are compared.
+    """
+    old_type = (old_type or "").lower()
+    new_type = (new_type or "").lower()
+    old_column = COLUMN_TYPES.get(old_type)
+    new_column = COLUMN_TYPES.get(new_type)
+    if old_column is None or new_column is None:
+        return None
+
+    if old_column != new_column:
+        if (old_column, new_column) in BINARY_COERCIBLE:
+            return None
+        return f"changing the column from {old_column} to {new_column}"
+
+    if new_column == "varchar":
+        old_max_length = _get_max_length(old_type, old_max_length)
+        new_max_length = _get_max_length(new_type, new_max_length)
+        if old_max_length and new_max_length and new_max_length < old_max_length:
+            return (
+                f"shrinking the column from varchar({old_max_length}) to "
+                f"varchar({new_max_length})"
+            )
+    return None
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Find the statements in the raw SQL of a migration which build an index or alter a table."""
+
+import re
+from typing import NamedTuple
+
+CREATE_INDEX = "CREATE INDEX"
+CREATE_UNIQUE_INDEX = "CREATE UNIQUE INDEX"
+ADD_INDEX = "ADD INDEX"
+ADD_CONSTRAINT = "ADD CONSTRAINT"
+ADD_COLUMN = "ADD COLUMN"
+DROP_INDEX = "DROP INDEX"
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+
+# A table, index or column name, optionally quoted and schema qualified.
+_NAME = r'(?:"[^"]+"|`[^`]+`|[\w$]+)(?:\.(?:"[^"]+"|`[^`]+`|[\w$]+))*'
+
+_CREATE_INDEX_RE = re.compile(
+    rf"CREATE\s+(UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?"
+    rf"(?:(?!ON\s)({_NAME})\s+)?ON\s+(?:ONLY\s+)?({_NAME})\s*(?:USING\s+\w+\s*)?\(",
+    re.I,
+)
+_ALTER_TABLE_RE = re.compile(
+    rf"ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({_NAME})\s+(.*)",
+    re.I | re.S,
+)
+# The table is only given on MySQL, e.g. DROP INDEX book_idx ON app_book ALGORITHM=INPLACE.
+_DROP_INDEX_RE = re.compile(
+    rf"DROP\s+INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?(.*?)(?:\s+ON\s+({_NAME}))?"
+    r"(?:\s+(?:CASCADE|RESTRICT))?(?:\s+(?:ALGORITHM|LOCK)\s*=?\s*\w+)*$",
+    re.I | re.S,
+)
+
+# The actions of an ALTER TABLE which are found, in the order they're tried.
+_DROP_INDEX_ACTION_RE = re.compile(rf"DROP\s+(?:INDEX|KEY)\s+({_NAME})", re.I)
+_ADD_CONSTRAINT_RE = re.compile(rf"ADD\s+CONSTRAINT\s+({_NAME})\s*(.*)", re.I | re.S)
+_ADD_UNNAMED_CONSTRAINT_RE = re.compile(
+    r"ADD\s+((?:PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|CHECK|EXCLUDE)\b.*)",
+    re.I | re.S,
+)
+_ADD_INDEX_RE = re.compile(rf"ADD\s+(?:UNIQUE\s+)?(?:INDEX|KEY)\s+({_NAME})?\s*(.*)", re.I | re.S)
+_ADD_COLUMN_RE = re.compile(
+    rf"ADD\s+(?:COLUMN\s+)?(?:IF\s+NOT\s+EXISTS\s+)?({_NAME})\s*(.*)",
+    re.I | re.S,
+)
+
+# Adding a constraint scans the table unless it isn't validated or uses an existing index.
+_CONSTRAINT_LOCK_FREE_RE = re.compile(r"\bNOT\s+VALID\b|\bUSING\s+INDEX\b", re.I)
+# A new column only locks the table to build an index or check its values, or to fill in a
+# default, which rewrites the table on MySQL and before postgres 11.
+_COLUMN_LOCK_RE = re.compile(r"\b(?:UNIQUE|PRIMARY\s+KEY|REFERENCES|CHECK|DEFAULT)\b", re.I)
+
+
+class SqlStatement(NamedTuple):
+    """
+    A statement in raw SQL which builds an index or alters a table.
+
+    kind is one of the statement kinds above, name is the name of the index, constraint or
+    column, if it has one, and columns are the columns or expressions it covers. lock_free is
+    True if it doesn't lock the table while building, e.g. CREATE INDEX CONCURRENTLY.
+    """
+
+    kind: str
+    table: str
+    name: str
+    columns: tuple
+    lock_free: bool
+
+
+def strip_comments(sql: str):
+    """Remove the comments from SQL, so commented out statements aren't found."""
+    return _COMMENT_RE.sub(" ", sql)
+
+
+def _unquote(name: str):
+    """Remove the quotes and schema from a name, e.g. "public"."app_book" is app_book."""
+    if name is None:
+        return None
+    return re.split(r'\.(?=(?:[^"]*"[^"]*")*[^"]*$)', name)[-1].strip('"`')
+
+
+def _split_top_level(text: str, separator: str = ","):
+    """Split text on a separator which isn't inside brackets or quotes."""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for index, char in enumerate(text):
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return [x.strip() for x in parts if x.strip()]
+
+
+def _get_bracketed(text: str, start: int):
+    """Get the text inside the brackets opened just before start."""
+    depth = 1
+    for index in range(start, len(text)):
+        if text[index] == "(":
+            depth += 1
+        elif text[index] == ")":
+            depth -= 1
+            if depth == 0:
+                return text[start:index]
+    return text[start:]
+
+
+def _get_columns(text: str):
+    """
+    Get the columns of a bracketed list, using the whole expression for expressions.
+
+    The ordering, operator class and MySQL prefix length of a column are left out.
+    """
+    columns = []
+    for column in _split_top_level(text):
+        match = re.match(rf"({_NAME})(?:\s*\(\d+\))?(?:\s+\w+)*$", column)
+        columns.append(_unquote(match.group(1)) if match else column)
+    return tuple(columns)
+
+
+def _get_first_columns(text: str):
+    """Get the columns of the first bracketed list in text, if there is one."""
+    start = text.find("(")
+    return () if start == -1 else _get_columns(_get_bracketed(text, start + 1))
+
+
+def _scan_alter_table(table: str, actions: str):
+    """Find the ALTER TABLE actions which add a constraint, index or column, or drop an index."""
+    statements = []
+    for action in _split_top_level(actions):
+        match = _DROP_INDEX_ACTION_RE.match(action)
+        if match:
+            statements.append(SqlStatement(DROP_INDEX, table, _unquote(match.group(1)), (), False))
+            continue
+
+        match = _ADD_INDEX_RE.match(action)
+        if match:
+            name = _unquote(match.group(1))
+            columns = _get_first_columns(match.group(2))
+            statements.append(SqlStatement(ADD_INDEX, table, name, columns, False))
+            continue
+
+        match = _ADD_CONSTRAINT_RE.match(action)
+        if match:
+            name, rest = _unquote(match.group(1)), match.group(2)
+        else:
+            match = _ADD_UNNAMED_CONSTRAINT_RE.match(action)
+            name, rest = None, action
+        if match:
+            lock_free = _CONSTRAINT_LOCK_FREE_RE.search(rest) is not None
+            columns = _get_first_columns(rest)
+            statements.append(SqlStatement(ADD_CONSTRAINT, table, name, columns, lock_free))
+            continue
+
+        match = _ADD_COLUMN_RE.match(action)
+        if match:
+            name = _unquote(match.group(1))
+            lock_free = _COLUMN_LOCK_RE.search(match.group(2)) is None
+            statements.append(SqlStatement(ADD_COLUMN, table, name, (name,), lock_free))
+    return statements
+
+
+def scan_sql(sql: str):
+    """
+    Find the statements in SQL which build an index, add to a table or drop an index.
+
+    This is a lightweight scanner for the SQL in migrations rather than a full SQL parser, it
+    finds CREATE [UNIQUE] INDEX, ALTER TABLE ... ADD CONSTRAINT / ADD COLUMN / ADD INDEX /
+    DROP INDEX and DROP INDEX statements. Returns a list of SqlStatements.
+    """
+    statements = []
+    for statement in _split_top_level(strip_comments(sql), ";"):
+        match = _CREATE_INDEX_RE.match(statement)
+        if match:
+            statements.append(
+                SqlStatement(
+                    CREATE_UNIQUE_INDEX if match.group(1) else CREATE_INDEX,
+                    _unquote(match.group(4)),
+                    _unquote(match.group(3)),
+                    _get_columns(_get_bracketed(statement, match.end())),
+                    match.group(2) is not None,
+                ),
+            )
+            continue
+
+        match = _ALTER_TABLE_RE.match(statement)
+        if match:
+            statements += _scan_alter_table(_unquote(match.group(1)), match.group(2))
+            continue
+
+        match = _DROP_INDEX_RE.match(statement)
+        if match:
+            table = _unquote(match.group(3))
+            lock_free = match.group(1) is not None
+            for name in _split_top_level(match.group(2)):
+                statements.append(SqlStatement(DROP_INDEX, table, _unquote(name), (), lock_free))
+    return statements
@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""Compact representations of migration operations and the state of replayed models."""
+
+import sys
+from typing import NamedTuple
+
+CREATE_MODEL = "CreateModel"
+ADD_FIELD = "AddField"
+ALTER_FIELD = "AlterField"
+ALTER_MODEL_TABLE = "AlterModelTable"
+ADD_INDEX = "AddIndex"
+REMOVE_INDEX = "RemoveIndex"
+ADD_CONSTRAINT = "AddConstraint"
+REMOVE_CONSTRAINT = "RemoveConstraint"
+ALTER_INDEX_TOGETHER = "AlterIndexTogether"
+ALTER_UNIQUE_TOGETHER = "AlterUniqueTogether"
+ADD_INDEX_CONCURRENTLY = "AddIndexConcurrently"
+REMOVE_INDEX_CONCURRENTLY = "RemoveIndexConcurrently"
+# Not replayed itself, its state_operations and database_operations are.
+SEPARATE_DATABASE_AND_STATE = "SeparateDatabaseAndState"
+RUN_SQL = "RunSQL"
+
+# The operations which are replayed, any others are ignored.
+OPERATION_KINDS = (
+    CREATE_MODEL,
+    ADD_FIELD,
+    ALTER_FIELD,
+    ALTER_MODEL_TABLE,
+    ADD_INDEX,
+    REMOVE_INDEX,
+    ADD_CONSTRAINT,
+    REMOVE_CONSTRAINT,
+    ALTER_INDEX_TOGETHER,
+    ALTER_UNIQUE_TOGETHER,
+    ADD_INDEX_CONCURRENTLY,
+    REMOVE_INDEX_CONCURRENTLY,
+    SEPARATE_DATABASE_AND_STATE,
+    RUN_SQL,
+)
+
+# The Meta option set by each of the "together" operations, used as their index type.
+TOGETHER_OPTIONS = {
+    ALTER_INDEX_TOGETHER: "index_together",
+    ALTER_UNIQUE_TOGETHER: "unique_together",
+}
+
+
+class Operation(NamedTuple):
+    """
+    A single change to a model made by a migration.
+
+    A CreateModel is represented by one operation with a field of None, which creates the
+    model, followed by one operation for each of its fields. value is the table name of an
+    AlterModelTable, or the db_table option of a CreateModel if it has one. field_type is the
+    class of a field, e.g. CharField, and max_length its max_length if it's set. null is the
+    null of a field, and has_default is True if it has a default other than None.
+    db_constraint is True for a relation with a foreign key constraint.
+
+    Indices and constraints have a field of None. Their value is their name, field_type is
+    their class (e.g. GinIndex or UniqueConstraint) and fields is a tuple of the fields they
+    cover, which is empty for a CheckConstraint. Those in the options of a CreateModel are
+    CreateModel operations following its fields. The fields of an AlterIndexTogether or
+    AlterUniqueTogether are a tuple of the field tuples of the whole option.
+
+    A RunSQL is represented by one operation for each statement found by sql.scan_sql, with
+    the table as its model, value the name of the index, constraint or column, field_type the
+    kind of statement (e.g. CREATE INDEX) and fields its columns.
+
+    lock_free is True for operations which don't lock the table to build their index, e.g.
+    AddIndexConcurrently, or an AddField in the state_operations of a SeparateDatabaseAndState
+    which builds the index concurrently. These don't rewrite the table either.
+    implicit_index is True for a field indexed by default rather than by db_index=True, e.g.
+    a ForeignKey, and unique is True if its index is unique, e.g. of a OneToOneField.
+    database_only is True for the model operations in the database_operations
+    of a SeparateDatabaseAndState, which change the database but not the models.
+    """
+
+    kind: str
+    model: str
+    field: str
+    db_index: bool
+    value: str = None
+    field_type: str = None
+    max_length: int = None
+    fields: tuple = None
+    lock_free: bool = False
+    null: bool = False
+    has_default: bool = False
+    db_constraint: bool = False
+    implicit_index: bool = False
+    unique: bool = False
+    database_only: bool = False
+
+
+class Statement(NamedTuple):
+    """A statement found in the raw SQL of an app, and the migration it was run in."""
+
+    kind: str
+    table: str
+    name: str
+    columns: tuple
+    migration: str
+    lock_free: bool
+
+
+class Validation(NamedTuple):
+    """A change which scanned a table to validate every row, and the migration it was in."""
+
+    model: str
+    field: str
+    reason: str
+    migration: str
+
+
+class Removal(NamedTuple):
+    """
+    An index which was dropped while locking its table, and the migration it was in.
+
+    The field is set for the db_index of a field, and the name for other indices. The model
+    of a DROP INDEX in a RunSQL is None if the index isn't in the Meta of a model. constraint
+    is True for the index of a unique constraint, e.g. unique=True or a UniqueConstraint,
+    which can't be dropped concurrently.
+    """
+
+    model: str
+    field: str
+    name: str
+    migration: str
+    constraint: bool = False
+
+
+class AppState(dict):
+    """
+    The replayed models of an app, a dict of {model_name: ModelState}, and its raw SQL.
+
+    statements is a list of the Statements run by the RunSQL operations of the app, less the
+    indices which have been dropped since. validations is a list of the Validations of the
+    app's tables, e.g. setting a field NOT NULL, and removals the Removals of its indices.
+    """
+
+    __slots__ = ("statements", "validations", "removals")
+
+    def __init__(self):
+        """Create the state of an app with no migrations."""
+        super().__init__()
+        self.statements = []
+        self.validations = []
+        self.removals = []
+
+
+class ModelState(dict):
+    """
+    The fields of a replayed model, a dict of {field_name: FieldState}, and its table.
+
+    indexes is a dict of {name: IndexState} of the indices and constraints set in the Meta of
+    the model. Those from index_together and unique_together are named with together_name.
+    created is the number of the migration which created the model.
+    """
+
+    __slots__ = ("db_table", "indexes", "created")
+
+    def __init__(self, db_table: str = None, created: str = None):
+        """db_table is the table name set in the migrations, or None for the default."""
+        super().__init__()
+        self.db_table = db_table
+        self.indexes = {}
+        self.created = created
+
+
+class IndexState:
+    """An index or constraint with an index, e.g. a UniqueConstraint, of a replayed model."""
+
+    __slots__ = ("index_type", "fields", "index_added", "lock_free")
+
+    def __init__(
+        self,
+        index_type: str,
+        fields: tuple,
+        index_added: str,
+        lock_free: bool = False,
+    ):
+        """index_type is its class, e.g. GinIndex, index_added the migration number."""
+        self.index_type = index_type
+        self.fields = fields
+        self.index_added = index_added
+        self.lock_free = lock_free
+
+    def __eq__(self, other):  # noqa: D105
+        if not isinstance(other, IndexState):
+            return NotImplemented
+        return (self.index_type, self.fields, self.index_added, self.lock_free) == (
+            other.index_type,
+            other.fields,
+            other.index_added,
+            other.lock_free,
+        )
+
+    def __repr__(self):  # noqa: D105
+        lock_free = ", lock_free=True" if self.lock_free else ""
+        return (
+            f"IndexState(index_type={self.index_type!r}, fields={self.fields!r}, "
+            f"index_added={self.index_added!r}{lock_free})"
+        )
+
+
+# The attributes of a FieldState which are compared besides its index, and their defaults.
+_FIELD_STATE_DEFAULTS = (
+    ("lock_free", False),
+    ("null", False),
+    ("rewrite", None),
+    ("rewrite_added", False),
+    ("db_constraint", False),
+    ("implicit_index", False),
+    ("unique", False),
+)
+
+
+class FieldState:
+    """The index state, type and options of a field as of the latest replayed migration."""
+
+    __slots__ = (
+        "is_index",
+        "index_added",
+        "field_type",
+        "max_length",
+        "lock_free",
+        "null",
+        "rewrite",
+        "rewrite_added",
+        "db_constraint",
+        "implicit_index",
+        "unique",
+    )
+
+    def __init__(
+        self,
+        is_index: bool,
+        index_added,
+        field_type: str = None,
+        max_length: int = None,
+        lock_free: bool = False,
+        null: bool = False,
+        rewrite: str = None,
+        rewrite_added=False,
+        db_constraint: bool = False,
+        implicit_index: bool = False,
+        unique: bool = False,
+    ):
+        """
+        index_added is the migration number the current index was added in, or False.
+
+        lock_free is True if the current index was added without locking the table.
+        rewrite is the reason the latest change to the field rewrote the table, see
+        rewrite.get_rewrite, and rewrite_added the migration number of that change, or False.
+        db_constraint is True for a relation with a foreign key constraint. implicit_index is
+        True if the current index is there by default rather than from db_index=True, and
+        unique True if it's a unique index.
+        """
+        self.is_index = is_index
+        self.index_added = index_added
+        self.field_type = field_type
+        self.max_length = max_length
+        self.lock_free = lock_free
+        self.null = null
+        self.rewrite = rewrite
+        self.rewrite_added = rewrite_added
+        self.db_constraint = db_constraint
+        self.implicit_index = implicit_index
+        self.unique = unique
+
+    def __eq__(self, other):  # noqa: D105
+        # The type and max_length are left out, they're only kept to find the rewrites, which
+        # are compared, and to estimate the size of the index.
+        if not isinstance(other, FieldState):
+            return NotImplemented
+        return self._compared() == other._compared()
+
+    def _compared(self):
+        """Get the attributes which are compared, its index and findings."""
+        return (self.is_index, self.index_added) + tuple(
+            getattr(self, name) for name, _ in _FIELD_STATE_DEFAULTS
+        )
+
+    def __repr__(self):  # noqa: D105
+        options = "".join(
+            f", {name}={getattr(self, name)!r}"
+            for name, default in _FIELD_STATE_DEFAULTS
+            if getattr(self, name) != default
+        )
+        return (
+            f"FieldState(is_index={self.is_index!r}, index_added={self.index_added!r}"
+            f"{options})"
+        )
+
+
+def make_operation(
+    kind: str,
+    model: str,
+    field: str,
+    db_index: bool,
+    value: str = None,
+    field_type: str = None,
+    max_length: int = None,
+    fields: tuple = None,
+    lock_free: bool = False,
+    null: bool = False,
+    has_default: bool = False,
+    db_constraint: bool = False,
+    implicit_index: bool = False,
+    unique: bool = False,
+    database_only: bool = False,
+):
+    """Create an operation, interning the names as they're repeated across migrations."""
+    return Operation(
+        kind,
+        None if model is None else sys.intern(model.lower()),
+        None if field is None else sys.intern(field.lower()),
+        db_index,
+        value,
+        None if field_type is None else sys.intern(field_type),
+        max_length,
+        None if fields is None else _to_tuple(fields),
+        lock_free,
+        null,
+        has_default,
+        db_constraint,
+        implicit_index,
+        unique,
+        database_only,
+    )
+
+
+def _to_tuple(fields):
+    """Convert the fields of an operation, lists when loaded from JSON, to lowercase tuples."""
+    if isinstance(fields, str):
+        return sys.intern(fields.lower())
+    return tuple(_to_tuple(x) for x in fields)
+
+
+def together_name(option: str, fields: tuple):
+    """Name an index from index_together or unique_together, e.g. index_together(a,b)."""
+    return f"{option}({','.join(fields)})"
+
+
+def load_operations(data: list):
+    """Load the operations of a file from the parse cache."""
+    return [make_operation(*x) for x in data]
+
+
+def dump_models(models: AppState):
+    """Convert replayed models to data which can be stored as JSON."""
+    data = {
+        model: {
+            "db_table": fields.db_table,
+            "created": fields.created,
+            "fields": {
+                name: [
+                    field.is_index,
+                    field.index_added,
+                    field.field_type,
+                    field.max_length,
+                    field.lock_free,
+                    field.null,
+                    field.rewrite,
+                    field.rewrite_added,
+                    field.db_constraint,
+                    field.implicit_index,
+                    field.unique,
+                ]
+                for name, field in fields.items()
+            },
+            "indexes": {
+                name: [index.index_type, index.fields, index.index_added, index.lock_free]
+                for name, index in fields.indexes.items()
+            },
+        }
+        for model, fields in models.items()
+    }
+    return {
+        "models": data,
+        "statements": models.statements,
+        "validations": models.validations,
+        "removals": models.removals,
+    }
+
+
+def load_models(data: dict):
+    """Load models stored with dump_models."""
+    models = AppState()
+    models.statements = [
+        Statement(kind, table, name, tuple(columns), *statement)
+        for kind, table, name, columns, *statement in data["statements"]
+    ]
+    models.validations = [Validation(*x) for x in data["validations"]]
+    models.removals = [Removal(*x) for x in data["removals"]]
+    for model, model_data in data["models"].items():
+        fields = models[sys.intern(model)] = ModelState(
+            model_data["db_table"],
+            model_data["created"],
+        )
+        for name, field in model_data["fields"].items():
+            fields[sys.intern(name)] = FieldState(*field)
+        for name, (index_type, index_fields, *index) in model_data["indexes"].items():
+            fields.indexes[name] = IndexState(index_type, _to_tuple(index_fields), *index)
+    return models
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Load table statistics exported from the database."""
+
+import csv
+import json
+from typing import NamedTuple
+
+# Accepted column names, e.g. from pg_class / pg_stat_user_tables or MySQL's
+# information_schema.TABLES. Column names are matched case insensitively.
+TABLE_COLUMNS = ("table", "table_name", "relname", "name")
+ROWS_COLUMNS = ("rows", "reltuples", "table_rows", "n_live_tup")
+SIZE_COLUMNS = ("size", "bytes", "total_bytes", "data_length")
+
+# relpages is a number of postgres pages, which are 8kB unless postgres was compiled otherwise.
+PAGES_COLUMN = "relpages"
+PAGE_SIZE = 8192
+
+
+class TableStats(NamedTuple):
+    """The number of rows and size in bytes of a table, either can be None if unknown."""
+
+    rows: int
+    size: int
+
+
+def _get_number(row: dict, columns: tuple):
+    """Get the first number in any of the columns, or None."""
+    for column in columns:
+        value = row.get(column)
+        if value is None or str(value).strip() in ("", "NULL", "null"):
+            continue
+        try:
+            value = int(float(value))
+        except ValueError:
+            raise ValueError(f"{column} must be a number, not {value}.")
+        # postgres uses -1 for tables which have never been analysed
+        return value if value >= 0 else None
+    return None
+
+
+def _parse_row(row: dict):
+    """Get the table name and stats from a row with any of the accepted columns."""
+    row = {str(key).strip().lower(): value for key, value in row.items()}
+    table = None
+    for column in TABLE_COLUMNS:
+        if row.get(column):
+            table = str(row[column]).strip()
+            break
+    if table is None:
+        raise ValueError(
+            f"Table statistics must have a table name column, one of {', '.join(TABLE_COLUMNS)}.",
+        )
+
+    size = _get_number(row, SIZE_COLUMNS)
+    if size is None:
+        pages = _get_number(row, (PAGES_COLUMN,))
+        size = None if pages is None else pages * PAGE_SIZE
+    return table, TableStats(_get_number(row, ROWS_COLUMNS), size)
+
+
+def _read_rows(path: str):
+    """Read the rows of a JSON or CSV (or tab separated) statistics file."""
+    with open(path, newline="") as file:
+        if path.lower().endswith(".json"):
+            data = json.load(file)
+            if isinstance(data, dict):
+                # {table: {"rows": ..., "size": ...}} or {table: rows}
+                rows = []
+                for table, value in data.items():
+                    if not isinstance(value, dict):
+                        value = {"rows": value}
+                    rows.append(dict(value, table=table))
+                return rows
+            return data
+
+        first_line = file.readline()
+        file.seek(0)
+        return list(csv.DictReader(file, delimiter="\t" if "\t" in first_line else ","))
+
+
+def load_table_stats(path: str):
+    """
+    Load a table statistics file, returning a dict of {table_name: TableStats}.
+
+    The file is either JSON, a list of objects or a dict keyed by table name, or CSV with a
+    header row. Table names are lower case, and schema qualified names (e.g. public.app_model)
+    are stored without the schema too.
+    """
+    stats = {}
+    for row in _read_rows(path):
+        table, table_stats = _parse_row(row)
+        table = table.lower()
+        stats[table] = table_stats
+        stats.setdefault(table.split(".")[-1], table_stats)
+    return stats
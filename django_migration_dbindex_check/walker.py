@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Helpers for finding migration files without visiting every directory in a project."""
+
+import os
+import re
+import subprocess
+
+# Directories which never contain migrations and are skipped without being descended into.
+SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__"}
+
+
+def _translate_pattern(pattern: str):
+    """Translate a gitignore glob into a regular expression."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "*":
+            if pattern.startswith("**/", i):
+                # Leading or middle "**/" matches zero or more directories.
+                regex += "(?:.*/)?"
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                regex += ".*"
+                i += 2
+                continue
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                start = i + 1
+                contents = pattern[start:end]
+                if contents.startswith("!"):
+                    contents = "^" + contents[1:]
+                regex += f"[{contents}]"
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return re.compile(regex + r"\Z")
+
+
+class GitIgnore:
+    """
+    Match paths against the .gitignore files found while walking a directory tree.
+
+    Paths are given relative to the root of the walk using "/" as the separator. Rules
+    from a .gitignore file only apply to paths below the directory that contains it, and
+    rules from deeper files take precedence, as they do in git.
+    """
+
+    def __init__(self):
+        """Start with no rules."""
+        self.rules = {}
+
+    def add_file(self, base: str, file_path: str):
+        """Read the rules from a .gitignore file found in the directory base."""
+        try:
+            with open(file_path) as file:
+                lines = file.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return
+
+        rules = []
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+
+            # Patterns containing a slash are relative to the .gitignore, others match a
+            # file or directory name at any depth.
+            anchored = "/" in line
+            rules.append((_translate_pattern(line.lstrip("/")), anchored, negate, dir_only))
+
+        if rules:
+            self.rules[base] = rules
+
+    def match(self, path: str, is_dir: bool):
+        """Return True if the path is ignored."""
+        ignored = False
+        parts = path.split("/")
+        for depth in range(len(parts)):
+            base = "/".join(parts[:depth])
+            for regex, anchored, negate, dir_only in self.rules.get(base, ()):
+                if dir_only and not is_dir:
+                    continue
+                target = "/".join(parts[depth:]) if anchored else parts[-1]
+                if regex.match(target):
+                    ignored = not negate
+        return ignored
+
+
+def _run_git(root_path: str, args: list):
+    """Run a git command in root_path and return the result, or None if git isn't found."""
+    try:
+        return subprocess.run(
+            ["git"] + args,
+            cwd=root_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except OSError:
+        return None
+
+
+def git_ls_files(root_path: str):
+    """
+    List the files git knows about in the migrations folders below root_path.
+
+    Tracked and untracked files are listed, excluding those ignored by git. Returns paths
+    relative to root_path, or None if root_path isn't in a git work tree.
+    """
+    result = _run_git(
+        root_path,
+        [
+            "ls-files",
+            "-z",
+            "--cached",
+            "--others",
+            "--exclude-standard",
+            "--",
+            "migrations/*",
+            "*/migrations/*",
+        ],
+    )
+    if result is None or result.returncode != 0:
+        return None
+
+    paths = []
+    for path in result.stdout.decode().split("\0"):
+        # Files deleted from the work tree are still listed until the deletion is staged.
+        if path and os.path.exists(os.path.join(root_path, path)):
+            paths.append(path)
+    return paths
+
+
+def git_commit_times(root_path: str):
+    """
+    Get the time of the latest commit of each file in the migrations folders below root_path.
+
+    Returns a dict of {path: unix time}, with paths relative to root_path, or None if
+    root_path isn't in a git work tree with any commits. Files which have never been
+    committed aren't included.
+    """
+    result = _run_git(
+        root_path,
+        [
+            "log",
+            "--format=%x00%ct",
+            "--name-only",
+            "--relative",
+            "--",
+            "migrations/*",
+            "*/migrations/*",
+        ],
+    )
+    if result is None or result.returncode != 0:
+        return None
+
+    times = {}
+    # The log is newest first, so the first time a file appears is its latest commit
+    for commit in result.stdout.decode().split("\0")[1:]:
+        lines = commit.splitlines()
+        for path in lines[1:]:
+            if path:
+                times.setdefault(path, int(lines[0]))
+    return times
+
+
+def git_changed_files(root_path: str, ref: str):
+    """
+    List the files below root_path which have been added or modified since ref.
+
+    Changes are compared against the merge base of ref and HEAD, so changes made on ref
+    since the current branch was created are ignored. Uncommitted and untracked files are
+    included. Returns paths relative to root_path.
+    """
+    merge_base = _run_git(root_path, ["merge-base", ref, "HEAD"])
+    if merge_base is not None and merge_base.returncode == 0:
+        base = merge_base.stdout.decode().strip()
+    else:
+        base = ref
+
+    paths = []
+    for args in [
+        ["diff", "--name-only", "-z", "--relative", "--diff-filter=AMR", base, "--"],
+        ["ls-files", "-z", "--others", "--exclude-standard"],
+    ]:
+        result = _run_git(root_path, args)
+        if result is None or result.returncode != 0:
+            error = "git not found" if result is None else result.stderr.decode().strip()
+            raise ValueError(f"Could not find the files changed since {ref}: {error}")
+        paths += [x for x in result.stdout.decode().split("\0") if x]
+
+    return paths
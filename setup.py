@@ -6,8 +6,7 @@ import os
 import re
 
 # 3rd-party
-from setuptools import find_packages
-from setuptools import setup
+from setuptools import find_packages, setup
 
 
 def get_version(package):
@@ -41,7 +40,7 @@ setup(
     author_email="jakelsaunders94@gmail.com",
     url="https://github.com/JakeLSaunders94/django-migration-dbindex-check",
     license="MIT",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "benchmarks"]),
     install_requires=[],
     setup_requires=[],
     tests_require=["pytest"],
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.6 on 2022-09-21 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("autofix_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="subTitle",
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="publisher",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="autofix_app.publisher"
+            ),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="isbn",
+            field=models.CharField(max_length=13, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="book",
+            name="title",
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["published"], name="book_published_idx"),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.6 on 2021-08-21 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("db_table_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelTable(
+            name="author",
+            table="people",
+        ),
+        migrations.AlterField(
+            model_name="book",
+            name="title",
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name="author",
+            name="name",
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name="shelf",
+            name="label",
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("lock_free_app", "0002_order_total_idx"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="order",
+                    name="reference",
+                    field=models.CharField(db_index=True, max_length=32),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    sql=(
+                        'CREATE INDEX CONCURRENTLY "lock_free_app_order_reference_idx" '
+                        'ON "lock_free_app_order" ("reference");'
+                    ),
+                    reverse_sql='DROP INDEX CONCURRENTLY "lock_free_app_order_reference_idx";',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lock_free_app", "0003_order_reference_idx"),
+    ]
+
+    operations = [
+        # The index already exists in the database, only the model state is out of date.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="order",
+                    name="customer",
+                    field=models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="lock_free_app.customer",
+                    ),
+                ),
+            ],
+        ),
+    ]
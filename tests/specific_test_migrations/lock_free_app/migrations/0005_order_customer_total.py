@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lock_free_app", "0004_order_customer"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="order",
+                    index=models.Index(fields=["customer", "total"], name="order_customer_total"),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    [
+                        # CREATE INDEX CONCURRENTLY can't run in an atomic migration
+                        "CREATE INDEX order_customer_total "
+                        "ON lock_free_app_order (customer_id, total);",
+                    ],
+                ),
+            ],
+        ),
+    ]
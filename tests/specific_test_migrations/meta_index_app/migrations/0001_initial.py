@@ -0,0 +1,50 @@
+# Generated by Django 4.0.6 on 2022-07-12 14:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Book",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("title", models.CharField(max_length=200)),
+                ("isbn", models.CharField(max_length=13)),
+                ("published", models.DateField()),
+                (
+                    "author",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="meta_index_app.author",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["-title"], name="book_title_idx")],
+                "index_together": {("title", "published")},
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="book",
+            constraint=models.UniqueConstraint(fields=("isbn",), name="unique_isbn"),
+        ),
+        migrations.AddConstraint(
+            model_name="book",
+            constraint=models.CheckConstraint(
+                check=models.Q(("published__gte", "2000-01-01")), name="recent_books"
+            ),
+        ),
+    ]
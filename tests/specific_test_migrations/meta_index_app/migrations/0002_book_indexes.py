@@ -0,0 +1,52 @@
+# Generated by Django 4.0.6 on 2022-08-02 09:41
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("meta_index_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="book",
+            name="book_title_idx",
+        ),
+        migrations.RemoveConstraint(
+            model_name="book",
+            name="recent_books",
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="book_title_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                django.db.models.functions.text.Lower("title"),
+                condition=models.Q(("published__gte", "2020-01-01")),
+                include=("isbn",),
+                name="book_title_lower",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="book",
+            constraint=models.UniqueConstraint(
+                fields=("author", "title"), name="unique_author_title"
+            ),
+        ),
+        migrations.AlterIndexTogether(
+            name="book",
+            index_together={("title", "published"), ("author", "published")},
+        ),
+        migrations.AlterUniqueTogether(
+            name="book",
+            unique_together=set(),
+        ),
+    ]
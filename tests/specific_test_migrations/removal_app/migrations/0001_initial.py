@@ -0,0 +1,36 @@
+# Generated by Django 4.0.6 on 2022-10-20 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Book",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("title", models.CharField(db_index=True, max_length=200)),
+                ("isbn", models.CharField(db_index=True, max_length=13)),
+                ("summary", models.TextField()),
+                ("published", models.DateField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["title", "isbn"], name="book_title_isbn_idx"),
+                    models.Index(fields=["published"], name="book_published_idx"),
+                ],
+                "index_together": {("title", "published")},
+            },
+        ),
+        migrations.RunSQL("CREATE INDEX book_summary_idx ON removal_app_book (summary);"),
+    ]
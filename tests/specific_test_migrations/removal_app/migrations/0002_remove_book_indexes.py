@@ -0,0 +1,27 @@
+# Generated by Django 4.0.6 on 2022-10-24 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("removal_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="book",
+            name="title",
+            field=models.CharField(max_length=200),
+        ),
+        migrations.RemoveIndex(
+            model_name="book",
+            name="book_title_isbn_idx",
+        ),
+        migrations.AlterIndexTogether(
+            name="book",
+            index_together=set(),
+        ),
+        migrations.RunSQL("DROP INDEX book_summary_idx;"),
+    ]
@@ -0,0 +1,30 @@
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("removal_app", "0002_remove_book_indexes"),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name="book",
+            name="book_published_idx",
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="book",
+                    name="isbn",
+                    field=models.CharField(max_length=13),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL("DROP INDEX CONCURRENTLY removal_app_book_isbn_4b6e4a2c;"),
+            ],
+        ),
+    ]
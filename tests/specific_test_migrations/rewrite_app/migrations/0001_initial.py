@@ -0,0 +1,27 @@
+# Generated by Django 4.0.6 on 2022-10-03 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Account",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("balance", models.IntegerField(default=0)),
+                ("name", models.CharField(max_length=200)),
+                ("code", models.CharField(max_length=20)),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.6 on 2022-10-10 15:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rewrite_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="account",
+            name="balance",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="account",
+            name="name",
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="account",
+            name="code",
+            field=models.TextField(),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="active",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="note",
+            field=models.TextField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="created",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
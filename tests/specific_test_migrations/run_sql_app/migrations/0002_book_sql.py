@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("run_sql_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                ("CREATE INDEX book_title_idx ON run_sql_app_book (title) WHERE id > %s;", [0]),
+                "ALTER TABLE run_sql_app_book ADD CONSTRAINT book_isbn_unique UNIQUE (isbn);",
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("run_sql_app", "0002_book_sql"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX CONCURRENTLY book_isbn_idx ON run_sql_app_book (isbn);
+                DROP INDEX CONCURRENTLY book_title_idx;
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY book_isbn_idx;",
+        ),
+    ]
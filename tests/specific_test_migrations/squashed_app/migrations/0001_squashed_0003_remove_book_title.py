@@ -0,0 +1,31 @@
+# Generated by Django 3.2.6 on 2021-08-20 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ("library", "0001_initial"),
+        ("library", "0002_alter_book_title"),
+        ("library", "0003_remove_book_title"),
+    ]
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Book",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("author", models.CharField(max_length=200)),
+            ],
+        ),
+    ]
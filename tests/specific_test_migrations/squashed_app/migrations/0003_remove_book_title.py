@@ -0,0 +1,17 @@
+# Generated by Django 3.2.6 on 2021-08-20 10:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0002_alter_book_title"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="book",
+            name="title",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.6 on 2021-08-20 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0001_squashed_0003_remove_book_title"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="book",
+            name="author",
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.6 on 2022-10-14 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Customer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Order",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("total", models.IntegerField(null=True)),
+                ("note", models.TextField(null=True)),
+                ("customer", models.BigIntegerField(db_column="customer_id")),
+            ],
+            options={
+                "constraints": [
+                    models.CheckConstraint(
+                        check=models.Q(("total__gte", 0)), name="order_total_positive"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.0.6 on 2022-10-17 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("validation_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="total",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="customer",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="validation_app.customer",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.CheckConstraint(
+                check=models.Q(("total__lte", 1000000)), name="order_total_limit"
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="order",
+                    name="note",
+                    field=models.TextField(),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    "ALTER TABLE validation_app_order "
+                    "ADD CONSTRAINT order_note_not_null CHECK (note IS NOT NULL) NOT VALID;",
+                ),
+                migrations.RunSQL(
+                    "ALTER TABLE validation_app_order VALIDATE CONSTRAINT order_note_not_null;",
+                ),
+                migrations.RunSQL(
+                    "ALTER TABLE validation_app_order ALTER COLUMN note SET NOT NULL;",
+                ),
+            ],
+        ),
+    ]
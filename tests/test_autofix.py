@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""Tests for rewriting migrations to build their indices concurrently."""
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import call, patch
+
+from django_migration_dbindex_check.autofix import (
+    MAX_NAME_LENGTH,
+    create_index_name,
+    fix_migration,
+)
+from django_migration_dbindex_check.checker import DBIndexChecker
+
+MIGRATION = '''from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add the indices."""
+
+    dependencies = [
+        ("app", "0001_initial"),
+    ]
+
+    operations = [
+{operations}
+    ]
+'''
+
+
+class TestCreateIndexName(TestCase):
+    """Tests for the create_index_name function."""
+
+    def test_short_names_are_table_column_and_hash(self):
+        """The name should be the same as django gives the index of a db_index field."""
+        assert create_index_name("app_book", "title") == "app_book_title_30dcdb86"
+
+    def test_long_names_are_truncated(self):
+        """Names longer than postgres allows should be shortened, keeping the hash."""
+        name = create_index_name("a" * 50, "b" * 50)
+
+        assert len(name) <= MAX_NAME_LENGTH
+        assert name.startswith("a" * 26 + "_" + "b" * 26 + "_")
+
+
+class TestFixMigration(TestCase):
+    """Tests for the fix_migration function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "0002_indexes.py")
+
+    def tearDown(self) -> None:  # noqa: D102
+        self.tmp_dir.cleanup()
+
+    def fix(self, operations: str, findings: list):  # noqa: D102
+        with open(self.path, "w") as file:
+            file.write(MIGRATION.format(operations=operations))
+        fixed = fix_migration(self.path, findings)
+        with open(self.path) as file:
+            return fixed, file.read()
+
+    def test_add_index_is_made_concurrent(self):
+        """An AddIndex should become an AddIndexConcurrently in a non-atomic migration."""
+        finding = {"app": "app", "model": "book", "field": None, "index": "book_idx"}
+        fixed, text = self.fix(
+            "        migrations.AddIndex(\n"
+            '            model_name="book",\n'
+            '            index=models.Index(fields=["title"], name="book_idx"),\n'
+            "        ),",
+            [finding],
+        )
+
+        assert fixed == [finding]
+        assert text == (
+            "from django.contrib.postgres.operations import AddIndexConcurrently\n"
+            "from django.db import migrations, models\n"
+            "\n"
+            "\n"
+            "class Migration(migrations.Migration):\n"
+            '    """Add the indices."""\n'
+            "\n"
+            "    atomic = False\n"
+            "\n"
+            "    dependencies = [\n"
+            '        ("app", "0001_initial"),\n'
+            "    ]\n"
+            "\n"
+            "    operations = [\n"
+            "        AddIndexConcurrently(\n"
+            '            model_name="book",\n'
+            '            index=models.Index(fields=["title"], name="book_idx"),\n'
+            "        ),\n"
+            "    ]\n"
+        )
+
+    def test_implicit_index_is_turned_off_in_the_database(self):
+        """A ForeignKey should be added with db_index=False, then indexed concurrently."""
+        fixed, text = self.fix(
+            "        migrations.AddField(\n"
+            '            model_name="book",\n'
+            '            name="author",\n'
+            '            field=models.ForeignKey(on_delete=models.CASCADE, to="app.author"),\n'
+            "        ),",
+            [{"app": "app", "model": "book", "field": "author", "table": "books"}],
+        )
+
+        assert len(fixed) == 1
+        assert (
+            "            database_operations=[\n"
+            "                migrations.AddField(\n"
+            '                    model_name="book",\n'
+            '                    name="author",\n'
+            "                    field=models.ForeignKey(db_index=False, "
+            'on_delete=models.CASCADE, to="app.author"),\n'
+            "                ),\n"
+            "                AddIndexConcurrently(\n"
+            '                    model_name="book",\n'
+            "                    index=models.Index(\n"
+            '                        fields=["author"],\n'
+            f'                        name="{create_index_name("books", "author_id")}",\n'
+            "                    ),\n"
+            "                ),\n"
+            "            ],\n"
+        ) in text
+
+    def test_atomic_migrations_are_made_non_atomic(self):
+        """An existing atomic = True should be changed."""
+        with open(self.path, "w") as file:
+            file.write(
+                MIGRATION.format(
+                    operations="        migrations.AddIndex(\n"
+                    '            model_name="book",\n'
+                    '            index=models.Index(fields=["title"], name="book_idx"),\n'
+                    "        ),",
+                ).replace("    dependencies", "    atomic = True\n\n    dependencies"),
+            )
+
+        fix_migration(self.path, [{"app": "app", "model": "book", "index": "book_idx"}])
+
+        with open(self.path) as file:
+            text = file.read()
+        assert "    atomic = False\n\n    dependencies" in text
+        assert "atomic = True" not in text
+
+    def test_unique_fields_are_not_rewritten(self):
+        """The index of a unique field is built by its constraint, so is left alone."""
+        operations = (
+            "        migrations.AddField(\n"
+            '            model_name="book",\n'
+            '            name="isbn",\n'
+            "            field=models.CharField(max_length=13, unique=True),\n"
+            "        ),"
+        )
+        fixed, text = self.fix(operations, [{"app": "app", "model": "book", "field": "isbn"}])
+
+        assert fixed == []
+        assert text == MIGRATION.format(operations=operations)
+
+
+class TestAutofix(TestCase):
+    """Tests for checking a project with autofix."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        shutil.copytree(
+            "specific_test_migrations/autofix_app",
+            os.path.join(self.tmp_dir.name, "autofix_app"),
+        )
+
+    def tearDown(self) -> None:  # noqa: D102
+        self.tmp_dir.cleanup()
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_fixed_migrations_only_have_unfixable_indices(self, mock_exit, mock_print):
+        """After rewriting, only the index of the unique field should be left, with every check."""
+        DBIndexChecker(autofix=True).check_project(self.tmp_dir.name)
+
+        path = os.path.join(self.tmp_dir.name, "autofix_app/migrations/0002_book_indexes.py")
+        mock_print.assert_any_call(
+            f"Rewrote migration {path} to build 4 of its new indices concurrently.",
+            file=sys.stderr,
+        )
+        mock_exit.assert_called_once_with(1)
+
+        mock_print.reset_mock()
+        DBIndexChecker(
+            check_removals=True,
+            check_rewrites=True,
+            check_validations=True,
+        ).check_project(self.tmp_dir.name)
+
+        assert [x for x in mock_print.call_args_list if x[1].get("file") == sys.stderr] == [
+            call(
+                "A new db_index was added to field:isbn in model:book in app:autofix_app. This "
+                "was added in migration 0002.",
+                file=sys.stderr,
+            ),
+        ]
+
+    @patch("django_migration_dbindex_check.checker.fix_migration")
+    def test_findings_which_are_not_new_indices_are_skipped(self, mock_fix):
+        """Removals, rewrites and validations can't be fixed by building an index concurrently."""
+        checker = DBIndexChecker(autofix=True)
+        apps = {"app": {"migration_files": [("0002_book.py", "app/migrations/0002_book.py")]}}
+        finding = {"app": "app", "model": "book", "field": "title", "migration": "0002"}
+
+        checker._autofix(
+            apps,
+            [
+                dict(finding, removal=None),
+                dict(finding, rewrite="changing the column from integer to bigint"),
+                dict(finding, validation="setting field:title NOT NULL"),
+            ],
+        )
+
+        mock_fix.assert_not_called()
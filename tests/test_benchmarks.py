@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Tests for the benchmark corpus generator and harness."""
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from benchmarks.generate import generate_project
+from benchmarks.run import benchmark_project, run
+from django_migration_dbindex_check.checker import DBIndexChecker
+
+
+class TestGenerateProject(TestCase):
+    """Tests for the generate_project function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+
+    def tearDown(self) -> None:  # noqa: D102
+        self.tmp_dir.cleanup()
+
+    @patch("django_migration_dbindex_check.checker.print")
+    def test_generated_project_is_found_by_the_checker(self, mock_print):
+        """Every generated migration should be found, and none of the excluded copies."""
+        paths = generate_project(self.root, apps=3, migrations=20, exclude_dirs=2)
+        apps = DBIndexChecker()._walk_files(self.root)
+
+        assert sorted(apps) == ["app_0000", "app_0001", "app_0002"]
+        assert sorted(x[1] for app in apps.values() for x in app["migration_files"]) == sorted(
+            paths,
+        )
+        assert os.path.isdir(os.path.join(self.root, "venv_1", "lib", "site-packages"))
+
+    def test_same_seed_generates_the_same_project(self):
+        """Projects should be reproducible so results can be compared between runs."""
+        first = generate_project(os.path.join(self.root, "a"), apps=2, migrations=10, seed=3)
+        second = generate_project(os.path.join(self.root, "b"), apps=2, migrations=10, seed=3)
+
+        for path, other in zip(first, second):
+            with open(path) as file, open(other) as other_file:
+                assert file.read() == other_file.read()
+
+    @patch("django_migration_dbindex_check.checker.print")
+    def test_generated_migrations_can_be_replayed(self, mock_print):
+        """Every AlterField should refer to a field created by an earlier migration."""
+        generate_project(self.root, apps=2, migrations=50, alter_rate=0.9)
+        result = benchmark_project(self.root)
+
+        assert result["files"] == 100
+        assert result["errors"] > 0
+
+
+class TestRun(TestCase):
+    """Tests for the run function."""
+
+    def test_results_have_a_time_for_each_phase(self):
+        """Each size should have the time taken by every phase."""
+        with patch("benchmarks.run.print"):
+            results = run(sizes=[30], repeat=2)
+
+        assert len(results["results"]) == 1
+        result = results["results"][0]
+        assert result["size"] == result["files"] == 30
+        for phase in ["walk", "parse", "replay", "analyse", "total"]:
+            assert result[phase] >= 0
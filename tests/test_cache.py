@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Tests for the parse cache."""
+import json
+import os
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from django_migration_dbindex_check.cache import ParseCache
+
+
+class TestParseCache(TestCase):
+    """Tests for the ParseCache class."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        self.cache = ParseCache(self.cache_dir, self.tmp_dir.name)
+
+    def tearDown(self) -> None:  # noqa: D102
+        self.tmp_dir.cleanup()
+
+    def test_get_returns_none_for_missing_entry(self):
+        """A key which has never been set should be a miss."""
+        assert self.cache.get(self.cache.key(b"source")) is None
+        assert self.cache.misses == 1
+
+    def test_set_and_get_round_trip(self):
+        """Data set for a key should be returned by get."""
+        key = self.cache.key(b"source")
+        self.cache.set(key, os.path.join(self.tmp_dir.name, "app/migrations/0001.py"), [1, 2])
+
+        assert self.cache.get(key) == [1, 2]
+        assert self.cache.hits == 1
+
+    def test_entries_store_relative_paths(self):
+        """Entries should not contain the absolute path of the checkout."""
+        key = self.cache.key(b"source")
+        self.cache.set(key, os.path.join(self.tmp_dir.name, "app/migrations/0001.py"), [])
+
+        with open(self.cache._entry_path(key)) as file:
+            entry = json.load(file)
+        assert entry["path"] == "app/migrations/0001.py"
+
+    def test_key_depends_on_checker_version(self):
+        """Upgrading the checker should invalidate all entries."""
+        key = self.cache.key(b"source")
+        with patch("django_migration_dbindex_check.cache.__version__", "99.0.0"):
+            assert self.cache.key(b"source") != key
+
+    def test_corrupt_entry_is_a_miss(self):
+        """An unreadable entry should be ignored rather than raise."""
+        key = self.cache.key(b"source")
+        os.makedirs(os.path.dirname(self.cache._entry_path(key)))
+        with open(self.cache._entry_path(key), "w") as file:
+            file.write("{not json")
+
+        assert self.cache.get(key) is None
+
+    def test_evict_removes_least_recently_used_entries(self):
+        """Eviction should remove the oldest entries until the cache fits max_size."""
+        keys = [self.cache.key(str(x).encode()) for x in range(3)]
+        for index, key in enumerate(keys):
+            self.cache.set(key, self.tmp_dir.name, "x" * 100)
+            past = time.time() - 100 + index
+            os.utime(self.cache._entry_path(key), (past, past))
+
+        entry_size = os.path.getsize(self.cache._entry_path(keys[0]))
+        self.cache.max_size = entry_size * 2
+        self.cache.evict()
+
+        assert not os.path.exists(self.cache._entry_path(keys[0]))
+        assert os.path.exists(self.cache._entry_path(keys[1]))
+        assert os.path.exists(self.cache._entry_path(keys[2]))
+
+    def test_checkpoints_round_trip(self):
+        """Models stored at a checkpoint should be returned for the same chain key."""
+        key = self.cache.chain_key("", "0001_initial.py", b"source")
+        models = {"model": {"field": {"is_index": True, "index_added": "0001"}}}
+        self.cache.set_checkpoint(key, os.path.join(self.tmp_dir.name, "0001_initial.py"), models)
+
+        assert self.cache.get_checkpoint(key) == models
+        assert self.cache.get(key) is None
+
+    def test_headers_are_stored_next_to_the_operations(self):
+        """A header and the operations of the same file should be kept under the same key."""
+        key = self.cache.key(b"source")
+        path = os.path.join(self.tmp_dir.name, "0001_initial.py")
+        header = {"replaces": [], "dependencies": [["app", "0001_initial"]], "run_before": []}
+        self.cache.set(key, path, [1, 2])
+        self.cache.set_header(key, path, header)
+
+        assert self.cache.get_header(key) == header
+        assert self.cache.get(key) == [1, 2]
+
+    def test_chain_key_depends_on_previous_migrations(self):
+        """The same migration following a different history should have a different key."""
+        first = self.cache.chain_key("", "0001_initial.py", b"one")
+        other = self.cache.chain_key("", "0001_initial.py", b"two")
+
+        assert self.cache.chain_key(first, "0002_next.py", b"next") != self.cache.chain_key(
+            other,
+            "0002_next.py",
+            b"next",
+        )
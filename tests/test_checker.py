@@ -1,12 +1,32 @@
 # -*- coding: utf-8 -*-
 """Tests for the checker class."""
+import ast
 import configparser
+import json
 import os
+import shutil
+import sys
+import tempfile
+import time
 from configparser import ConfigParser
 from unittest import TestCase
 from unittest.mock import MagicMock, call, patch
 
+from django_migration_dbindex_check.cache import ParseCache
 from django_migration_dbindex_check.checker import DBIndexChecker
+from django_migration_dbindex_check.profiler import Profiler
+from django_migration_dbindex_check.state import (
+    AppState,
+    FieldState,
+    IndexState,
+    Operation,
+    Removal,
+    Statement,
+    Validation,
+    dump_models,
+    load_models,
+)
+from tests.test_walker import commit_at, make_git_repo
 
 
 class TestWalkFiles(TestCase):
@@ -69,6 +89,111 @@ class TestWalkFiles(TestCase):
             },
         }
 
+    def test_walk_files_with_git_returns_the_same_files(self):
+        """Listing files with git ls-files should give the same result as walking the tree."""
+        checker = DBIndexChecker()
+        expected = checker._walk_files("example_migrations")
+
+        checker = DBIndexChecker(use_git=True)
+        with patch("django_migration_dbindex_check.checker.os.walk") as mock_walk:
+            result = checker._walk_files("example_migrations")
+
+        mock_walk.assert_not_called()
+        assert result == expected
+
+    def test_walk_files_does_not_descend_into_excluded_directories(self):
+        """Excluded and git ignored directories should be pruned from the walk."""
+        with tempfile.TemporaryDirectory() as root:
+            for app in ["app", "venv/lib/app_in_venv", "node_modules/pkg/app_in_npm"]:
+                os.makedirs(os.path.join(root, app, "migrations"))
+                open(os.path.join(root, app, "migrations", "0001_initial.py"), "w").close()
+            with open(os.path.join(root, "migrations_check.cfg"), "w") as file:
+                file.write("[DJANGO_MIGRATION_DBINDEX_CHECK]\nexclude_paths = venv\n")
+            with open(os.path.join(root, ".gitignore"), "w") as file:
+                file.write("node_modules/\n")
+
+            visited = []
+            real_walk = os.walk
+
+            def spy_walk(path):
+                for root_dir, dirs, files in real_walk(path):
+                    visited.append(os.path.relpath(root_dir, root))
+                    yield root_dir, dirs, files
+
+            checker = DBIndexChecker()
+            with patch("django_migration_dbindex_check.checker.os.walk", spy_walk):
+                result = checker._walk_files(root)
+
+        assert list(result.keys()) == ["app"]
+        assert "venv" not in visited
+        assert "node_modules" not in visited
+
+    def test_walk_files_only_lists_apps_of_given_files(self):
+        """Only the apps containing the given files should be found, with all their files."""
+        checker = DBIndexChecker(
+            files=[
+                "the_app/migrations/0002_added_index_to_existing_field.py",
+                "other_service/models.py",
+                "../outside/migrations/0001_initial.py",
+            ],
+        )
+        with patch.object(checker, "_walk_migration_paths") as mock_walk:
+            apps = checker._walk_files("example_migrations")
+
+        mock_walk.assert_not_called()
+        assert apps == {
+            "the_app": {
+                "migration_files": [
+                    [
+                        "0001_initial_migrations.py",
+                        "example_migrations/the_app/migrations/0001_initial_migrations.py",
+                    ],
+                    [
+                        "0002_added_index_to_existing_field.py",
+                        "example_migrations/the_app/migrations/"
+                        "0002_added_index_to_existing_field.py",
+                    ],
+                ],
+            },
+        }
+
+    def test_walk_files_leaves_out_migrations_replaced_by_a_squash(self):
+        """Only the squashed migration should be returned, not the ones it replaces."""
+        for parser in ["fast", "ast"]:
+            checker = DBIndexChecker(parser=parser)
+            result = checker._walk_files("specific_test_migrations/squashed_app")
+
+            assert [x[0] for x in result["squashed_app"]["migration_files"]] == [
+                "0001_squashed_0003_remove_book_title.py",
+                "0004_alter_book_author.py",
+            ]
+
+    def test_walk_files_orders_migrations_by_their_dependencies(self):
+        """Migrations should be in dependency order, and the graph available for scheduling."""
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "app", "migrations"))
+            migrations = {
+                "0001_initial.py": "[]",
+                "0002_b.py": '[("app", "0002_c")]',
+                "0002_c.py": '[("app", "0001_initial")]',
+            }
+            for name, dependencies in migrations.items():
+                with open(os.path.join(root, "app", "migrations", name), "w") as file:
+                    file.write(
+                        "class Migration(migrations.Migration):\n"
+                        f"    dependencies = {dependencies}\n",
+                    )
+
+            checker = DBIndexChecker()
+            result = checker._walk_files(root)
+
+        assert [x[0] for x in result["app"]["migration_files"]] == [
+            "0001_initial.py",
+            "0002_c.py",
+            "0002_b.py",
+        ]
+        assert checker.graph.app_order("app") == ["0001_initial", "0002_c", "0002_b"]
+
 
 class TestGetAllRelevantOperations(TestCase):
     """Tests for the _get_all_relevant_operations_nodes_for_file."""
@@ -77,20 +202,18 @@ class TestGetAllRelevantOperations(TestCase):
         dir_path = os.path.dirname(os.path.realpath(__file__))
         os.chdir(dir_path)  # Make the relative imports work
 
-    def test_function_returns_the_correct_create_model_nodes_for_example_file(self):
-        """Should return the correct CreateModel nodes for the example file."""
+    def get_nodes(self, operation):
+        """Get the nodes of one type of operation from the example file."""
         checker = DBIndexChecker()
-        (
-            create_models,
-            alter_fields,
-            add_fields,
-        ) = checker._get_all_relevant_operations_nodes_for_file(
+        nodes = checker._get_all_relevant_operations_nodes_for_file(
             "./example_migrations/important_functionality/migrations/0001_initial_migrations.py",
         )
+        return [x for x in nodes if x.func.attr == operation]
 
+    def test_function_returns_the_correct_create_model_nodes_for_example_file(self):
+        """Should return the correct CreateModel nodes for the example file."""
         model_names = []
-        for create_model in create_models:
-            assert create_model.func.attr == "CreateModel"
+        for create_model in self.get_nodes("CreateModel"):
             try:
                 model_name = [x.value.value for x in create_model.keywords if x.arg == "name"][0]
             except AttributeError:
@@ -107,19 +230,8 @@ class TestGetAllRelevantOperations(TestCase):
 
     def test_function_returns_the_correct_alter_field_nodes_for_example_file(self):
         """Should return the correct AlterField nodes for the example file."""
-        checker = DBIndexChecker()
-        (
-            create_models,
-            alter_fields,
-            add_fields,
-        ) = checker._get_all_relevant_operations_nodes_for_file(
-            "./example_migrations/important_functionality/migrations/0001_initial_migrations.py",
-        )
-
         model_names = []
-        for alter_field in alter_fields:
-            assert alter_field.func.attr == "AlterField"
-
+        for alter_field in self.get_nodes("AlterField"):
             try:
                 model_name = [
                     x.value.value for x in alter_field.keywords if x.arg == "model_name"
@@ -140,19 +252,8 @@ class TestGetAllRelevantOperations(TestCase):
 
     def test_function_returns_the_correct_add_field_nodes_for_example_file(self):
         """Should return the correct AddField nodes for the example file."""
-        checker = DBIndexChecker()
-        (
-            create_models,
-            alter_fields,
-            add_fields,
-        ) = checker._get_all_relevant_operations_nodes_for_file(
-            "./example_migrations/important_functionality/migrations/0001_initial_migrations.py",
-        )
-
         model_names = []
-        for add_field in add_fields:
-            assert add_field.func.attr == "AddField"
-
+        for add_field in self.get_nodes("AddField"):
             try:
                 model_name = [x.value.value for x in add_field.keywords if x.arg == "model_name"][
                     0
@@ -178,22 +279,29 @@ class TestGetAllRelevantOperations(TestCase):
             ["change_actual", "Variants_Affected"],
         ]
 
+    def test_function_returns_nodes_in_file_order(self):
+        """The operations should be returned in the order they are applied."""
+        checker = DBIndexChecker()
+        nodes = checker._get_all_relevant_operations_nodes_for_file(
+            "./example_migrations/important_functionality/migrations/0001_initial_migrations.py",
+        )
+
+        kinds = [x.func.attr for x in nodes]
+        assert kinds[:5] == ["CreateModel"] * 5
+        assert kinds.index("AlterField") > kinds.index("AddField")
+
     def test_function_ignores_classes_that_are_not_migrations(self):
         """If there are other classes in the file, ignore them."""
 
         checker = DBIndexChecker()
-        (
-            create_models,
-            alter_fields,
-            add_fields,
-        ) = checker._get_all_relevant_operations_nodes_for_file(
+        nodes = checker._get_all_relevant_operations_nodes_for_file(
             "./specific_test_migrations/function_ignores_classes_that_are_not_migrations.py",
         )
-        assert len(create_models) == 1
+        assert len(nodes) == 1
         try:
-            model_name = [x.value.value for x in create_models[0].keywords if x.arg == "name"][0]
+            model_name = [x.value.value for x in nodes[0].keywords if x.arg == "name"][0]
         except AttributeError:
-            model_name = [x.value.s for x in create_models[0].keywords if x.arg == "name"][0]
+            model_name = [x.value.s for x in nodes[0].keywords if x.arg == "name"][0]
         assert model_name == "Change_Actual"
 
 
@@ -230,29 +338,322 @@ class TestCheckForDBIndexInFieldObject(TestCase):
         assert result is False
 
 
-def get_create_models_list(file_path):
-    """Get the create models list from the _get_all_relevant... function."""
-    checker = DBIndexChecker()
-    create, alter, add = checker._get_all_relevant_operations_nodes_for_file(file_path)
-    return create
+def parse_call(source: str):
+    """Parse the source of a call, e.g. models.SlugField(), into an ast.Call node."""
+    return ast.parse(source).body[0].value
 
 
-def get_alter_fields_list(file_path):
-    """Get the create models list from the _get_all_relevant... function."""
-    checker = DBIndexChecker()
-    create, alter, add = checker._get_all_relevant_operations_nodes_for_file(file_path)
-    return alter
+class TestImplicitIndices(TestCase):
+    """Tests for the indices Django adds without db_index, and their replay."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.checker = DBIndexChecker()
+
+    def test_relations_and_slugs_are_indexed_by_default(self):
+        """ForeignKey, OneToOneField and SlugField are indexed without a db_index kwarg."""
+        for source in [
+            'models.ForeignKey(on_delete=models.CASCADE, to="app.Model")',
+            'models.OneToOneField(on_delete=models.CASCADE, to="app.Model")',
+            "models.SlugField()",
+        ]:
+            assert self.checker._check_for_db_index_in_field_object(parse_call(source)) is True
+
+    def test_db_index_false_overrides_default(self):
+        """An explicit db_index=False should turn off the default index."""
+        field = parse_call('models.ForeignKey(db_index=False, to="app.Model")')
+
+        assert self.checker._check_for_db_index_in_field_object(field) is False
+
+    def test_unique_fields_are_always_indexed(self):
+        """Unique fields are indexed, whatever their db_index."""
+        for source in [
+            "models.CharField(max_length=10, unique=True, db_index=False)",
+            'models.OneToOneField(db_index=False, to="app.Model")',
+        ]:
+            assert self.checker._check_for_db_index_in_field_object(parse_call(source)) is True
+
+    def test_fields_without_an_index_on_their_table(self):
+        """Many to many fields and primary keys shouldn't be reported."""
+        for source in [
+            'models.ManyToManyField(db_index=True, to="app.Model")',
+            "models.BigAutoField(primary_key=True, serialize=False)",
+            "models.UUIDField(primary_key=True, unique=True)",
+            "IntegerField(db_index=settings.INDEX_ALL)",
+        ]:
+            assert self.checker._check_for_db_index_in_field_object(parse_call(source)) is False
+
+    def test_implicit_index_added_by_alter_field_is_tracked(self):
+        """Removing db_index=False from a ForeignKey should record a new index."""
+        models_dict = {}
+        self.checker._apply_operations(
+            models_dict,
+            [
+                Operation("CreateModel", "book", None, False),
+                Operation("CreateModel", "book", "author", False, None, "ForeignKey"),
+            ],
+            "0001",
+        )
+        self.checker._apply_operations(
+            models_dict,
+            [Operation("AlterField", "book", "author", True, None, "ForeignKey")],
+            "0002",
+        )
+
+        assert models_dict["book"]["author"] == FieldState(True, "0002")
+
+    def test_implicit_indices_of_new_tables_are_lock_free(self):
+        """Implicit indices of a model created in the same migration are built with it."""
+        models_dict = {}
+        author = 'models.ForeignKey(on_delete=models.CASCADE, to="app.Author")'
+        nodes = [
+            parse_call(
+                'migrations.CreateModel(name="Book", fields=[("id", models.AutoField('
+                f'primary_key=True)), ("author", {author})])',
+            ),
+            parse_call(f'migrations.AddField(model_name="book", name="editor", field={author})'),
+        ]
+        operations = self.checker._extract_operations(nodes)
+        self.checker._apply_operations(models_dict, operations, "0001")
+
+        assert models_dict["book"]["author"] == FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        )
+        assert models_dict["book"]["editor"] == FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        )
+
+        nodes = [
+            parse_call(f'migrations.AddField(model_name="book", name="owner", field={author})'),
+            parse_call(f'migrations.AlterField(model_name="book", name="author", field={author})'),
+        ]
+        operations = self.checker._extract_operations(nodes)
+        self.checker._apply_operations(models_dict, operations, "0002")
+
+        assert models_dict["book"]["owner"] == FieldState(
+            True,
+            "0002",
+            db_constraint=True,
+            implicit_index=True,
+        )
+        assert models_dict["book"]["author"] == FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        )
+
+    def alter_field(self, before: str, after: str):  # noqa: D102
+        models_dict = AppState()
+        nodes = [
+            parse_call(
+                'migrations.CreateModel(name="Book", fields=[("id", models.AutoField('
+                f'primary_key=True)), ("author", {before})])',
+            ),
+        ]
+        self.checker._apply_operations(
+            models_dict,
+            self.checker._extract_operations(nodes),
+            "0001",
+        )
+        nodes = [
+            parse_call(f'migrations.AlterField(model_name="book", name="author", field={after})'),
+        ]
+        self.checker._apply_operations(
+            models_dict,
+            self.checker._extract_operations(nodes),
+            "0002",
+        )
+        return models_dict["book"]["author"]
+
+    def test_explicit_db_index_on_an_implicit_index_is_not_new(self):
+        """Giving a ForeignKey db_index=True doesn't build another index."""
+        field = self.alter_field(
+            'models.ForeignKey(on_delete=models.CASCADE, to="app.Author")',
+            'models.ForeignKey(db_index=True, on_delete=models.CASCADE, to="app.Author")',
+        )
+
+        assert field.index_added == "0001"
+        assert field.lock_free
+
+    def test_unique_index_replacing_an_index_is_new(self):
+        """Making an indexed field unique builds a unique index while locking the table."""
+        field = self.alter_field(
+            "models.CharField(db_index=True, max_length=20)",
+            "models.CharField(max_length=20, unique=True)",
+        )
+
+        assert field == FieldState(True, "0002", implicit_index=True, unique=True)
+
+    def test_one_to_one_field_replacing_a_foreign_key_is_new(self):
+        """A OneToOneField's index is unique, unlike the index of a ForeignKey."""
+        field = self.alter_field(
+            'models.ForeignKey(on_delete=models.CASCADE, to="app.Author")',
+            'models.OneToOneField(on_delete=models.CASCADE, to="app.Author")',
+        )
+
+        assert field == FieldState(
+            True,
+            "0002",
+            db_constraint=True,
+            implicit_index=True,
+            unique=True,
+        )
+
+
+class TestExtractOperations(TestCase):
+    """Tests for the _extract_operations function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.checker = DBIndexChecker()
+
+    def test_function_returns_operations_for_example_file(self):
+        """Function should reduce the operation nodes to names and db_index values."""
+        operations = self.checker._extract_operations(
+            self.checker._get_all_relevant_operations_nodes_for_file(
+                "./example_migrations/important_functionality/migrations/"
+                "0003_added_new_field_db_index.py",
+            ),
+        )
+
+        assert operations == [
+            Operation(
+                "AddField",
+                "change_status",
+                "all_signatures_required",
+                True,
+                field_type="BooleanField",
+                has_default=True,
+            ),
+        ]
+
+    def test_function_returns_fields_of_create_models(self):
+        """Function should return the model of a CreateModel followed by each of its fields."""
+        operations = self.checker._extract_operations(
+            self.checker._get_all_relevant_operations_nodes_for_file(
+                "./specific_test_migrations/function_ignores_classes_that_are_not_migrations.py",
+            ),
+        )
+
+        assert operations == [
+            Operation("CreateModel", "change_actual", None, False),
+            Operation("CreateModel", "change_actual", "id", False, None, "AutoField"),
+            Operation(
+                "CreateModel",
+                "change_actual",
+                "change_initiation_date",
+                False,
+                field_type="DateTimeField",
+            ),
+            Operation(
+                "CreateModel",
+                "change_actual",
+                "change_description",
+                False,
+                field_type="TextField",
+            ),
+            Operation(
+                "CreateModel",
+                "change_actual",
+                "change_risk_assesment",
+                False,
+                field_type="TextField",
+            ),
+            Operation(
+                "CreateModel",
+                "change_actual",
+                "cut_in_number",
+                False,
+                None,
+                "CharField",
+                200,
+            ),
+            Operation(
+                "CreateModel",
+                "change_actual",
+                "cut_out_number",
+                False,
+                None,
+                "CharField",
+                200,
+            ),
+            Operation(
+                "CreateModel",
+                "change_actual",
+                "change_initiator",
+                True,
+                field_type="ForeignKey",
+                db_constraint=True,
+                implicit_index=True,
+            ),
+        ]
+
+    def test_function_returns_db_tables_of_models(self):
+        """The db_table option of a CreateModel and AlterModelTable tables should be kept."""
+        operations = self.checker._extract_operations(
+            self.checker._get_all_relevant_operations_nodes_for_file(
+                "./specific_test_migrations/db_table_app/migrations/0002_add_indexes.py",
+            ),
+        )
+        create_models = self.checker._extract_operations(
+            self.checker._get_all_relevant_operations_nodes_for_file(
+                "./specific_test_migrations/db_table_app/migrations/0001_initial.py",
+            ),
+        )
 
+        assert operations[0] == Operation("AlterModelTable", "author", None, False, "people")
+        assert create_models[0] == Operation("CreateModel", "book", None, False, "legacy_books")
+        assert create_models[3] == Operation("CreateModel", "author", None, False, None)
 
-def get_add_fields_list(file_path):
-    """Get the create models list from the _get_all_relevant... function."""
+
+class TestGetOperationsForFile(TestCase):
+    """Tests for the _get_operations_for_file function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.file_path = (
+            "./example_migrations/important_functionality/migrations/"
+            "0003_added_new_field_db_index.py"
+        )
+
+    def test_function_stores_and_reuses_cached_operations(self):
+        """The second call should come from the cache without parsing the file."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            checker = DBIndexChecker()
+            checker.cache = ParseCache(cache_dir, ".")
+            checker.profiler = Profiler()
+            first = checker._get_operations_for_file(self.file_path)
+
+            with patch.object(checker, "_get_all_relevant_operations_nodes_for_file") as mock:
+                second = checker._get_operations_for_file(self.file_path)
+
+            mock.assert_not_called()
+            assert first == second
+            assert checker.cache.hits == 1
+            assert checker.cache.misses == 1
+            assert checker.profiler.counters == {"files_parsed": 1, "files_cached": 1}
+
+
+def get_operations(file_path, kind=None):
+    """Get the operations, optionally of one kind, from the _get_operations_for_file function."""
     checker = DBIndexChecker()
-    create, alter, add = checker._get_all_relevant_operations_nodes_for_file(file_path)
-    return add
+    operations = checker._get_operations_for_file(file_path)
+    return [x for x in operations if kind is None or x.kind == kind]
 
 
-class TestCreateModelsToModelsDict(TestCase):
-    """Tests for the _create_models_to_models_dict function."""
+class TestApplyCreateModels(TestCase):
+    """Tests for the _apply_operations function with CreateModel operations."""
 
     def setUp(self) -> None:  # noqa: D102
         dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -261,221 +662,310 @@ class TestCreateModelsToModelsDict(TestCase):
 
     def test_function_adds_correct_information_from_sample_file(self):
         """Function should add the correct model information from the sample migration."""
-        create_models = get_create_models_list(
+        create_models = get_operations(
             "./example_migrations/important_functionality/migrations/0001_initial_migrations.py",
+            "CreateModel",
         )
         models_dict = {}
-        self.checker._create_models_to_models_dict(
+        self.checker._apply_operations(
             models_dict=models_dict,
-            create_models_list=create_models,
+            operations=create_models,
             migration_number=4,
         )
 
         assert models_dict == {
             "change_actual": {
-                "id": {"is_index": False, "index_added": False},
-                "change_initiation_date": {"is_index": False, "index_added": False},
-                "change_description": {"is_index": False, "index_added": False},
-                "change_risk_assesment": {"is_index": False, "index_added": False},
-                "cut_in_number": {"is_index": False, "index_added": False},
-                "cut_out_number": {"is_index": False, "index_added": False},
-                "change_initiator": {"is_index": False, "index_added": False},
+                "id": FieldState(False, False),
+                "change_initiation_date": FieldState(False, False),
+                "change_description": FieldState(False, False),
+                "change_risk_assesment": FieldState(False, False),
+                "cut_in_number": FieldState(False, False),
+                "cut_out_number": FieldState(False, False),
+                "change_initiator": FieldState(
+                    True,
+                    4,
+                    lock_free=True,
+                    db_constraint=True,
+                    implicit_index=True,
+                ),
             },
             "change_signoffs": {
-                "id": {"is_index": False, "index_added": False},
-                "signature_date": {"is_index": False, "index_added": False},
-                "changeover_department_required": {"is_index": False, "index_added": False},
-                "parent_change_actual": {"is_index": False, "index_added": False},
-                "signature_user": {"is_index": False, "index_added": False},
-                "signoff_pay_grade_required": {"is_index": False, "index_added": False},
+                "id": FieldState(False, False),
+                "signature_date": FieldState(False, False, null=True),
+                "changeover_department_required": FieldState(
+                    True,
+                    4,
+                    lock_free=True,
+                    db_constraint=True,
+                    implicit_index=True,
+                ),
+                "parent_change_actual": FieldState(
+                    True,
+                    4,
+                    lock_free=True,
+                    db_constraint=True,
+                    implicit_index=True,
+                ),
+                "signature_user": FieldState(
+                    True,
+                    4,
+                    lock_free=True,
+                    null=True,
+                    db_constraint=True,
+                    implicit_index=True,
+                ),
+                "signoff_pay_grade_required": FieldState(
+                    True,
+                    4,
+                    lock_free=True,
+                    db_constraint=True,
+                    implicit_index=True,
+                ),
             },
             "change_signoffs_required": {
-                "id": {"is_index": False, "index_added": False},
-                "changeover_department_required": {"is_index": False, "index_added": False},
+                "id": FieldState(False, False),
+                "changeover_department_required": FieldState(
+                    True,
+                    4,
+                    lock_free=True,
+                    db_constraint=True,
+                    implicit_index=True,
+                ),
             },
             "change_status": {
-                "id": {"is_index": False, "index_added": False},
-                "status_name": {"is_index": False, "index_added": False},
+                "id": FieldState(False, False),
+                "status_name": FieldState(False, False),
             },
             "change_type": {
-                "id": {"is_index": False, "index_added": False},
-                "change_type_name": {"is_index": False, "index_added": False},
-                "change_type_description": {"is_index": False, "index_added": False},
+                "id": FieldState(False, False),
+                "change_type_name": FieldState(False, False),
+                "change_type_description": FieldState(False, False),
             },
         }
 
 
-class TestAlterFieldsToModelsDict(TestCase):
-    """Tests for the _alter_fields_to_models_dict function."""
+class TestApplyAlterFields(TestCase):
+    """Tests for the _apply_operations function with AlterField operations."""
 
     def setUp(self) -> None:  # noqa: D102
         dir_path = os.path.dirname(os.path.realpath(__file__))
         os.chdir(dir_path)  # Make the relative imports work
         self.checker = DBIndexChecker()
-        self.base_models = {}
-        self.checker._create_models_to_models_dict(
+        self.base_models = AppState()
+        self.checker._apply_operations(
             self.base_models,
-            get_create_models_list(
+            get_operations(
                 "./example_migrations/important_functionality/"
                 "migrations/0001_initial_migrations.py",
+                "CreateModel",
             ),
             1,
         )
 
-    def get_alter_fields_list(self, file_path):
-        """Get the alter fields list from the _get_all_relevant... function."""
-        checker = self.checker
-        create, alter, add = checker._get_all_relevant_operations_nodes_for_file(file_path)
-        return alter
-
     def test_function_adds_correct_information_from_sample_file(self):
         """Function should add the correct model information from the sample migration."""
-        alter_fields = self.get_alter_fields_list(
+        alter_fields = get_operations(
             "./example_migrations/important_functionality/migrations/0001_initial_migrations.py",
+            "AlterField",
         )
 
-        self.checker._alter_fields_to_models_dict(
+        self.checker._apply_operations(
             models_dict=self.base_models,
-            alter_fields_list=alter_fields,
+            operations=alter_fields,
             migration_number=1,
         )
 
-        assert self.base_models["change_actual"]["change_initiator"]["is_index"] is True
+        assert self.base_models["change_actual"]["change_initiator"].is_index is True
 
     def test_function_updates_migration_number_if_db_index_switched_on(self):
         """If the DB index is switched on then the migration number should be updated."""
 
         # Switch the index off in migration 1.
-        alter_fields = self.get_alter_fields_list(
+        alter_fields = get_operations(
             "./specific_test_migrations/switch_db_index_off_in_alter_field.py",
         )
-        self.checker._alter_fields_to_models_dict(
-            models_dict=self.base_models,
-            alter_fields_list=alter_fields,
-            migration_number=1,
-        )
+        self.checker._apply_operations(self.base_models, alter_fields, 1)
 
         # Switch the index on in migration 2.
-        alter_fields = self.get_alter_fields_list(
+        alter_fields = get_operations(
             "./specific_test_migrations/switch_db_index_on_in_alter_field.py",
         )
-        self.checker._alter_fields_to_models_dict(
-            models_dict=self.base_models,
-            alter_fields_list=alter_fields,
-            migration_number=2,
-        )
+        self.checker._apply_operations(self.base_models, alter_fields, 2)
 
-        assert self.base_models["change_actual"]["change_initiator"]["is_index"] is True
-        assert self.base_models["change_actual"]["change_initiator"]["index_added"] == 2
+        assert self.base_models["change_actual"]["change_initiator"].is_index is True
+        assert self.base_models["change_actual"]["change_initiator"].index_added == 2
 
     def test_function_does_not_update_migration_number_if_db_index_still_on(self):
         """If the DB index remians on then the migration number should not be updated."""
 
         # Switch index on in migration 1.
-        alter_fields = self.get_alter_fields_list(
+        alter_fields = get_operations(
             "./specific_test_migrations/switch_db_index_on_in_alter_field.py",
         )
-        self.checker._alter_fields_to_models_dict(
-            models_dict=self.base_models,
-            alter_fields_list=alter_fields,
-            migration_number=1,
-        )
+        self.checker._apply_operations(self.base_models, alter_fields, 1)
 
         # Index remains on in migration 2.
-        alter_fields = self.get_alter_fields_list(
-            "./specific_test_migrations/switch_db_index_on_in_alter_field.py",
-        )
-        self.checker._alter_fields_to_models_dict(
-            models_dict=self.base_models,
-            alter_fields_list=alter_fields,
-            migration_number=2,
-        )
+        self.checker._apply_operations(self.base_models, alter_fields, 2)
 
-        assert self.base_models["change_actual"]["change_initiator"]["is_index"] is True
-        assert self.base_models["change_actual"]["change_initiator"]["index_added"] == 1
+        assert self.base_models["change_actual"]["change_initiator"].is_index is True
+        assert self.base_models["change_actual"]["change_initiator"].index_added == 1
 
     def test_keyerror_raised_if_field_or_model_does_not_exist(self):
         """Function should raise an error if the model or field has not already been parsed."""
-        alter = self.get_alter_fields_list(
-            "specific_test_migrations/alter_a_non_existant_field.py",
-        )
+        alter = get_operations("specific_test_migrations/alter_a_non_existant_field.py")
         with self.assertRaises(KeyError) as e:
-            self.checker._alter_fields_to_models_dict(self.base_models, alter, 2)
+            self.checker._apply_operations(self.base_models, alter, 2)
         assert "change_status" in str(e.exception)
         assert "fake_field" in str(e.exception)
 
 
-class TestAddFieldsToModelsDict(TestCase):
-    """Tests for the _add_fields_to_models_dict function."""
+class TestApplyAddFields(TestCase):
+    """Tests for the _apply_operations function with AddField operations."""
 
     def setUp(self) -> None:  # noqa: D102
         dir_path = os.path.dirname(os.path.realpath(__file__))
         os.chdir(dir_path)  # Make the relative imports work
         self.checker = DBIndexChecker()
-        self.base_models = {}
-        self.checker._create_models_to_models_dict(
+        self.base_models = AppState()
+        self.checker._apply_operations(
             self.base_models,
-            get_create_models_list(
+            get_operations(
                 "./example_migrations/important_functionality/"
                 "migrations/0001_initial_migrations.py",
+                "CreateModel",
             ),
             1,
         )
 
     def test_function_adds_new_field_to_existing_model(self):
         """Function should add the correct model information from the sample migration."""
-        add_fields = get_add_fields_list("./specific_test_migrations/add_field_wth_db_index_on.py")
-        self.checker._add_fields_to_models_dict(
+        add_fields = get_operations("./specific_test_migrations/add_field_wth_db_index_on.py")
+        self.checker._apply_operations(
             models_dict=self.base_models,
-            add_fields_list=add_fields,
+            operations=add_fields,
             migration_number=4,
         )
 
-        assert self.base_models["change_actual"]["madeupfield"] == {
-            "is_index": True,
-            "index_added": 4,
-        }
+        assert self.base_models["change_actual"]["madeupfield"] == FieldState(
+            True,
+            4,
+            null=True,
+            db_constraint=True,
+        )
+
+    def test_field_states_have_no_instance_dict(self):
+        """Field states use __slots__ to keep the replayed models small."""
+        add_fields = get_operations("./specific_test_migrations/add_field_wth_db_index_on.py")
+        self.checker._apply_operations(self.base_models, add_fields, 4)
+
+        assert not hasattr(self.base_models["change_actual"]["madeupfield"], "__dict__")
 
 
 important_functionality_models_list = {
     "change_actual": {
-        "id": {"is_index": False, "index_added": False},
-        "change_initiation_date": {"is_index": False, "index_added": False},
-        "change_description": {"is_index": False, "index_added": False},
-        "change_risk_assesment": {"is_index": False, "index_added": False},
-        "cut_in_number": {"is_index": False, "index_added": False},
-        "cut_out_number": {"is_index": False, "index_added": False},
-        "change_initiator": {"is_index": True, "index_added": "0001"},
-        "change_type": {"is_index": False, "index_added": False},
-        "lines_affected": {"is_index": False, "index_added": False},
-        "machines_affected": {"is_index": False, "index_added": False},
-        "operations_affected": {"is_index": False, "index_added": False},
-        "status": {"is_index": False, "index_added": False},
-        "variants_affected": {"is_index": False, "index_added": False},
+        "id": FieldState(False, False),
+        "change_initiation_date": FieldState(False, False),
+        "change_description": FieldState(False, False),
+        "change_risk_assesment": FieldState(False, False),
+        "cut_in_number": FieldState(False, False),
+        "cut_out_number": FieldState(False, False),
+        "change_initiator": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            null=True,
+            db_constraint=True,
+        ),
+        "change_type": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
+        "lines_affected": FieldState(False, False),
+        "machines_affected": FieldState(False, False),
+        "operations_affected": FieldState(False, False),
+        "status": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
+        "variants_affected": FieldState(False, False),
     },
     "change_signoffs": {
-        "id": {"is_index": False, "index_added": False},
-        "signature_date": {"is_index": False, "index_added": False},
-        "changeover_department_required": {"is_index": False, "index_added": False},
-        "parent_change_actual": {"is_index": False, "index_added": False},
-        "signature_user": {"is_index": False, "index_added": False},
-        "signoff_pay_grade_required": {"is_index": False, "index_added": False},
+        "id": FieldState(False, False),
+        "signature_date": FieldState(False, False, null=True),
+        "changeover_department_required": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
+        "parent_change_actual": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
+        "signature_user": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            null=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
+        "signoff_pay_grade_required": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
     },
     "change_signoffs_required": {
-        "id": {"is_index": False, "index_added": False},
-        "changeover_department_required": {"is_index": False, "index_added": False},
-        "parent_change_type": {"is_index": False, "index_added": False},
-        "signoff_pay_grade_required": {"is_index": False, "index_added": False},
+        "id": FieldState(False, False),
+        "changeover_department_required": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
+        "parent_change_type": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
+        "signoff_pay_grade_required": FieldState(
+            True,
+            "0001",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        ),
     },
     "change_status": {
-        "id": {"is_index": False, "index_added": False},
-        "status_name": {"is_index": False, "index_added": False},
-        "all_signatures_required": {"is_index": True, "index_added": "0003"},
+        "id": FieldState(False, False),
+        "status_name": FieldState(False, False),
+        "all_signatures_required": FieldState(
+            True,
+            "0003",
+            rewrite="adding the column with a default",
+            rewrite_added="0003",
+        ),
     },
     "change_type": {
-        "id": {"is_index": False, "index_added": False},
-        "change_type_name": {"is_index": False, "index_added": False},
-        "change_type_description": {"is_index": False, "index_added": False},
+        "id": FieldState(False, False),
+        "change_type_name": FieldState(False, False),
+        "change_type_description": FieldState(False, False),
     },
 }
 
@@ -497,14 +987,11 @@ class TestMapModels(TestCase):
             "all_apps dict instead of a specific app instance?"
         )
 
-    @patch(
-        "django_migration_dbindex_check.checker.DBIndexChecker."
-        "_get_all_relevant_operations_nodes_for_file",
-    )
-    def test_function_calls_get_all_relevant_operations_with_correct_path(self, mock_get):
-        """Function should call _get_relevant_operations... with all filepaths."""
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker._get_operations_for_file")
+    def test_function_calls_get_operations_with_correct_path(self, mock_get):
+        """Function should call _get_operations_for_file with all filepaths."""
         self.checker = DBIndexChecker()  # Re-init with patch
-        mock_get.return_value = [], [], []
+        mock_get.return_value = []
         app_dict = {
             "migration_files": [
                 ["0001_test.py", "fake/path/0001_test.py"],
@@ -518,23 +1005,12 @@ class TestMapModels(TestCase):
         ]
         assert mock_get.call_args_list == calls
 
-    @patch("django_migration_dbindex_check.checker.DBIndexChecker._alter_fields_to_models_dict")
-    @patch("django_migration_dbindex_check.checker.DBIndexChecker._add_fields_to_models_dict")
-    @patch("django_migration_dbindex_check.checker.DBIndexChecker._create_models_to_models_dict")
-    @patch(
-        "django_migration_dbindex_check.checker.DBIndexChecker."
-        "_get_all_relevant_operations_nodes_for_file",
-    )
-    def test_function_calls_mutators_with_correct_args(
-        self,
-        mock_get,
-        mock_create,
-        mock_add,
-        mock_alter,
-    ):
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker._apply_operations")
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker._get_operations_for_file")
+    def test_function_calls_apply_operations_with_correct_args(self, mock_get, mock_apply):
         """Function should mutate a blank dict with the ops from each migration file."""
         self.checker = DBIndexChecker()  # Re-init with patch
-        mock_get.return_value = ["create_ops"], ["alter_ops"], ["add_ops"]
+        mock_get.return_value = ["ops"]
         app_dict = {
             "migration_files": [
                 ["0001_test.py", "fake/path/0001_test.py"],
@@ -544,23 +1020,10 @@ class TestMapModels(TestCase):
 
         returned_models = self.checker._map_models(app_dict, "/fake/root")
 
-        mock_create_calls = [
-            call({}, ["create_ops"], "0001"),
-            call({}, ["create_ops"], "0002"),
+        assert mock_apply.call_args_list == [
+            call({}, ["ops"], "0001"),
+            call({}, ["ops"], "0002"),
         ]
-        assert mock_create.call_args_list == mock_create_calls
-
-        mock_add_calls = [
-            call({}, ["add_ops"], "0001"),
-            call({}, ["add_ops"], "0002"),
-        ]
-        assert mock_add.call_args_list == mock_add_calls
-
-        mock_alter_calls = [
-            call({}, ["alter_ops"], "0001"),
-            call({}, ["alter_ops"], "0002"),
-        ]
-        assert mock_alter.call_args_list == mock_alter_calls
         assert returned_models == {}
 
     def test_integration_function_outputs_correct_data_from_sample_files(self):
@@ -571,6 +1034,809 @@ class TestMapModels(TestCase):
 
         assert models_dict == important_functionality_models_list
 
+    def test_function_resumes_replay_from_checkpoint(self):
+        """Only the migrations after the longest matching checkpoint should be replayed."""
+        app_dict = self.checker._walk_files("./example_migrations/important_functionality")[
+            "important_functionality"
+        ]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.checker.cache = ParseCache(cache_dir, ".")
+            self.checker._map_models(
+                {"migration_files": app_dict["migration_files"][:2]},
+                "",
+            )
+
+            with patch.object(
+                self.checker,
+                "_get_operations_for_file",
+                wraps=self.checker._get_operations_for_file,
+            ) as mock_get:
+                models_dict = self.checker._map_models(app_dict, "")
+
+        assert mock_get.call_args_list == [call(app_dict["migration_files"][2][1])]
+        assert models_dict == important_functionality_models_list
+
+    @patch("django_migration_dbindex_check.checker.CHECKPOINT_INTERVAL", 1)
+    def test_function_does_not_use_checkpoint_if_earlier_migration_changed(self):
+        """A checkpoint should only be used if every migration up to it is unchanged."""
+        with tempfile.TemporaryDirectory() as root:
+            shutil.copytree("./example_migrations/important_functionality", f"{root}/app")
+            app_dict = self.checker._walk_files(root)["app"]
+            self.checker.cache = ParseCache(os.path.join(root, "cache"), root)
+            self.checker._map_models(app_dict, "")
+
+            with open(app_dict["migration_files"][0][1], "a") as file:
+                file.write("# A change to the first migration\n")
+            with patch.object(
+                self.checker,
+                "_get_operations_for_file",
+                wraps=self.checker._get_operations_for_file,
+            ) as mock_get:
+                models_dict = self.checker._map_models(app_dict, "")
+
+        assert len(mock_get.call_args_list) == 3
+        assert models_dict == important_functionality_models_list
+
+    def test_integration_function_replays_squashed_migrations_once(self):
+        """Replaying a squashed app should not replay the replaced history again."""
+        app_dict = self.checker._walk_files("specific_test_migrations/squashed_app")
+        models_dict = self.checker._map_models(app_dict["squashed_app"], "")
+
+        assert models_dict == {
+            "book": {
+                "id": FieldState(False, False),
+                "author": FieldState(True, "0004"),
+            },
+        }
+
+    def test_squashed_findings_have_the_number_of_the_squash(self):
+        """A new index from a replaced migration is ignored by the squash's own number."""
+        with tempfile.TemporaryDirectory() as root:
+            shutil.copytree("specific_test_migrations/squashed_app", f"{root}/squashed_app")
+            path = f"{root}/squashed_app/migrations/0001_squashed_0003_remove_book_title.py"
+            with open(path) as file:
+                source = file.read()
+            # e.g. an AddField from 0002 folded into the CreateModel by the squash
+            with open(path, "w") as file:
+                file.write(
+                    source.replace(
+                        '("author", models.CharField(max_length=200)),',
+                        '("author", models.CharField(max_length=200)), '
+                        '("isbn", models.CharField(db_index=True, max_length=13)),',
+                    ),
+                )
+            app_dict = self.checker._walk_files(f"{root}/squashed_app")
+            models_dict = self.checker._map_models(app_dict["squashed_app"], "")
+
+        errors = self.checker._analyse_models(models_dict, 1)
+        assert [(x["field"], x["migration"]) for x in errors] == [
+            ("author", "0004"),
+            ("isbn", "0001"),
+        ]
+        errors = self.checker._analyse_models(models_dict, 2)
+        assert [x["field"] for x in errors] == ["author"]
+
+    def test_integration_function_tracks_db_tables(self):
+        """The table of each model should follow its options and AlterModelTable."""
+        app_dict = self.checker._walk_files("specific_test_migrations/db_table_app")
+        models_dict = self.checker._map_models(app_dict["db_table_app"], "")
+
+        assert models_dict["book"].db_table == "legacy_books"
+        assert models_dict["author"].db_table == "people"
+        assert models_dict["shelf"].db_table is None
+        assert load_models(dump_models(models_dict))["book"].db_table == "legacy_books"
+
+    def test_integration_function_tracks_field_types(self):
+        """The type of each field should be kept, and updated by AlterField."""
+        app_dict = self.checker._walk_files("specific_test_migrations/db_table_app")
+        models_dict = self.checker._map_models(app_dict["db_table_app"], "")
+        models_dict = load_models(dump_models(models_dict))
+
+        assert models_dict["book"]["title"].field_type == "CharField"
+        assert models_dict["book"]["title"].max_length == 200
+        assert models_dict["shelf"]["label"].max_length == 20
+
+
+class TestMetaIndexes(TestCase):
+    """Tests for replaying the indices and constraints in the Meta of models."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.checker = DBIndexChecker()
+        app_dict = self.checker._walk_files("specific_test_migrations/meta_index_app")
+        self.models = self.checker._map_models(app_dict["meta_index_app"], "")
+
+    def test_integration_function_tracks_indexes_and_constraints(self):
+        """Indices should be added and removed, constraints without an index ignored."""
+        assert self.models["book"].indexes == {
+            "index_together(title,published)": IndexState(
+                "index_together",
+                ("title", "published"),
+                "0001",
+                lock_free=True,
+            ),
+            "unique_isbn": IndexState("UniqueConstraint", ("isbn",), "0001", lock_free=True),
+            "book_title_gin": IndexState("GinIndex", ("title",), "0002"),
+            "book_title_lower": IndexState("Index", ("title",), "0002"),
+            "unique_author_title": IndexState("UniqueConstraint", ("author", "title"), "0002"),
+            "index_together(author,published)": IndexState(
+                "index_together",
+                ("author", "published"),
+                "0002",
+            ),
+        }
+
+    def test_indexes_are_stored_in_checkpoints(self):
+        """The indices of a model should survive being stored in the cache."""
+        models = load_models(json.loads(json.dumps(dump_models(self.models))))
+
+        assert models["book"].indexes == self.models["book"].indexes
+
+    def test_alter_together_only_adds_new_groups(self):
+        """Groups of fields which were already in the option shouldn't be new indices."""
+        self.checker._apply_operations(
+            self.models,
+            [
+                Operation(
+                    "AlterIndexTogether",
+                    "book",
+                    None,
+                    False,
+                    fields=(("author", "published"), ("isbn", "published")),
+                ),
+            ],
+            "0003",
+        )
+
+        indexes = self.models["book"].indexes
+        assert "index_together(title,published)" not in indexes
+        assert indexes["index_together(author,published)"].index_added == "0002"
+        assert indexes["index_together(isbn,published)"].index_added == "0003"
+
+    def test_function_returns_new_indexes_with_their_fields(self):
+        """Meta indices should be reported with their name, class and fields."""
+        errors = self.checker._analyse_models(self.models, 2)
+
+        assert {
+            "model": "book",
+            "field": None,
+            "index": "unique_author_title",
+            "index_type": "UniqueConstraint",
+            "fields": ["author", "title"],
+            "migration": "0002",
+        } in errors
+        assert len(errors) == 4
+
+    def test_indexes_of_new_models_are_not_returned(self):
+        """The options and AddConstraint of a model are built while its table is empty."""
+        errors = self.checker._analyse_models(self.models, 1)
+
+        assert [error["migration"] for error in errors] == ["0002"] * 4
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_prints_new_indexes(self, mock_exit, mock_print):
+        """The fields of a new Meta index should be printed."""
+        self.checker.check_project("specific_test_migrations/meta_index_app")
+
+        mock_print.assert_any_call(
+            "A new index:book_title_gin (GinIndex on title) was added to model:book in "
+            "app:meta_index_app. This was added in migration 0002.",
+            file=sys.stderr,
+        )
+        mock_exit.assert_called_once_with(1)
+
+
+class TestLockFreeOperations(TestCase):
+    """Tests for indices which are built without locking the table."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.checker = DBIndexChecker()
+        app_dict = self.checker._walk_files("specific_test_migrations/lock_free_app")
+        self.models = self.checker._map_models(app_dict["lock_free_app"], "")
+
+    def test_add_index_concurrently_is_lock_free(self):
+        """AddIndexConcurrently, even when imported by name, should be replayed lock free."""
+        assert self.models["order"].indexes["order_total_idx"] == IndexState(
+            "Index",
+            ("total",),
+            "0002",
+            lock_free=True,
+        )
+
+    def test_state_operations_with_concurrent_sql_are_lock_free(self):
+        """A field indexed in the state with CREATE INDEX CONCURRENTLY in the database."""
+        assert self.models["order"]["reference"] == FieldState(True, "0003", lock_free=True)
+
+    def test_state_operations_without_database_operations_are_lock_free(self):
+        """Changing only the state doesn't run anything on the database."""
+        assert self.models["order"]["customer"] == FieldState(
+            True,
+            "0004",
+            lock_free=True,
+            db_constraint=True,
+            implicit_index=True,
+        )
+
+    def test_state_operations_with_locking_sql_are_reported_by_the_sql(self):
+        """An index built by a RunSQL without CONCURRENTLY is found in the RunSQL itself."""
+        assert self.models["order"].indexes["order_customer_total"].lock_free
+        assert self.models.statements[-1] == Statement(
+            "CREATE INDEX",
+            "lock_free_app_order",
+            "order_customer_total",
+            ("customer_id", "total"),
+            "0005",
+            False,
+        )
+
+    def test_state_operations_with_unreadable_sql_are_not_lock_free(self):
+        """A RunSQL whose SQL isn't a literal may lock the table."""
+        node = parse_call(
+            "migrations.SeparateDatabaseAndState("
+            "state_operations=["
+            'migrations.AddIndex(model_name="order", '
+            'index=models.Index(fields=["total"], name="order_total")),'
+            "], "
+            "database_operations=[migrations.RunSQL(get_sql())])",
+        )
+
+        assert [x.lock_free for x in self.checker._extract_operations([node])] == [False]
+
+    def test_database_model_operations_are_database_only(self):
+        """Model operations in database_operations change the database but not the state."""
+        node = parse_call(
+            "migrations.SeparateDatabaseAndState(database_operations=["
+            'migrations.AddIndex(model_name="order", '
+            'index=models.Index(fields=["total"], name="order_total")),'
+            "])",
+        )
+
+        assert self.checker._extract_operations([node]) == [
+            Operation(
+                "AddIndex",
+                "order",
+                None,
+                False,
+                "order_total",
+                "Index",
+                None,
+                ("total",),
+                database_only=True,
+            ),
+        ]
+
+    def test_database_model_operations_are_replayed(self):
+        """The state comes from state_operations, the findings from database_operations."""
+        node = parse_call(
+            "migrations.SeparateDatabaseAndState("
+            "database_operations=["
+            'migrations.AlterField(model_name="order", name="total", '
+            "field=models.IntegerField(db_index=False)),"
+            'migrations.AddIndex(model_name="order", '
+            'index=models.Index(fields=["total"], name="order_total")),'
+            "], "
+            "state_operations=["
+            'migrations.AlterField(model_name="order", name="total", '
+            "field=models.IntegerField(db_index=True)),"
+            'migrations.AddIndex(model_name="order", '
+            'index=models.Index(fields=["total"], name="order_total")),'
+            "])",
+        )
+        self.checker._apply_operations(
+            self.models,
+            self.checker._extract_operations([node]),
+            "0006",
+        )
+
+        assert self.models["order"]["total"] == FieldState(True, "0006", lock_free=True)
+        assert self.models["order"].indexes["order_total"] == IndexState(
+            "Index",
+            ("total",),
+            "0006",
+        )
+        assert not [x for x in self.models.removals if x.migration == "0006"]
+
+    def test_database_field_operations_are_replayed(self):
+        """A field indexed or rewritten by database_operations is reported."""
+        node = parse_call(
+            "migrations.SeparateDatabaseAndState("
+            "database_operations=["
+            'migrations.AlterField(model_name="order", name="total", '
+            "field=models.BigIntegerField(db_index=True)),"
+            "], "
+            "state_operations=["
+            'migrations.AlterField(model_name="order", name="total", '
+            "field=models.BigIntegerField(db_index=True)),"
+            "])",
+        )
+        self.checker._apply_operations(
+            self.models,
+            self.checker._extract_operations([node]),
+            "0006",
+        )
+
+        assert self.models["order"]["total"] == FieldState(
+            True,
+            "0006",
+            rewrite="changing the column from integer to bigint",
+            rewrite_added="0006",
+        )
+
+    def test_function_only_returns_indexes_which_lock_the_table(self):
+        """Lock free indices shouldn't be errors."""
+        errors = self.checker._analyse_models(self.models)
+
+        assert [x.get("index", x.get("name")) for x in errors] == ["order_customer_total"]
+        assert errors[0]["statement"] == "CREATE INDEX"
+
+
+class TestRunSql(TestCase):
+    """Tests for the statements found in the SQL of RunSQL operations."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.checker = DBIndexChecker()
+        app_dict = self.checker._walk_files("specific_test_migrations/run_sql_app")
+        self.models = self.checker._map_models(app_dict["run_sql_app"], "")
+
+    def test_statements_are_extracted(self):
+        """Statements in a list, with or without params, should become operations."""
+        node = parse_call(
+            "migrations.RunSQL(["
+            '("CREATE INDEX book_idx ON app_book (title) WHERE id > %s", [0]),'
+            '"ALTER TABLE app_book ADD COLUMN pages integer",'
+            "])",
+        )
+
+        assert self.checker._extract_operations([node]) == [
+            Operation(
+                "RunSQL",
+                "app_book",
+                None,
+                False,
+                "book_idx",
+                "CREATE INDEX",
+                None,
+                ("title",),
+            ),
+            Operation(
+                "RunSQL",
+                "app_book",
+                None,
+                False,
+                "pages",
+                "ADD COLUMN",
+                None,
+                ("pages",),
+                True,
+            ),
+        ]
+
+    def test_sql_which_is_not_a_literal_is_ignored(self):
+        """SQL which is built when the migration runs can't be scanned."""
+        node = parse_call("migrations.RunSQL(get_sql())")
+
+        assert self.checker._extract_operations([node]) == []
+
+    def test_dropped_indices_are_removed(self):
+        """A DROP INDEX should remove the index from the statements."""
+        assert self.models.statements == [
+            Statement(
+                "ADD CONSTRAINT",
+                "run_sql_app_book",
+                "book_isbn_unique",
+                ("isbn",),
+                "0002",
+                False,
+            ),
+            Statement(
+                "CREATE INDEX",
+                "run_sql_app_book",
+                "book_isbn_idx",
+                ("isbn",),
+                "0003",
+                True,
+            ),
+        ]
+
+    def test_statements_are_stored_in_checkpoints(self):
+        """The statements of an app should survive being stored in the cache."""
+        models = load_models(json.loads(json.dumps(dump_models(self.models))))
+
+        assert models.statements == self.models.statements
+
+    def test_function_returns_statements_which_lock_the_table(self):
+        """Only the statements which lock the table, after ignore_before, are errors."""
+        assert self.checker._analyse_models(self.models) == [
+            {
+                "model": None,
+                "field": None,
+                "statement": "ADD CONSTRAINT",
+                "table": "run_sql_app_book",
+                "name": "book_isbn_unique",
+                "fields": ["isbn"],
+                "migration": "0002",
+            },
+        ]
+        assert self.checker._analyse_models(self.models, 3) == []
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_prints_statements(self, mock_exit, mock_print):
+        """The statement and table should be printed with the app and migration."""
+        self.checker.check_project("specific_test_migrations/run_sql_app")
+
+        mock_print.assert_any_call(
+            "A RunSQL runs ADD CONSTRAINT:book_isbn_unique on isbn of table:run_sql_app_book in "
+            "app:run_sql_app. This was added in migration 0002.",
+            file=sys.stderr,
+        )
+        mock_exit.assert_called_once_with(1)
+
+
+class TestRewrites(TestCase):
+    """Tests for the field changes which rewrite the table."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.checker = DBIndexChecker()
+        app_dict = self.checker._walk_files("specific_test_migrations/rewrite_app")
+        self.models = self.checker._map_models(app_dict["rewrite_app"], "")
+
+    def get_rewrites(self):  # noqa: D102
+        return {
+            x["field"]: x["rewrite"]
+            for x in self.checker._analyse_models(self.models)
+            if "rewrite" in x
+        }
+
+    def test_rewrites_are_replayed(self):
+        """The reason and migration of a rewrite should be kept in the field state."""
+        account = self.models["account"]
+
+        assert account["balance"].rewrite == "changing the column from integer to bigint"
+        assert account["balance"].rewrite_added == "0002"
+        assert account["code"].rewrite is None
+        assert account["note"].rewrite is None
+        assert account["note"].null
+
+    def test_rewrites_are_not_reported_by_default(self):
+        """Only new indices are reported unless the rewrite check is turned on."""
+        assert self.get_rewrites() == {}
+
+    def test_function_returns_rewrites(self):
+        """Type changes and shrinking a varchar should be reported."""
+        self.checker.check_rewrites = True
+
+        assert self.get_rewrites() == {
+            "balance": "changing the column from integer to bigint",
+            "name": "shrinking the column from varchar(200) to varchar(100)",
+        }
+
+    def test_function_returns_new_columns_with_defaults(self):
+        """A literal or callable default other than None is written to every row."""
+        self.checker.check_rewrites = True
+        self.checker.rewrite_defaults = True
+
+        rewrites = self.get_rewrites()
+
+        assert rewrites["active"] == rewrites["created"] == "adding the column with a default"
+        assert "note" not in rewrites
+
+    def test_state_operations_do_not_rewrite_the_table(self):
+        """Changing only the state doesn't run anything on the database."""
+        node = parse_call(
+            "migrations.SeparateDatabaseAndState(state_operations=["
+            'migrations.AlterField(model_name="account", name="name", '
+            "field=models.CharField(max_length=10)),"
+            "])",
+        )
+        operations = self.checker._extract_operations([node])
+        self.checker._apply_operations(self.models, operations, "0003")
+
+        assert self.models["account"]["name"].rewrite_added == "0002"
+
+    def test_settings_are_read_from_the_config(self):
+        """The checks should be turned on in the config unless set by the args."""
+        config = ConfigParser()
+        config["DJANGO_MIGRATION_DBINDEX_CHECK"] = {"check_rewrites": "true"}
+        checker = DBIndexChecker(rewrite_defaults=False)
+
+        checker._get_check_settings(config)
+
+        assert checker.check_rewrites is True
+        assert checker.rewrite_defaults is False
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_prints_rewrites(self, mock_exit, mock_print):
+        """The reason for the rewrite should be printed."""
+        DBIndexChecker(check_rewrites=True).check_project("specific_test_migrations/rewrite_app")
+
+        mock_print.assert_any_call(
+            "A change to field:balance in model:account rewrites the table, changing the column "
+            "from integer to bigint, in app:rewrite_app. This was added in migration 0002.",
+            file=sys.stderr,
+        )
+        mock_exit.assert_called_once_with(1)
+
+
+class TestValidations(TestCase):
+    """Tests for the changes which scan the table to validate every row."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.checker = DBIndexChecker(check_validations=True)
+        app_dict = self.checker._walk_files("specific_test_migrations/validation_app")
+        self.models = self.checker._map_models(app_dict["validation_app"], "")
+
+    def test_validations_are_replayed(self):
+        """NOT NULL, foreign key and check constraints on existing tables should be kept."""
+        assert self.models.validations == [
+            Validation("order", "total", "setting field:total NOT NULL", "0002"),
+            Validation(
+                "order",
+                "customer",
+                "adding a foreign key constraint to field:customer",
+                "0002",
+            ),
+            Validation("order", None, "adding CheckConstraint:order_total_limit", "0002"),
+        ]
+
+    def test_validations_are_stored_in_checkpoints(self):
+        """The validations of an app should survive being stored in the cache."""
+        models = load_models(json.loads(json.dumps(dump_models(self.models))))
+
+        assert models.validations == self.models.validations
+        assert models["order"]["customer"].db_constraint
+
+    def test_function_returns_validations(self):
+        """Validations after ignore_before should be errors when the check is on."""
+        errors = [x for x in self.checker._analyse_models(self.models) if "validation" in x]
+
+        assert errors[0] == {
+            "model": "order",
+            "field": "total",
+            "validation": "setting field:total NOT NULL",
+            "migration": "0002",
+        }
+        assert len(errors) == 3
+        assert self.checker._analyse_models(self.models, 3) == []
+
+    def test_validations_are_not_reported_by_default(self):
+        """Only new indices are reported unless the validation check is turned on."""
+        self.checker.check_validations = None
+
+        assert [x for x in self.checker._analyse_models(self.models) if "validation" in x] == []
+
+    def test_new_tables_are_not_validated(self):
+        """A constraint on a table created in the same migration has no rows to scan."""
+        app_dict = self.checker._walk_files("specific_test_migrations/meta_index_app")
+        models = self.checker._map_models(app_dict["meta_index_app"], "")
+
+        assert models["book"].created == "0001"
+        assert models.validations == []
+
+    def test_relations_without_a_constraint_are_not_validated(self):
+        """A relation with db_constraint=False has no foreign key to validate."""
+        node = parse_call(
+            'migrations.AlterField(model_name="order", name="total", '
+            "field=models.ForeignKey(db_constraint=False, on_delete=models.CASCADE, "
+            'to="validation_app.customer"))',
+        )
+        self.checker._apply_operations(
+            self.models,
+            self.checker._extract_operations([node]),
+            "0003",
+        )
+
+        assert [x.migration for x in self.models.validations] == ["0002", "0002", "0002"]
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_prints_validations(self, mock_exit, mock_print):
+        """The reason for the scan should be printed."""
+        self.checker.check_project("specific_test_migrations/validation_app")
+
+        mock_print.assert_any_call(
+            "A change to model:order scans the table to validate every row, adding "
+            "CheckConstraint:order_total_limit, in app:validation_app. This was added in "
+            "migration 0002.",
+            file=sys.stderr,
+        )
+        mock_exit.assert_called_once_with(1)
+
+
+class TestRemovals(TestCase):
+    """Tests for the indices which are dropped while locking the table."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.checker = DBIndexChecker(check_removals=True)
+        app_dict = self.checker._walk_files("specific_test_migrations/removal_app")
+        self.models = self.checker._map_models(app_dict["removal_app"], "")
+
+    def test_removals_are_replayed(self):
+        """Dropping a db_index, a Meta index or an index in SQL should be kept."""
+        assert self.models.removals == [
+            Removal("book", "title", None, "0002"),
+            Removal("book", None, "book_title_isbn_idx", "0002"),
+            Removal("book", None, "index_together(title,published)", "0002"),
+            Removal(None, None, "book_summary_idx", "0002"),
+        ]
+        assert self.models["book"].indexes == {}
+        assert self.models.statements == []
+
+    def test_removals_are_stored_in_checkpoints(self):
+        """The removals of an app should survive being stored in the cache."""
+        models = load_models(json.loads(json.dumps(dump_models(self.models))))
+
+        assert models.removals == self.models.removals
+
+    def test_function_returns_removals(self):
+        """Removals after ignore_before should be errors when the check is on."""
+        errors = self.checker._analyse_models(self.models)
+
+        assert errors[0] == {
+            "model": "book",
+            "field": "title",
+            "removal": None,
+            "constraint": False,
+            "migration": "0002",
+        }
+        assert [x["removal"] for x in errors] == [
+            None,
+            "book_title_isbn_idx",
+            "index_together(title,published)",
+            "book_summary_idx",
+        ]
+        assert self.checker._analyse_models(self.models, 3) == []
+
+    def replay_unique_removals(self):  # noqa: D102
+        for migration_number, nodes in [
+            (
+                "0004",
+                [
+                    'migrations.AddConstraint(model_name="book", constraint='
+                    'models.UniqueConstraint(fields=["isbn"], name="unique_isbn"))',
+                    'migrations.AlterUniqueTogether(name="book", '
+                    'unique_together={("title", "published")})',
+                    'migrations.AlterField(model_name="book", name="isbn", '
+                    "field=models.CharField(max_length=13, unique=True))",
+                ],
+            ),
+            (
+                "0005",
+                [
+                    'migrations.RemoveConstraint(model_name="book", name="unique_isbn")',
+                    'migrations.AlterUniqueTogether(name="book", unique_together=set())',
+                    'migrations.AlterField(model_name="book", name="isbn", '
+                    "field=models.CharField(max_length=13))",
+                ],
+            ),
+        ]:
+            self.checker._apply_operations(
+                self.models,
+                self.checker._extract_operations([parse_call(x) for x in nodes]),
+                migration_number,
+            )
+
+    def test_unique_constraints_are_removals(self):
+        """Dropping a UniqueConstraint, a unique_together group or unique=True drops an index."""
+        self.replay_unique_removals()
+
+        assert [x for x in self.models.removals if x.migration >= "0004"] == [
+            Removal("book", None, "unique_isbn", "0005", True),
+            Removal("book", None, "unique_together(title,published)", "0005", True),
+            Removal("book", "isbn", None, "0005", True),
+        ]
+
+    def test_index_replaced_by_a_unique_index_is_a_removal(self):
+        """Django drops the index of a field which is made unique."""
+        for migration_number, unique in [("0004", ""), ("0005", "unique=True")]:
+            node = parse_call(
+                'migrations.AlterField(model_name="book", name="title", '
+                f"field=models.CharField(db_index=True, max_length=200, {unique}))",
+            )
+            self.checker._apply_operations(
+                self.models,
+                self.checker._extract_operations([node]),
+                migration_number,
+            )
+
+        assert self.models.removals[-1] == Removal("book", "title", None, "0005")
+
+    def test_constraints_without_an_index_are_not_removals(self):
+        """A CheckConstraint has no index to drop."""
+        nodes = [
+            'migrations.AddConstraint(model_name="book", constraint='
+            'models.CheckConstraint(check=models.Q(isbn__gt=""), name="isbn_set"))',
+            'migrations.RemoveConstraint(model_name="book", name="isbn_set")',
+        ]
+        self.checker._apply_operations(
+            self.models,
+            self.checker._extract_operations([parse_call(x) for x in nodes]),
+            "0004",
+        )
+
+        assert [x.migration for x in self.models.removals] == ["0002"] * 4
+
+    def test_constraint_removals_are_described_without_an_alternative(self):
+        """Unique constraints have no concurrent alternative to suggest."""
+        self.replay_unique_removals()
+        errors = self.checker._analyse_models(self.models, 5)
+
+        assert [self.checker._describe_error(x) for x in errors][:2] == [
+            "Index:unique_isbn of model:book is dropped while locking the table, as a unique "
+            "constraint it can't be dropped concurrently,",
+            "Index:unique_together(title,published) of model:book is dropped while locking the "
+            "table, as a unique constraint it can't be dropped concurrently,",
+        ]
+
+    def test_removals_are_not_reported_by_default(self):
+        """Only new indices are reported unless the removal check is turned on."""
+        self.checker.check_removals = None
+
+        assert self.checker._analyse_models(self.models) == []
+
+    def test_settings_are_read_from_the_config(self):
+        """The removal check should be turned on in the config unless set by the args."""
+        config = ConfigParser()
+        config["DJANGO_MIGRATION_DBINDEX_CHECK"] = {"check_removals": "true"}
+        checker = DBIndexChecker()
+
+        checker._get_check_settings(config)
+
+        assert checker.check_removals is True
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_prints_removals(self, mock_exit, mock_print):
+        """Each removal should be printed with the suggestion to drop it concurrently."""
+        self.checker.check_project("specific_test_migrations/removal_app")
+
+        errors = [
+            x[0][0] for x in mock_print.call_args_list if "RemoveIndexConcurrently" in x[0][0]
+        ]
+        assert errors == [
+            "The db_index of field:title in model:book is dropped while locking the table, use "
+            "RemoveIndexConcurrently instead, in app:removal_app. This was added in migration "
+            "0002.",
+            "Index:book_title_isbn_idx of model:book is dropped while locking the table, use "
+            "RemoveIndexConcurrently instead, in app:removal_app. This was added in migration "
+            "0002.",
+            "Index:index_together(title,published) of model:book is dropped while locking the "
+            "table, use RemoveIndexConcurrently instead, in app:removal_app. This was added in "
+            "migration 0002.",
+            "Index:book_summary_idx is dropped while locking the table, use "
+            "RemoveIndexConcurrently instead, in app:removal_app. This was added in migration "
+            "0002.",
+        ]
+        mock_exit.assert_called_once_with(1)
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_removals_without_a_table_have_no_statistics(self, mock_exit, mock_print):
+        """A DROP INDEX of an unknown table can't be looked up in the table statistics."""
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "stats.csv")
+            with open(path, "w") as file:
+                file.write("relname,reltuples,relpages\nremoval_app_book,5000000,100000\n")
+            self.checker.table_stats = path
+            self.checker.check_project("specific_test_migrations/removal_app")
+
+        errors = [x[0][0] for x in mock_print.call_args_list if "is dropped" in x[0][0]]
+        assert errors[0].endswith("Table:removal_app_book has 5000000 rows, 781MB.")
+        assert errors[3].endswith("This was added in migration 0002.")
+
 
 class TestAnalyseModels(TestCase):
     """Tests for the _analyse_models function."""
@@ -578,9 +1844,9 @@ class TestAnalyseModels(TestCase):
     def setUp(self) -> None:  # noqa: D102
         self.example_app = {
             "change_actual": {
-                "test1": {"is_index": True, "index_added": "0001"},
-                "test2": {"is_index": True, "index_added": "0003"},
-                "test3": {"is_index": False, "index_added": False},
+                "test1": FieldState(True, "0001"),
+                "test2": FieldState(True, "0003"),
+                "test3": FieldState(False, False),
             },
         }
         self.checker = DBIndexChecker()
@@ -655,6 +1921,7 @@ class TestCheckProject(TestCase):
     def test_function_calls_get_config_with_given_root_dir(self, mock_config, mock_exit):
         """Function should call get_config with the specified root dir."""
         checker = DBIndexChecker()
+        mock_config.return_value = ConfigParser()
         checker.check_project("my_root")
         mock_config.assert_called_with("my_root")
 
@@ -759,8 +2026,6 @@ class TestCheckProject(TestCase):
         checker.check_project("example_migrations/important_functionality")
 
         expected_prints = [
-            "A new db_index was added to field:change_initiator in model:change_actual in app:"
-            "important_functionality. This was added in migration 0001.",
             "A new db_index was added to field:all_signatures_required in model:change_status"
             " in app:important_functionality. This was added in migration 0003.",
         ]
@@ -786,3 +2051,311 @@ class TestCheckProject(TestCase):
         checker.check_project("example_migrations/important_functionality")
 
         mock_exit.assert_called_with()
+
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker.get_config")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_uses_cache_dir_from_config(self, mock_exit, mock_config):
+        """Function should populate the cache directory set in the config."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config = ConfigParser()
+            config["DJANGO_MIGRATION_DBINDEX_CHECK"] = {"cache_dir": cache_dir}
+            mock_config.return_value = config
+
+            checker = DBIndexChecker()
+            checker.check_project("example_migrations/important_functionality")
+
+            assert checker.cache.misses == 3
+            entries = [
+                os.path.relpath(os.path.join(root, x), cache_dir)
+                for root, _dirs, files in os.walk(cache_dir)
+                for x in files
+                if x.endswith(".json")
+            ]
+            checkpoints = [x for x in entries if x.startswith("checkpoints")]
+            headers = [x for x in entries if x.startswith("headers")]
+            assert len(entries) == 7
+            assert len(checkpoints) == 1
+            assert len(headers) == 3
+        mock_exit.assert_called_with(1)
+
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker.get_config")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_headers_are_read_from_the_cache(self, mock_exit, mock_config):
+        """A second run with the cache shouldn't parse the headers of the migrations again."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config = ConfigParser()
+            config["DJANGO_MIGRATION_DBINDEX_CHECK"] = {"cache_dir": cache_dir}
+            mock_config.return_value = config
+            DBIndexChecker().check_project("example_migrations/important_functionality")
+
+            with patch(
+                "django_migration_dbindex_check.checker.find_class_assignments",
+            ) as mock_find:
+                checker = DBIndexChecker()
+                checker.check_project("example_migrations/important_functionality")
+
+            mock_find.assert_not_called()
+            assert checker.graph.app_order("important_functionality") == [
+                "0001_initial_migrations",
+                "0002_renamed_a_field",
+                "0003_added_new_field_db_index",
+            ]
+
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker.get_config")
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_parallel_run_matches_serial_run(self, mock_exit, mock_print, mock_config):
+        """Checking apps in a process pool should give the same output as a serial run."""
+        mock_config.return_value = ConfigParser()
+
+        DBIndexChecker().check_project("example_migrations")
+        serial_prints = mock_print.call_args_list
+        serial_exit = mock_exit.call_args_list
+        mock_print.reset_mock()
+        mock_exit.reset_mock()
+
+        DBIndexChecker(jobs=3).check_project("example_migrations")
+
+        assert len(serial_prints) > 3
+        assert mock_print.call_args_list == serial_prints
+        assert mock_exit.call_args_list == serial_exit == [call(1)]
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_writes_profile_of_each_phase(self, mock_exit, mock_print):
+        """The profile should have every phase, and the slowest files and apps."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "profile.json")
+            DBIndexChecker(profile=path, profile_top=2).check_project("example_migrations")
+            with open(path) as file:
+                profile = json.load(file)
+
+        phases = profile["phases"]
+        assert set(phases) == {"total", "walk", "config", "parse", "app", "map_models", "analyse"}
+        assert phases["parse"]["calls"] == 7
+        assert phases["app"]["calls"] == 3
+        assert len(profile["slowest"]["parse"]) == 2
+        assert {x["name"] for x in profile["slowest"]["app"]} <= {
+            "important_functionality",
+            "other_service",
+            "the_app",
+        }
+        mock_exit.assert_called_with()
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_parallel_profile_includes_every_app(self, mock_exit, mock_print):
+        """The profiles of the worker processes should be merged into the profile."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "profile.json")
+            DBIndexChecker(jobs=3, profile=path).check_project("example_migrations")
+            with open(path) as file:
+                profile = json.load(file)
+
+        assert profile["phases"]["parse"]["calls"] == 7
+        assert len(profile["slowest"]["app"]) == 3
+        mock_exit.assert_called_with()
+
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker.get_config")
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_writes_metrics(self, mock_exit, mock_print, mock_config):
+        """The metrics should count the files, apps, operations and findings of the check."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config = ConfigParser()
+            config["DJANGO_MIGRATION_DBINDEX_CHECK"] = {
+                "cache_dir": tmp_dir,
+                "exclude_paths": "venv",
+            }
+            mock_config.return_value = config
+            path = os.path.join(tmp_dir, "checker.prom")
+
+            DBIndexChecker(metrics=path).check_project("example_migrations")
+            with open(path) as file:
+                first = file.read().splitlines()
+            DBIndexChecker(metrics=path, jobs=2).check_project("example_migrations")
+            with open(path) as file:
+                second = file.read().splitlines()
+
+        prefix = "django_migration_dbindex_check"
+        assert f"{prefix}_files_scanned 7" in first
+        assert f"{prefix}_files_parsed 7" in first
+        assert f"{prefix}_apps_checked 3" in first
+        assert f'{prefix}_findings{{app="important_functionality"}} 1' in first
+        # The second run resumes every app from its last checkpoint.
+        assert f"{prefix}_files_parsed 0" in second
+        assert f"{prefix}_files_cached 0" in second
+        assert f"{prefix}_files_checkpointed 7" in second
+        assert f"{prefix}_operations_replayed 0" in second
+
+    def make_recently_changed_project(self, root: str, newest: str):
+        """Copy the example migrations with the migrations of one app modified last."""
+        shutil.copytree("example_migrations", root, ignore=shutil.ignore_patterns("venv"))
+        os.remove(os.path.join(root, "migrations_check.cfg"))
+        for app in ["important_functionality", "other_service", "the_app"]:
+            modified = time.time() - (0 if app == newest else 1000)
+            for file_name in os.listdir(os.path.join(root, app, "migrations")):
+                path = os.path.join(root, app, "migrations", file_name)
+                os.utime(path, (modified, modified))
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_fail_fast_stops_at_most_recently_changed_app(self, mock_exit, mock_print):
+        """Only the most recently changed app should be checked if it has a new index."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = os.path.join(tmp_dir, "project")
+            self.make_recently_changed_project(root, "the_app")
+            checker = DBIndexChecker(fail_fast=True)
+            with patch.object(checker, "_check_app", wraps=checker._check_app) as mock_check:
+                checker.check_project(root)
+
+        assert [x[0][0] for x in mock_check.call_args_list] == ["the_app"]
+        errors = [x[0][0] for x in mock_print.call_args_list if "A new db_index" in x[0][0]]
+        assert len(errors) > 0
+        assert all("app:the_app." in x for x in errors)
+        assert "fail fast" in mock_print.call_args_list[-1][0][0]
+        mock_exit.assert_called_once_with(1)
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_fail_fast_uses_commit_times_in_a_git_checkout(self, mock_exit, mock_print):
+        """A fresh checkout has one modification time, so the last commit should be used."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = os.path.join(tmp_dir, "project")
+            self.make_recently_changed_project(root, "the_app")
+            make_git_repo(root, [])
+            path = os.path.join(root, "other_service/migrations/0002_did_some_stuff.py")
+            with open(path, "a") as file:
+                file.write("# changed\n")
+            commit_at(root, 2000000000, ["other_service"])
+            for dir_path, _dirs, files in os.walk(root):
+                for file_name in files:
+                    os.utime(os.path.join(dir_path, file_name), (1000000000, 1000000000))
+
+            checker = DBIndexChecker(fail_fast=True)
+            with patch.object(checker, "_check_app", wraps=checker._check_app) as mock_check:
+                checker.check_project(root)
+
+        assert mock_check.call_args_list[0][0][0] == "other_service"
+        mock_exit.assert_called_once_with(1)
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_fail_fast_message_names_the_kind_of_finding(self, mock_exit, mock_print):
+        """The fail fast note should describe the finding it stopped at."""
+        DBIndexChecker(fail_fast=True, check_removals=True).check_project(
+            "specific_test_migrations/removal_app",
+        )
+
+        assert mock_print.call_args_list[-1][0] == (
+            "Stopped at the first app with an index removal as fail fast is on, other apps "
+            "may have more findings.",
+        )
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_fail_fast_in_parallel_reports_a_single_app(self, mock_exit, mock_print):
+        """The errors of the first app to finish with errors should be reported."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = os.path.join(tmp_dir, "project")
+            self.make_recently_changed_project(root, "other_service")
+            DBIndexChecker(fail_fast=True, jobs=2).check_project(root)
+
+        errors = [x[0][0] for x in mock_print.call_args_list if "A new db_index" in x[0][0]]
+        assert len({x.split("app:")[1].split(".")[0] for x in errors}) == 1
+        mock_exit.assert_called_once_with(1)
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker._analyse_models")
+    def test_fail_fast_checks_every_app_if_none_have_errors(
+        self,
+        mock_analyse,
+        mock_exit,
+        mock_print,
+    ):
+        """Without any errors, fail fast should still check every app."""
+        mock_analyse.return_value = []
+        DBIndexChecker(fail_fast=True).check_project("example_migrations")
+
+        assert mock_analyse.call_count == 3
+        mock_exit.assert_called_once_with()
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    @patch("django_migration_dbindex_check.checker.DBIndexChecker._check_app")
+    def test_function_only_checks_apps_changed_since_ref(self, mock_check, mock_exit, mock_print):
+        """Apps with no migrations changed since the ref should be skipped with a note."""
+        mock_check.return_value = []
+        with tempfile.TemporaryDirectory() as root:
+            make_git_repo(root, ["app/migrations/0001_initial.py", "other/migrations/0001_a.py"])
+            open(os.path.join(root, "app/migrations/0002_new.py"), "w").close()
+
+            checker = DBIndexChecker(since="HEAD")
+            checker.check_project(root)
+
+        assert [x[0][0] for x in mock_check.call_args_list] == ["app"]
+        mock_print.assert_any_call("Skipping app:other, no migrations have changed since HEAD.")
+
+    def write_table_stats(self, root: str):  # noqa: D102
+        path = os.path.join(root, "stats.csv")
+        with open(path, "w") as file:
+            file.write("relname,reltuples,relpages\n")
+            file.write("legacy_books,5000000,100000\n")
+            file.write("people,20,1\n")
+        return path
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_ranks_errors_by_table_rows(self, mock_exit, mock_print):
+        """Errors should name their table, largest first, with unknown tables last."""
+        with tempfile.TemporaryDirectory() as root:
+            DBIndexChecker(table_stats=self.write_table_stats(root)).check_project(
+                "specific_test_migrations/db_table_app",
+            )
+
+        errors = [x[0][0] for x in mock_print.call_args_list if "A new db_index" in x[0][0]]
+        assert len(errors) == 3
+        assert "Table:legacy_books has 5000000 rows, 781MB." in errors[0]
+        assert "The index is estimated at 615MB, taking 17s to build." in errors[0]
+        assert "Table:people has 20 rows, 0MB." in errors[1]
+        assert "no statistics for table:db_table_app_shelf." in errors[2]
+        mock_exit.assert_called_once_with(1)
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_ranks_errors_without_estimates_by_table_size(self, mock_exit, mock_print):
+        """A rewrite of a huge table should rank above an estimated index on a small table."""
+        with tempfile.TemporaryDirectory() as root:
+            for app in ["db_table_app", "rewrite_app"]:
+                shutil.copytree(
+                    os.path.join("specific_test_migrations", app),
+                    os.path.join(root, app),
+                )
+            path = self.write_table_stats(root)
+            with open(path, "a") as file:
+                file.write("rewrite_app_account,800000000,10000000\n")
+            DBIndexChecker(table_stats=path, check_rewrites=True).check_project(root)
+
+        errors = [x[0][0] for x in mock_print.call_args_list if "This was added" in x[0][0]]
+        assert [x.split(" in app:")[0].split(" in model:")[-1] for x in errors] == [
+            "account rewrites the table, changing the column from integer to bigint,",
+            "account rewrites the table, shrinking the column from varchar(200) to varchar(100),",
+            "book",
+            "author",
+            "shelf",
+        ]
+        assert "Table:rewrite_app_account has 800000000 rows" in errors[0]
+        assert "The index is estimated" in errors[2]
+
+    @patch("django_migration_dbindex_check.checker.print")
+    @patch("django_migration_dbindex_check.checker.sys.exit")
+    def test_function_ignores_tables_below_thresholds(self, mock_exit, mock_print):
+        """New indices on small tables shouldn't be errors, unknown tables still are."""
+        with tempfile.TemporaryDirectory() as root:
+            checker = DBIndexChecker(table_stats=self.write_table_stats(root), min_table_rows=1000)
+            checker.check_project("specific_test_migrations/db_table_app")
+
+        errors = [x[0][0] for x in mock_print.call_args_list if "A new db_index" in x[0][0]]
+        assert len(errors) == 2
+        assert not any("people" in x for x in errors)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Tests for estimating the size and build time of indices."""
+from unittest import TestCase
+
+from django_migration_dbindex_check.estimate import (
+    estimate_composite_index,
+    estimate_index,
+    format_duration,
+    get_key_width,
+)
+
+
+class TestGetKeyWidth(TestCase):
+    """Tests for the get_key_width function."""
+
+    def test_fixed_width_fields(self):
+        """Fixed width types should use the size of their column."""
+        assert get_key_width("BigIntegerField") == 8
+        assert get_key_width("IntegerField") == 4
+        assert get_key_width("UUIDField") == 16
+
+    def test_variable_width_fields_are_half_full(self):
+        """Variable width fields should use half of their max_length, or Django's default."""
+        assert get_key_width("CharField", 200) == 101
+        assert get_key_width("SlugField") == 26
+
+    def test_unknown_fields_are_as_wide_as_a_bigint(self):
+        """Custom fields, or fields whose type couldn't be read, should be assumed 8 bytes."""
+        assert get_key_width("MoneyField") == 8
+        assert get_key_width(None) == 8
+
+
+class TestEstimateIndex(TestCase):
+    """Tests for the estimate_index function."""
+
+    def test_size_of_a_bigint_index(self):
+        """A bigint key takes 16 bytes with its header, plus a 4 byte line pointer."""
+        estimate = estimate_index("BigIntegerField", None, 9000000)
+
+        assert estimate.size == 200000000
+
+    def test_wider_keys_take_longer_to_build(self):
+        """A varchar(255) index should be bigger and slower to build than a bigint index."""
+        bigint = estimate_index("BigIntegerField", None, 10000000)
+        varchar = estimate_index("CharField", 255, 10000000)
+
+        assert varchar.size > bigint.size
+        assert varchar.duration > bigint.duration
+
+    def test_duration_uses_given_throughputs(self):
+        """The build time should be the sort time plus the write time."""
+        estimate = estimate_index("BigIntegerField", None, 9000000, 1000000, 100)
+
+        assert estimate.duration == 9 + 200000000 / (100 * 1024 * 1024)
+
+    def test_composite_index_keys_are_the_width_of_every_column(self):
+        """Two int columns make an 8 byte key, the same size as a bigint index."""
+        composite = estimate_composite_index(
+            [("IntegerField", None), ("IntegerField", None)],
+            9000000,
+        )
+
+        assert composite == estimate_index("BigIntegerField", None, 9000000)
+
+
+class TestFormatDuration(TestCase):
+    """Tests for the format_duration function."""
+
+    def test_formats_seconds_minutes_and_hours(self):
+        """The unit should suit the length of the duration."""
+        assert format_duration(45.2) == "45s"
+        assert format_duration(720) == "12m"
+        assert format_duration(9000) == "2.5h"
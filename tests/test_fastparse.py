@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Tests for the fast operation extractor."""
+import ast
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from django_migration_dbindex_check.checker import DBIndexChecker
+from django_migration_dbindex_check.fastparse import find_class_assignments
+
+TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def all_test_migrations():
+    """Find every migration file in the test fixtures."""
+    paths = []
+    for folder in ["example_migrations", "specific_test_migrations"]:
+        for root, _dirs, files in os.walk(os.path.join(TESTS_DIR, folder)):
+            paths += [os.path.join(root, x) for x in files if x.endswith(".py")]
+    return sorted(x for x in paths if not x.endswith("__init__.py"))
+
+
+class TestFastExtractorMatchesAst(TestCase):
+    """Differential tests between the fast and ast extractors."""
+
+    def test_fast_extractor_gives_same_operations_for_every_fixture(self):
+        """Both extractors should give identical operations for every test migration."""
+        checker = DBIndexChecker()
+        paths = all_test_migrations()
+        assert len(paths) > 10
+
+        for path in paths:
+            with open(path, "rb") as file:
+                source = file.read()
+            expected = checker._extract_operations(
+                checker._get_all_relevant_operations_nodes_for_file(path, source),
+            )
+            result = checker._extract_operations(
+                checker._get_all_relevant_operations_nodes_fast(path, source),
+            )
+            assert result == expected, path
+
+    def test_files_without_relevant_operations_are_not_parsed(self):
+        """The pre-scan should skip files which can't contain any relevant operations."""
+        checker = DBIndexChecker()
+        path = os.path.join(
+            TESTS_DIR,
+            "example_migrations/important_functionality/migrations/0002_renamed_a_field.py",
+        )
+        with open(path, "rb") as file:
+            source = file.read()
+
+        with patch("django_migration_dbindex_check.fastparse.ast.parse") as mock_parse:
+            assert checker._get_all_relevant_operations_nodes_fast(path, source) == []
+        mock_parse.assert_not_called()
+
+    @patch(
+        "django_migration_dbindex_check.checker.DBIndexChecker."
+        "_get_all_relevant_operations_nodes_for_file",
+    )
+    def test_falls_back_to_ast_if_operations_not_found(self, mock_ast):
+        """Files which don't look like a formatted migration should be parsed in full."""
+        checker = DBIndexChecker()
+        source = (
+            b"class Migration(migrations.Migration):\n    operations = [migrations.AddField(\n)]\n"
+        )
+
+        checker._get_all_relevant_operations_nodes_fast("path.py", source)
+
+        mock_ast.assert_called_once_with("path.py", source)
+
+
+class TestFindClassAssignments(TestCase):
+    """Tests for the find_class_assignments function."""
+
+    def test_finds_single_and_multi_line_values(self):
+        """Function should parse assignments on one line or closed by an indented bracket."""
+        source = (
+            b"import os\n\n\nclass Migration(migrations.Migration):\n"
+            b"    atomic = False\n\n    operations = [\n        1,\n        2,\n    ]\n"
+        )
+        values = find_class_assignments(source, "Migration", ["atomic", "operations"])
+
+        assert values["atomic"].value is False
+        assert [x.value for x in values["operations"].elts] == [1, 2]
+
+    def test_ignores_assignments_in_other_classes(self):
+        """Assignments after the end of the class body should not be found."""
+        source = (
+            b"class Migration(migrations.Migration):\n    initial = True\n\n\n"
+            b"class Other:\n    operations = [\n        1,\n    ]\n"
+        )
+        values = find_class_assignments(source, "Migration", ["operations"])
+
+        assert values == {}
+
+    def test_returns_none_if_class_not_found(self):
+        """Function should return None so the caller can fall back to parsing the file."""
+        assert find_class_assignments(b"x = 1\n", "Migration", ["operations"]) is None
+
+    def test_returns_none_if_value_does_not_parse(self):
+        """Function should return None rather than guess at an unusually formatted value."""
+        source = b"class Migration:\n    operations = [\n        1,\n  ]\n"
+        assert find_class_assignments(source, "Migration", ["operations"]) is None
+
+    def test_value_nodes_match_full_parse(self):
+        """The parsed value should be the same as from a full parse of the file."""
+        source = b"class Migration:\n    dependencies = [\n        ('app', '0001'),\n    ]\n"
+        value = find_class_assignments(source, "Migration", ["dependencies"])["dependencies"]
+        full = ast.parse(source).body[0].body[0].value
+
+        assert ast.dump(value) == ast.dump(full)
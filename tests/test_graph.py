@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Tests for the migration dependency graph."""
+from unittest import TestCase
+
+from django_migration_dbindex_check.graph import MigrationGraph
+
+
+def header(dependencies=(), run_before=(), replaces=()):
+    """Create the header of a migration."""
+    return {
+        "dependencies": list(dependencies),
+        "run_before": list(run_before),
+        "replaces": list(replaces),
+    }
+
+
+class TestAppOrder(TestCase):
+    """Tests for the MigrationGraph.app_order function."""
+
+    def test_orders_by_dependencies_then_name(self):
+        """Dependencies should take precedence over the names of the migrations."""
+        graph = MigrationGraph.from_headers(
+            {
+                "app": {
+                    "0001_initial": header(),
+                    "0002_b": header([("app", "0002_c")]),
+                    "0002_c": header([("app", "0001_initial")]),
+                },
+            },
+        )
+        assert graph.app_order("app") == ["0001_initial", "0002_c", "0002_b"]
+
+    def test_orders_merge_migrations_after_both_branches(self):
+        """A merge migration should come after both of the migrations it merges."""
+        graph = MigrationGraph.from_headers(
+            {
+                "app": {
+                    "0004_base": header(),
+                    "0005_one": header([("app", "0004_base")]),
+                    "0005_two": header([("app", "0004_base")]),
+                    "0005_merge": header([("app", "0005_one"), ("app", "0005_two")]),
+                },
+            },
+        )
+        assert graph.app_order("app") == ["0004_base", "0005_one", "0005_two", "0005_merge"]
+
+    def test_run_before_adds_a_dependency(self):
+        """A migration with run_before should come before the migrations it lists."""
+        graph = MigrationGraph.from_headers(
+            {"app": {"0001_a": header(), "0001_b": header(run_before=[("app", "0001_a")])}},
+        )
+        assert graph.app_order("app") == ["0001_b", "0001_a"]
+
+    def test_dependencies_on_replaced_migrations_point_to_the_squash(self):
+        """Depending on a migration replaced by a squash should depend on the squash."""
+        graph = MigrationGraph.from_headers(
+            {
+                "app": {
+                    "0003_next": header([("app", "0002_b")]),
+                    "0009_squashed": header(replaces=[("app", "0001_a"), ("app", "0002_b")]),
+                },
+            },
+        )
+        assert graph.app_order("app") == ["0009_squashed", "0003_next"]
+
+    def test_ignores_dependencies_outside_the_project(self):
+        """Dependencies on unknown apps and migrations should be ignored."""
+        graph = MigrationGraph.from_headers(
+            {"app": {"0001_initial": header([("auth", "0001_initial"), ("app", "0000_gone")])}},
+        )
+        assert graph.app_order("app") == ["0001_initial"]
+
+    def test_raises_value_error_for_circular_dependencies(self):
+        """A cycle of migrations can't be replayed, so should raise an error."""
+        graph = MigrationGraph.from_headers(
+            {
+                "app": {
+                    "0001_a": header([("app", "0002_b")]),
+                    "0002_b": header([("app", "0001_a")]),
+                },
+            },
+        )
+        with self.assertRaises(ValueError) as e:
+            graph.app_order("app")
+        assert "0001_a, 0002_b" in str(e.exception)
+
+
+class TestAppLevels(TestCase):
+    """Tests for the MigrationGraph.app_levels function."""
+
+    def test_groups_apps_by_cross_app_dependencies(self):
+        """Apps should come after the apps they depend on, apps in a cycle share a level."""
+        graph = MigrationGraph.from_headers(
+            {
+                "base": {"0001_initial": header()},
+                "independent": {"0001_initial": header()},
+                "users": {"0001_initial": header([("base", "0001_initial")])},
+                "orders": {
+                    "0001_initial": header([("users", "0001_initial")]),
+                    "0002_link": header([("orders", "0001_initial"), ("items", "0001_initial")]),
+                },
+                "items": {"0001_initial": header([("orders", "0001_initial")])},
+            },
+        )
+
+        assert graph.app_dependencies()["orders"] == {"users", "items"}
+        assert graph.app_levels() == [
+            ["base", "independent"],
+            ["users"],
+            ["items", "orders"],
+        ]
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Tests for the checker hooks."""
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from django_migration_dbindex_check.checker import DBIndexChecker
+from django_migration_dbindex_check.hooks import CheckerHooks, get_handlers
+
+
+class RecordingHooks(CheckerHooks):
+    """Record every event of a check."""
+
+    def __init__(self):
+        """Start with no events."""
+        self.events = []
+
+    def on_walk_done(self, apps, duration):  # noqa: D102
+        self.events.append(("on_walk_done", sorted(apps)))
+
+    def on_file_parsed(self, path, duration, op_counts):  # noqa: D102
+        self.events.append(("on_file_parsed", os.path.basename(path), op_counts))
+
+    def on_app_replayed(self, app, models, duration):  # noqa: D102
+        self.events.append(("on_app_replayed", app, sorted(models)))
+
+    def on_finding(self, finding):  # noqa: D102
+        self.events.append(("on_finding", finding["app"], finding["field"]))
+
+    def on_run_done(self, findings, duration):  # noqa: D102
+        self.events.append(("on_run_done", len(findings)))
+
+
+class FindingsOnly:
+    """A subscriber which doesn't subclass CheckerHooks."""
+
+    def __init__(self):
+        """Start with no findings."""
+        self.findings = []
+
+    def on_finding(self, finding):  # noqa: D102
+        self.findings.append(finding)
+
+
+class TestGetHandlers(TestCase):
+    """Tests for the get_handlers function."""
+
+    def test_methods_which_are_not_overridden_are_left_out(self):
+        """Only events the subscriber handles should have a handler."""
+
+        class Subscriber(CheckerHooks):
+            def on_finding(self, finding):
+                pass
+
+        assert list(get_handlers(Subscriber())) == ["on_finding"]
+
+    def test_any_object_with_event_methods_can_subscribe(self):
+        """Subscribers don't have to subclass CheckerHooks."""
+        subscriber = FindingsOnly()
+        assert get_handlers(subscriber) == {"on_finding": subscriber.on_finding}
+
+
+@patch("django_migration_dbindex_check.checker.print")
+@patch("django_migration_dbindex_check.checker.sys.exit")
+class TestCheckerHooks(TestCase):
+    """Tests for the events of a check."""
+
+    def setUp(self) -> None:  # noqa: D102
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(dir_path)  # Make the relative imports work
+        self.root = "example_migrations/important_functionality"
+
+    def test_events_are_emitted_in_order(self, mock_exit, mock_print):
+        """A check should emit each event with its details."""
+        hooks = RecordingHooks()
+        DBIndexChecker(hooks=[hooks]).check_project(self.root)
+
+        assert hooks.events == [
+            ("on_walk_done", ["important_functionality"]),
+            (
+                "on_file_parsed",
+                "0001_initial_migrations.py",
+                {"CreateModel": 5, "AddField": 8, "AlterField": 1},
+            ),
+            ("on_file_parsed", "0002_renamed_a_field.py", {}),
+            ("on_file_parsed", "0003_added_new_field_db_index.py", {"AddField": 1}),
+            (
+                "on_app_replayed",
+                "important_functionality",
+                [
+                    "change_actual",
+                    "change_signoffs",
+                    "change_signoffs_required",
+                    "change_status",
+                    "change_type",
+                ],
+            ),
+            ("on_finding", "important_functionality", "all_signatures_required"),
+            ("on_run_done", 1),
+        ]
+
+    def test_app_events_are_passed_back_from_worker_processes(self, mock_exit, mock_print):
+        """Checking apps in parallel should emit the same events as a serial run."""
+        serial = RecordingHooks()
+        DBIndexChecker(hooks=[serial]).check_project("example_migrations")
+        parallel = RecordingHooks()
+        DBIndexChecker(jobs=3, hooks=[parallel]).check_project("example_migrations")
+
+        assert len(parallel.events) > 8
+        assert sorted(parallel.events, key=repr) == sorted(serial.events, key=repr)
+
+    def test_subscribers_can_be_added_after_creating_the_checker(self, mock_exit, mock_print):
+        """add_hooks should subscribe to the events the subscriber handles."""
+        checker = DBIndexChecker()
+        subscriber = FindingsOnly()
+        checker.add_hooks(subscriber)
+        checker.check_project(self.root)
+
+        assert [x["field"] for x in subscriber.findings] == ["all_signatures_required"]
+
+    def test_files_are_not_timed_without_a_subscriber(self, mock_exit, mock_print):
+        """Without an on_file_parsed subscriber, parsing a file shouldn't be timed."""
+        checker = DBIndexChecker(hooks=[FindingsOnly()])
+        with patch("django_migration_dbindex_check.checker.time.perf_counter") as mock_time:
+            mock_time.return_value = 0
+            checker._get_operations_for_file(
+                f"{self.root}/migrations/0003_added_new_field_db_index.py",
+            )
+
+        mock_time.assert_not_called()
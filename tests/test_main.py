@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Tests for the command line entry point."""
+import io
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from django_migration_dbindex_check.__main__ import main
+
+
+@patch("django_migration_dbindex_check.__main__.DBIndexChecker")
+class TestMain(TestCase):
+    """Tests for the main function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.tests_dir = os.path.dirname(os.path.realpath(__file__))
+        os.chdir(self.tests_dir)  # Make the relative imports work
+
+    def test_checks_the_given_project_directory(self, mock_checker):
+        """A single directory should be checked as the project root."""
+        main(["example_migrations", "--jobs", "2"])
+
+        assert mock_checker.call_args[1]["files"] is None
+        assert mock_checker.call_args[1]["jobs"] == 2
+        mock_checker.return_value.check_project.assert_called_once_with(
+            os.path.join(self.tests_dir, "example_migrations"),
+        )
+
+    def test_whole_files_are_parsed_unless_fast_is_chosen(self, mock_checker):
+        """The fast parser should be opt-in."""
+        main(["example_migrations"])
+        assert mock_checker.call_args[1]["parser"] == "ast"
+
+        main(["example_migrations", "--parser", "fast"])
+        assert mock_checker.call_args[1]["parser"] == "fast"
+
+    def test_files_are_checked_from_the_root(self, mock_checker):
+        """Files should be passed to the checker, which checks the project at --root."""
+        main(
+            [
+                "example_migrations/the_app/migrations/0001_initial_migrations.py",
+                "example_migrations/other_service/migrations/0002_did_some_stuff.py",
+                "--root",
+                "example_migrations",
+            ],
+        )
+
+        assert mock_checker.call_args[1]["files"] == [
+            os.path.join(
+                self.tests_dir,
+                "example_migrations/the_app/migrations/0001_initial_migrations.py",
+            ),
+            os.path.join(
+                self.tests_dir,
+                "example_migrations/other_service/migrations/0002_did_some_stuff.py",
+            ),
+        ]
+        mock_checker.return_value.check_project.assert_called_once_with(
+            os.path.join(self.tests_dir, "example_migrations"),
+        )
+
+    def test_files_are_read_from_stdin(self, mock_checker):
+        """A path of - should read the files from stdin, one per line."""
+        stdin = io.StringIO("example_migrations/the_app/migrations/0001_initial_migrations.py\n\n")
+        with patch("django_migration_dbindex_check.__main__.sys.stdin", stdin):
+            main(["-"])
+
+        assert mock_checker.call_args[1]["files"] == [
+            os.path.join(
+                self.tests_dir,
+                "example_migrations/the_app/migrations/0001_initial_migrations.py",
+            ),
+        ]
+        mock_checker.return_value.check_project.assert_called_once_with(self.tests_dir)
+
+    def test_raises_error_for_missing_path(self, mock_checker):
+        """A path which doesn't exist should raise an error."""
+        with self.assertRaises(ValueError) as e:
+            main(["not_there/migrations/0001_initial.py"])
+
+        assert "is not a valid path" in str(e.exception)
+        mock_checker.assert_not_called()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Tests for the OpenMetrics exporter."""
+import os
+import tempfile
+from unittest import TestCase
+
+from django_migration_dbindex_check.metrics import format_metrics, write_metrics
+from django_migration_dbindex_check.profiler import Profiler
+
+
+class TestFormatMetrics(TestCase):
+    """Tests for the format_metrics function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.profiler = Profiler()
+        self.profiler.count("files_scanned", 12)
+        self.profiler.count("files_parsed", 10)
+        self.profiler.count("files_cached", 2)
+        self.profiler.add("walk", None, 1, 0.25, 0.2, 0)
+
+    def test_metrics_have_a_sample_for_each_value(self):
+        """Each counter, app and phase should have a sample."""
+        text = format_metrics(self.profiler, {"app": 2, "other": 0}, timestamp=100)
+        lines = text.splitlines()
+
+        assert "django_migration_dbindex_check_files_scanned 12" in lines
+        assert "django_migration_dbindex_check_files_cached 2" in lines
+        assert "django_migration_dbindex_check_apps_checked 0" in lines
+        assert 'django_migration_dbindex_check_findings{app="app"} 2' in lines
+        assert 'django_migration_dbindex_check_findings{app="other"} 0' in lines
+        assert (
+            'django_migration_dbindex_check_phase_duration_seconds{phase="walk"} 0.250000' in lines
+        )
+        assert "django_migration_dbindex_check_last_run_timestamp_seconds 100.000" in lines
+        assert lines[-1] == "# EOF"
+
+    def test_every_metric_has_a_type_and_help(self):
+        """Every metric should be declared as a gauge with help text."""
+        lines = format_metrics(self.profiler, {"app": 1}).splitlines()
+        names = {x.split("{")[0].split(" ")[0] for x in lines if not x.startswith("#")}
+
+        for name in names:
+            assert f"# TYPE {name} gauge" in lines
+            assert any(x.startswith(f"# HELP {name} ") for x in lines)
+
+    def test_label_values_are_escaped(self):
+        """Quotes and backslashes in label values should be escaped."""
+        text = format_metrics(self.profiler, {'a"b\\c': 1})
+        assert 'django_migration_dbindex_check_findings{app="a\\"b\\\\c"} 1' in text
+
+
+class TestWriteMetrics(TestCase):
+    """Tests for the write_metrics function."""
+
+    def test_file_is_replaced_without_leaving_temporary_files(self):
+        """The metrics should be moved into place, replacing any previous file."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "checker.prom")
+            with open(path, "w") as file:
+                file.write("old")
+
+            write_metrics(path, Profiler(), {})
+
+            with open(path) as file:
+                assert file.read().endswith("# EOF\n")
+            assert os.listdir(tmp_dir) == ["checker.prom"]
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Tests for the profiler."""
+import json
+import os
+import tempfile
+import tracemalloc
+from unittest import TestCase
+
+from django_migration_dbindex_check.profiler import Profiler
+
+
+class TestProfiler(TestCase):
+    """Tests for the Profiler class."""
+
+    def test_phase_calls_are_totalled(self):
+        """Each call of a phase should add to its totals."""
+        profiler = Profiler()
+        for _call in range(3):
+            with profiler.phase("parse"):
+                pass
+
+        assert profiler.phases["parse"]["calls"] == 3
+        assert profiler.phases["parse"]["wall"] > 0
+
+    def test_only_the_slowest_items_are_kept(self):
+        """Only the top slowest items of each phase should be listed, slowest first."""
+        profiler = Profiler(top=2)
+        for index, wall in enumerate([0.3, 0.1, 0.5, 0.2]):
+            profiler.add("parse", f"file_{index}", 1, wall, 0.0, 0)
+
+        assert profiler.to_dict()["slowest"]["parse"] == [
+            {"name": "file_2", "wall_time": 0.5},
+            {"name": "file_0", "wall_time": 0.3},
+        ]
+        assert profiler.phases["parse"]["calls"] == 4
+
+    def test_nested_phase_peak_counts_towards_enclosing_phase(self):
+        """Memory allocated in a nested phase should be part of the outer phase's peak."""
+        profiler = Profiler()
+        profiler.start()
+        try:
+            with profiler.phase("app"):
+                with profiler.phase("parse"):
+                    data = [0] * 100000
+                del data
+                with profiler.phase("analyse"):
+                    pass
+        finally:
+            profiler.stop()
+
+        assert profiler.phases["parse"]["peak"] > 100000 * 8
+        assert profiler.phases["app"]["peak"] >= profiler.phases["parse"]["peak"]
+        assert not tracemalloc.is_tracing()
+
+    def test_merge_adds_totals_and_slowest_items(self):
+        """Merging should combine the phases of two profiles, e.g. from worker processes."""
+        first = Profiler(top=2)
+        first.add("app", "a", 1, 0.1, 0.1, 10)
+        second = Profiler(top=2)
+        second.add("app", "b", 1, 0.3, 0.2, 30)
+        second.add("app", "c", 1, 0.2, 0.2, 20)
+
+        first.merge(second)
+
+        assert first.phases["app"]["calls"] == 3
+        assert round(first.phases["app"]["wall"], 6) == 0.6
+        assert first.phases["app"]["peak"] == 30
+        assert [x["name"] for x in first.to_dict()["slowest"]["app"]] == ["b", "c"]
+
+    def test_write_stores_json(self):
+        """The profile should be written as JSON."""
+        profiler = Profiler()
+        with profiler.phase("walk"):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "profile.json")
+            profiler.write(path)
+            with open(path) as file:
+                data = json.load(file)
+
+        assert set(data["phases"]["walk"]) == {"calls", "wall_time", "cpu_time", "peak_memory"}
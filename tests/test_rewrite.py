@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Tests for finding the field changes which rewrite the table."""
+from unittest import TestCase
+
+from django_migration_dbindex_check.rewrite import get_rewrite
+
+
+class TestGetRewrite(TestCase):
+    """Tests for the get_rewrite function."""
+
+    def test_changing_the_column_type_rewrites_the_table(self):
+        """A different column type, e.g. integer to bigint, rewrites every row."""
+        assert get_rewrite("IntegerField", None, "BigIntegerField", None) == (
+            "changing the column from integer to bigint"
+        )
+        assert get_rewrite("AutoField", None, "BigAutoField", None) == (
+            "changing the column from integer to bigint"
+        )
+
+    def test_fields_with_the_same_column_type_do_not_rewrite_the_table(self):
+        """Changing the field class without changing the column, e.g. a SlugField."""
+        assert get_rewrite("IntegerField", None, "PositiveIntegerField", None) is None
+        assert get_rewrite("CharField", 50, "SlugField", None) is None
+
+    def test_varchar_to_text_does_not_rewrite_the_table(self):
+        """Postgres stores a varchar the same as text."""
+        assert get_rewrite("CharField", 200, "TextField", None) is None
+        assert get_rewrite("TextField", None, "CharField", 200) == (
+            "changing the column from text to varchar"
+        )
+
+    def test_shrinking_a_varchar_rewrites_the_table(self):
+        """A shorter max_length rewrites the table, a longer one doesn't."""
+        assert get_rewrite("CharField", 200, "CharField", 100) == (
+            "shrinking the column from varchar(200) to varchar(100)"
+        )
+        assert get_rewrite("CharField", 100, "CharField", 200) is None
+        assert get_rewrite("SlugField", None, "SlugField", 20) == (
+            "shrinking the column from varchar(50) to varchar(20)"
+        )
+
+    def test_unknown_column_types_are_ignored(self):
+        """Relations and custom fields could have any column type."""
+        assert get_rewrite("ForeignKey", None, "BigIntegerField", None) is None
+        assert get_rewrite("MoneyField", None, "IntegerField", None) is None
+        assert get_rewrite(None, None, "IntegerField", None) is None
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Tests for finding the statements in raw SQL which build an index or alter a table."""
+from unittest import TestCase
+
+from django_migration_dbindex_check.sql import (
+    ADD_COLUMN,
+    ADD_CONSTRAINT,
+    ADD_INDEX,
+    CREATE_INDEX,
+    CREATE_UNIQUE_INDEX,
+    DROP_INDEX,
+    SqlStatement,
+    scan_sql,
+)
+
+
+class TestScanSql(TestCase):
+    """Tests for the scan_sql function."""
+
+    def test_create_index_locks_the_table(self):
+        """Plain and unique indices built without CONCURRENTLY lock the table."""
+        assert scan_sql("CREATE INDEX book_idx ON app_book (title);") == [
+            SqlStatement(CREATE_INDEX, "app_book", "book_idx", ("title",), False),
+        ]
+        assert scan_sql("create unique index book_idx on app_book (isbn, edition DESC)") == [
+            SqlStatement(CREATE_UNIQUE_INDEX, "app_book", "book_idx", ("isbn", "edition"), False),
+        ]
+
+    def test_concurrent_index_does_not_lock_the_table(self):
+        """CONCURRENTLY builds the index without blocking writes."""
+        assert scan_sql(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "book_idx" ON "public"."app_book" '
+            'USING gin ("title");',
+        ) == [SqlStatement(CREATE_INDEX, "app_book", "book_idx", ("title",), True)]
+
+    def test_unnamed_and_expression_indices(self):
+        """An index needn't be named, and expressions are kept whole."""
+        assert scan_sql("CREATE INDEX ON app_book (lower(title), id)") == [
+            SqlStatement(CREATE_INDEX, "app_book", None, ("lower(title)", "id"), False),
+        ]
+
+    def test_commented_out_statements_are_ignored(self):
+        """SQL in comments never runs."""
+        assert (
+            scan_sql(
+                "-- CREATE INDEX book_idx ON app_book (title);\n/* CREATE INDEX x ON y (z) */",
+            )
+            == []
+        )
+
+    def test_alter_table_add_constraint(self):
+        """Constraints scan the table unless they're NOT VALID or use an existing index."""
+        assert scan_sql(
+            "ALTER TABLE app_book ADD CONSTRAINT isbn_unique UNIQUE (isbn), "
+            "ADD CONSTRAINT author_fk FOREIGN KEY (author_id) REFERENCES app_author (id) "
+            "NOT VALID, ADD PRIMARY KEY USING INDEX book_pk",
+        ) == [
+            SqlStatement(ADD_CONSTRAINT, "app_book", "isbn_unique", ("isbn",), False),
+            SqlStatement(ADD_CONSTRAINT, "app_book", "author_fk", ("author_id",), True),
+            SqlStatement(ADD_CONSTRAINT, "app_book", None, (), True),
+        ]
+
+    def test_alter_table_add_column(self):
+        """A plain column is lock free, one with a constraint or default isn't."""
+        assert scan_sql(
+            "ALTER TABLE app_book ADD COLUMN subtitle text NULL, "
+            "ADD COLUMN IF NOT EXISTS isbn varchar(13) UNIQUE, ADD pages integer DEFAULT 0",
+        ) == [
+            SqlStatement(ADD_COLUMN, "app_book", "subtitle", ("subtitle",), True),
+            SqlStatement(ADD_COLUMN, "app_book", "isbn", ("isbn",), False),
+            SqlStatement(ADD_COLUMN, "app_book", "pages", ("pages",), False),
+        ]
+
+    def test_mysql_add_index(self):
+        """Indices can be added with ALTER TABLE on MySQL."""
+        assert scan_sql("ALTER TABLE `app_book` ADD INDEX `book_idx` (`title`(10))") == [
+            SqlStatement(ADD_INDEX, "app_book", "book_idx", ("title",), False),
+        ]
+
+    def test_mysql_drop_index(self):
+        """On MySQL the table is named in a DROP INDEX, and ALTER TABLE can drop indices."""
+        assert scan_sql(
+            "DROP INDEX book_idx ON app_book;\n"
+            "DROP INDEX `old_idx` ON `app_book` ALGORITHM=INPLACE LOCK=NONE;\n"
+            "ALTER TABLE app_book DROP INDEX title_idx, DROP KEY `isbn_idx`, ADD INDEX x (y);",
+        ) == [
+            SqlStatement(DROP_INDEX, "app_book", "book_idx", (), False),
+            SqlStatement(DROP_INDEX, "app_book", "old_idx", (), False),
+            SqlStatement(DROP_INDEX, "app_book", "title_idx", (), False),
+            SqlStatement(DROP_INDEX, "app_book", "isbn_idx", (), False),
+            SqlStatement(ADD_INDEX, "app_book", "x", ("y",), False),
+        ]
+
+    def test_several_statements(self):
+        """Statements are split on semicolons outside of strings."""
+        assert scan_sql(
+            "UPDATE app_book SET title = 'a; CREATE INDEX x ON y (z)';\n"
+            "CREATE INDEX book_idx ON app_book (title);\n"
+            "DROP INDEX CONCURRENTLY IF EXISTS old_idx, other_idx CASCADE;",
+        ) == [
+            SqlStatement(CREATE_INDEX, "app_book", "book_idx", ("title",), False),
+            SqlStatement(DROP_INDEX, None, "old_idx", (), True),
+            SqlStatement(DROP_INDEX, None, "other_idx", (), True),
+        ]
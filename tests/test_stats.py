@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Tests for loading table statistics."""
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from django_migration_dbindex_check.stats import TableStats, load_table_stats
+
+
+class TestLoadTableStats(TestCase):
+    """Tests for the load_table_stats function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:  # noqa: D102
+        self.tmp_dir.cleanup()
+
+    def write(self, name: str, content: str):  # noqa: D102
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_reads_postgres_csv(self):
+        """Rows should come from reltuples and the size from the number of pages."""
+        path = self.write(
+            "stats.csv",
+            "relname,reltuples,relpages\napp_book,1500000,2000\napp_author,-1,0\n",
+        )
+
+        assert load_table_stats(path) == {
+            "app_book": TableStats(1500000, 2000 * 8192),
+            "app_author": TableStats(None, 0),
+        }
+
+    def test_reads_mysql_tab_separated_output(self):
+        """Column names should be matched case insensitively."""
+        path = self.write(
+            "stats.tsv",
+            "TABLE_NAME\tTABLE_ROWS\tDATA_LENGTH\nApp_Book\t12\t16384\n",
+        )
+
+        assert load_table_stats(path) == {"app_book": TableStats(12, 16384)}
+
+    def test_reads_json_list_and_dict(self):
+        """JSON can be a list of rows, or a dict of stats or row counts keyed by table."""
+        list_path = self.write("list.json", json.dumps([{"table": "app_book", "rows": 10}]))
+        dict_path = self.write(
+            "dict.json",
+            json.dumps({"app_book": {"rows": 10, "size": 100}, "app_author": 5}),
+        )
+
+        assert load_table_stats(list_path) == {"app_book": TableStats(10, None)}
+        assert load_table_stats(dict_path) == {
+            "app_book": TableStats(10, 100),
+            "app_author": TableStats(5, None),
+        }
+
+    def test_stores_schema_qualified_tables_without_schema(self):
+        """A table should be found by its name with or without its schema."""
+        path = self.write("stats.csv", "table,rows\npublic.app_book,10\n")
+
+        stats = load_table_stats(path)
+
+        assert stats["public.app_book"] == stats["app_book"] == TableStats(10, None)
+
+    def test_raises_error_without_table_column(self):
+        """A file without a table name column can't be used."""
+        path = self.write("stats.csv", "rows,size\n10,100\n")
+
+        with self.assertRaises(ValueError):
+            load_table_stats(path)
+
+    def test_raises_error_if_rows_are_not_numbers(self):
+        """A value which isn't a number should be reported rather than ignored."""
+        path = self.write("stats.csv", "table,rows\napp_book,lots\n")
+
+        with self.assertRaises(ValueError):
+            load_table_stats(path)
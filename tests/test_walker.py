@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""Tests for the file discovery helpers."""
+import os
+import subprocess
+import tempfile
+from unittest import TestCase
+
+from django_migration_dbindex_check.walker import (
+    GitIgnore,
+    git_changed_files,
+    git_commit_times,
+    git_ls_files,
+)
+
+
+def make_git_repo(root, files):
+    """Create a git repo in root containing the given files in a single commit."""
+    for path in files:
+        os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+        open(os.path.join(root, path), "w").close()
+    for command in [["init", "-q"], ["add", "-A"], ["commit", "-q", "-m", "initial"]]:
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"] + command,
+            cwd=root,
+            check=True,
+        )
+
+
+def commit_at(root, timestamp, files):
+    """Commit the given files of the git repo in root with a commit time of timestamp."""
+    env = dict(os.environ, GIT_COMMITTER_DATE=f"{timestamp} +0000")
+    for command in [["add"] + files, ["commit", "-q", "-m", "update"]]:
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"] + command,
+            cwd=root,
+            env=env,
+            check=True,
+        )
+
+
+class TestGitIgnore(TestCase):
+    """Tests for the GitIgnore class."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.gitignore = GitIgnore()
+
+    def tearDown(self) -> None:  # noqa: D102
+        self.tmp_dir.cleanup()
+
+    def add_rules(self, base, *lines):
+        """Write a .gitignore with the given lines and add it to the matcher."""
+        path = os.path.join(self.tmp_dir.name, f"{len(self.gitignore.rules)}.gitignore")
+        with open(path, "w") as file:
+            file.write("\n".join(lines))
+        self.gitignore.add_file(base, path)
+
+    def test_unanchored_pattern_matches_at_any_depth(self):
+        """A pattern without a slash should match a name in any directory."""
+        self.add_rules("", "node_modules", "*.pyc")
+        assert self.gitignore.match("node_modules", is_dir=True)
+        assert self.gitignore.match("frontend/node_modules", is_dir=True)
+        assert self.gitignore.match("app/migrations/0001_initial.pyc", is_dir=False)
+        assert not self.gitignore.match("app/migrations/0001_initial.py", is_dir=False)
+
+    def test_anchored_pattern_only_matches_relative_to_gitignore(self):
+        """A pattern containing a slash should only match from the .gitignore's directory."""
+        self.add_rules("", "/media", "static/build")
+        assert self.gitignore.match("media", is_dir=True)
+        assert not self.gitignore.match("app/media", is_dir=True)
+        assert self.gitignore.match("static/build", is_dir=True)
+
+    def test_directory_only_pattern_does_not_match_files(self):
+        """A pattern ending in a slash should only match directories."""
+        self.add_rules("", "venv/")
+        assert self.gitignore.match("venv", is_dir=True)
+        assert not self.gitignore.match("venv", is_dir=False)
+
+    def test_double_star_matches_any_number_of_directories(self):
+        """A "**/" should match zero or more directories."""
+        self.add_rules("", "**/generated")
+        assert self.gitignore.match("generated", is_dir=True)
+        assert self.gitignore.match("a/b/generated", is_dir=True)
+
+    def test_negation_and_nested_files_take_precedence(self):
+        """Later and deeper rules should override earlier ones."""
+        self.add_rules("", "migrations_*", "!migrations_keep")
+        self.add_rules("app", "!migrations_other")
+        assert self.gitignore.match("migrations_old", is_dir=True)
+        assert not self.gitignore.match("migrations_keep", is_dir=True)
+        assert not self.gitignore.match("app/migrations_other", is_dir=True)
+        assert self.gitignore.match("other/migrations_other", is_dir=True)
+
+
+class TestGitLsFiles(TestCase):
+    """Tests for the git_ls_files function."""
+
+    def test_returns_none_outside_a_git_work_tree(self):
+        """Function should return None so the caller can fall back to walking the tree."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert git_ls_files(tmp_dir) is None
+
+    def test_lists_migrations_files_relative_to_root(self):
+        """Function should list the files in migrations folders below the root."""
+        root = os.path.join(os.path.dirname(os.path.realpath(__file__)), "example_migrations")
+        paths = git_ls_files(root)
+        assert "the_app/migrations/0001_initial_migrations.py" in paths
+        assert "migrations_check.cfg" not in paths
+
+
+class TestGitChangedFiles(TestCase):
+    """Tests for the git_changed_files function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        make_git_repo(
+            self.root,
+            ["app/migrations/0001_initial.py", "other/migrations/0001_initial.py"],
+        )
+
+    def tearDown(self) -> None:  # noqa: D102
+        self.tmp_dir.cleanup()
+
+    def test_lists_modified_and_untracked_files(self):
+        """Function should list uncommitted changes and new files, but not unchanged ones."""
+        with open(os.path.join(self.root, "app/migrations/0001_initial.py"), "w") as file:
+            file.write("# changed")
+        open(os.path.join(self.root, "app/migrations/0002_new.py"), "w").close()
+
+        assert sorted(git_changed_files(self.root, "HEAD")) == [
+            "app/migrations/0001_initial.py",
+            "app/migrations/0002_new.py",
+        ]
+
+    def test_raises_value_error_for_unknown_ref(self):
+        """Function should raise a ValueError if git can't find the ref."""
+        with self.assertRaises(ValueError) as e:
+            git_changed_files(self.root, "not-a-ref")
+        assert "not-a-ref" in str(e.exception)
+
+
+class TestGitCommitTimes(TestCase):
+    """Tests for the git_commit_times function."""
+
+    def setUp(self) -> None:  # noqa: D102
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+
+    def tearDown(self) -> None:  # noqa: D102
+        self.tmp_dir.cleanup()
+
+    def test_returns_none_outside_a_git_work_tree(self):
+        """Function should return None so the modification times can be used instead."""
+        assert git_commit_times(self.root) is None
+
+    def test_gives_the_latest_commit_of_each_file(self):
+        """Each migration should have the time of the last commit which changed it."""
+        make_git_repo(
+            self.root,
+            ["app/migrations/0001_initial.py", "other/migrations/0001_initial.py", "readme"],
+        )
+        with open(os.path.join(self.root, "app/migrations/0001_initial.py"), "w") as file:
+            file.write("# changed")
+        commit_at(self.root, 2000000000, ["app"])
+
+        times = git_commit_times(self.root)
+
+        assert sorted(times) == [
+            "app/migrations/0001_initial.py",
+            "other/migrations/0001_initial.py",
+        ]
+        assert times["app/migrations/0001_initial.py"] == 2000000000
+        assert times["other/migrations/0001_initial.py"] < 2000000000